@@ -1,10 +1,30 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from state import bonds, auctions, orders, fills, audit_events
-from uuid import uuid4
+from fastapi import APIRouter, HTTPException, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from state import bonds, auctions, orders, fills, audit_events, open_auctions, order_books, lobs, merkle_trees, auction_summaries, totals
+from sharding import new_id
 import time
-import threading
-from pydantic import BaseModel
-from typing import Optional
+import asyncio
+import logging
+import numpy as np
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from bonds import lookup_instrument
+from clearing import MAX_BAND, auction_band, clear_auction
+from order_book import OrderBook, fill_dicts
+from lob import LimitOrderBook
+from scheduler import CloseScheduler
+from locking import auction_lock, instrument_lock
+from persistence import applier, commit
+import merkle
+import response_cache
+import retention
+import summaries
+import metrics
+from rfq_index import rfq_index
+from stream import feed, Subscriber, RESYNC, HEARTBEAT_S, sse
+
+log = logging.getLogger("auctions")
 
 router = APIRouter()
 
@@ -12,140 +32,500 @@ class AuctionStartRequest(BaseModel):
     isin: str
     lpStub: str
     windowSeconds: int
-    bandOverride: Optional[float] = None
+    bandOverride: Optional[float] = Field(None, gt=0, le=MAX_BAND)
+    mode: Literal["CALL", "CONTINUOUS"] = "CALL"
 
 
 def now_ms() -> int:
     return int(time.time() * 1000)
 
-def add_audit(event_type: str, payload: dict, auction_id: str = None):
-    audit_events.append({
-        "t": now_ms(),
+def add_audit(event_type: str, payload: dict, auction_id: str = None, t: Optional[int] = None):
+    event = {
+        "t": now_ms() if t is None else t,
         "type": event_type,
         "auctionId": auction_id,
         "payload": payload
-    })
-
-def run_auction_timer(auction_id: str):
-    """Background timer that closes auction after window"""
-    auction = auctions.get(auction_id)
-    if not auction:
-        return
-    duration = (auction["tCloseMs"] - auction["tOpenMs"]) / 1000
-
-    def close_after():
-        time.sleep(duration)
-        if auction_id in auctions and auctions[auction_id]["status"] == "OPEN":
-            auctions[auction_id]["status"] = "CLOSED"
-            add_audit("AUCTION_AUTO_CLOSE", {"auctionId": auction_id}, auction_id)
+    }
+    audit_events.append(event)
+    # Fold into the auction's Merkle accumulator (O(log n)); callers hold the auction lock
+    tree = merkle_trees.get(auction_id) if auction_id else None
+    if tree is not None:
+        tree.add_event(event)
 
-    threading.Thread(target=close_after, daemon=True).start()
+def add_audit_many(event_type: str, payloads: List[dict], auction_id: str, t: int):
+    """Batch form of add_audit: one audit-log lock acquisition for all events"""
+    events = [{"t": t, "type": event_type, "auctionId": auction_id, "payload": p} for p in payloads]
+    audit_events.extend(events)
+    tree = merkle_trees.get(auction_id)
+    if tree is not None:
+        for event in events:
+            tree.add_event(event)
 
-# -----------------------------
-# Start Auction
-# -----------------------------
-@router.post("/start/{instrument_id}")
-async def start_auction(instrument_id: str, req: AuctionStartRequest, background_tasks: BackgroundTasks):
-    # 1. Check if instrument exists (parent or microBond)
-    parent = None
-    micro = None
-    for b in bonds.values():
-        if b["id"] == instrument_id:
-            parent = b
-        else:
-            for mb in b.get("microBonds", []):
-                if mb["id"] == instrument_id:
-                    parent = b
-                    micro = mb
-                    break
-
-    if not parent:
-        raise HTTPException(status_code=404, detail="Bond/microBond not found")
-
-    # 2. Create auction object
-    auction_id = str(uuid4())
-    auctions[auction_id] = {
+@applier("auction.create")
+def apply_create_auction(rec: dict) -> dict:
+    auction_id = rec["id"]
+    instrument_id = rec["instrumentId"]
+    parent = bonds[rec["parentId"]]
+    auction = {
         "id": auction_id,
         "instrumentId": instrument_id,
         "meta": {
             "parentId": parent["id"],
             "faceValue": parent["faceValue"],
-            "isin": req.isin,
-            "lpStub": req.lpStub,
+            "isin": rec["isin"],
+            "lpStub": rec["lpStub"],
         },
-        "orders": [],
         "status": "OPEN",
-        "tOpenMs": now_ms(),
-        "tCloseMs": now_ms() + req.windowSeconds * 1000,
-        "bandOverride": req.bandOverride,
-        "band": None,
-        "fills": [],
+        "mode": rec.get("mode", "CALL"),
+        "tOpenMs": rec["tOpenMs"],
+        "tCloseMs": rec["tCloseMs"],
+        "closedAtMs": None,
+        "bandOverride": rec["bandOverride"],
+        "band": auction_band(parent["faceValue"], rec["bandOverride"]),
         "clearingPrice": None,
         "matchedNotional": None,
         "merkleRoot": None,
     }
+    micro_id = instrument_id if instrument_id != parent["id"] else None
+    # Book first so a reader that sees the auction always finds its book
+    order_books[auction_id] = OrderBook(auction_id, instrument_id, parent["id"], micro_id)
+    if auction["mode"] == "CONTINUOUS":
+        lobs[auction_id] = LimitOrderBook()
+    merkle_trees[auction_id] = merkle.AuctionMerkle()
+    auctions[auction_id] = auction
+    summaries.create(auction)
+    # RFQs go to the instrument's oldest OPEN auction; the next one takes over when it closes
+    with instrument_lock(instrument_id):
+        open_auctions.setdefault(instrument_id, {})[auction_id] = None
+    add_audit(rec["event"], {
+        "auctionId": auction_id, "instrumentId": instrument_id,
+        "faceValue": parent["faceValue"], "band": auction["band"], "mode": auction["mode"],
+    }, auction_id, rec["tOpenMs"])
+    return auction
+
+def new_auction(instrument_id: str, parent: dict, *, isin: str, lpStub: str, windowSeconds: int, bandOverride: Optional[float] = None, mode: str = "CALL", event: str = "AUCTION_START") -> dict:
+    """
+    Creates, registers and audits an OPEN auction object and its indexes.
+    Shared by start_auction and rfq.create_auction_inline; caller starts the timer.
+    """
+    t_open = now_ms()
+    return commit("auction.create", {
+        "id": new_id(),
+        "instrumentId": instrument_id,
+        "parentId": parent["id"],
+        "isin": isin,
+        "lpStub": lpStub,
+        "tOpenMs": t_open,
+        "tCloseMs": t_open + windowSeconds * 1000,
+        "bandOverride": bandOverride,
+        "mode": mode,
+        "event": event,
+    })
 
-    # 3. Audit
-    add_audit("AUCTION_START", {"auctionId": auction_id, "instrumentId": instrument_id}, auction_id)
+def auction_view(auction: dict) -> dict:
+    """Serializable copy of an auction with its book's orders and fills expanded to dicts"""
+    book = order_books[auction["id"]]
+    with auction_lock(auction["id"]):
+        return {**auction, "version": book.version, "orders": book.to_dicts(), "fills": book.fills()}
 
-    # 4. Launch background timer
-    background_tasks.add_task(run_auction_timer, auction_id)
+@applier("auction.close")
+def apply_close_auction(rec: dict) -> dict:
+    auction_id = rec["auctionId"]
+    auction = auctions[auction_id]
+    book = order_books[auction_id]
+    before = book.col("status").copy()
+    t0 = time.perf_counter()
+    lob = lobs.get(auction_id)
+    # Clearing first: it is the step that can fail, and it writes nothing until it has a price.
+    # Continuous auctions have traded already; closing only finalizes resting orders
+    result = lob.close(auction, book) if lob is not None else clear_auction(auction, book)
+    metrics.clearing_seconds.observe(time.perf_counter() - t0)
+    auction["status"] = "CLOSED"
+    auction["closedAtMs"] = rec["ts"]
+    auction_summaries[auction_id].close()
+    summaries.set_status(auction_id, "OPEN", "CLOSED")
+    totals["fills"] += result["fillCount"]
+    instrument_id = auction["instrumentId"]
+    with instrument_lock(instrument_id):
+        queue = open_auctions.get(instrument_id)
+        if queue is not None:
+            queue.pop(auction_id, None)
+            if not queue:
+                del open_auctions[instrument_id]
+    add_audit(rec["eventType"], {"auctionId": auction_id}, auction_id, rec["ts"])
+    rfq_index.restatus_book(book, before)
+    book.touch(slice(0, book.size))
+    add_audit("AUCTION_CLEARED", {"auctionId": auction_id, **result}, auction_id, rec["ts"])
+    feed.publish(auction_id, "status", lambda: {"status": "CLOSED"})
+    feed.publish(auction_id, "cleared", lambda: {**result, "fills": order_books[auction_id].fills()})
+    merkle_trees[auction_id].seal()
+    finalize_merkle_root(auction_id)
+    return result
 
-    return {"success": True, "auctionId": auction_id, "instrumentId": instrument_id}
+# -----------------------------
+# Merkle root (fills hashed off the close path)
+# -----------------------------
+_merkle_inflight = set()
+
+def finalize_merkle_root(auction_id: str):
+    """Hashes the cleared fills (inline if few, else in a worker process) and sets merkleRoot."""
+    _merkle_inflight.add(auction_id)
+    fut = merkle.submit_fills(order_books[auction_id].fill_columns())
+    fut.add_done_callback(lambda f: _set_merkle_root(auction_id, f))
+
+def _set_merkle_root(auction_id: str, fut):
+    try:
+        levels = fut.result()
+    except Exception:
+        log.exception("merkle hashing failed for auction %s", auction_id)
+        _merkle_inflight.discard(auction_id)
+        return
+    with auction_lock(auction_id):
+        tree = merkle_trees[auction_id]
+        tree.fills = merkle.Accumulator(levels)
+        auctions[auction_id]["merkleRoot"] = tree.root().hex()
+        order_books[auction_id].touch()
+        feed.publish(auction_id, "auction_updated", lambda: {"merkleRoot": auctions[auction_id]["merkleRoot"]})
+        # Last delta this auction will ever publish; late resumes get a snapshot
+        feed.discard(auction_id)
+    _merkle_inflight.discard(auction_id)
 
+def finalize_pending_merkle_roots():
+    """After recovery: re-hash fills of closed auctions whose root was not yet set"""
+    for auction_id, auction in list(auctions.items()):
+        if auction["status"] == "CLOSED" and auction["merkleRoot"] is None and auction_id not in _merkle_inflight:
+            with auction_lock(auction_id):
+                finalize_merkle_root(auction_id)
 
+def close_auction(auction_id: str, event_type: str = "AUCTION_AUTO_CLOSE"):
+    """
+    Closes an OPEN auction and runs uniform-price clearing on its book.
+    Atomic w.r.t. RFQ inserts/mutations: both run under the auction lock.
+    """
+    auction = auctions.get(auction_id)
+    if not auction:
+        return None
+    with auction_lock(auction_id):
+        if auction["status"] != "OPEN":
+            return None
+        result = commit("auction.close", {"auctionId": auction_id, "eventType": event_type, "ts": now_ms()})
+        metrics.auctions_closed.inc()
+        metrics.fills_total.inc(result["fillCount"])
+        return result
 
+def close_due_auctions(auction_ids):
+    """Scheduler callback: closes every auction due at the same tick"""
+    for auction_id in auction_ids:
+        close_auction(auction_id)
 
+close_scheduler = CloseScheduler(close_due_auctions)
+
+def run_auction_timer(auction_id: str):
+    """Schedules the auction to close at its tCloseMs"""
+    auction = auctions.get(auction_id)
+    if not auction:
+        return
+    close_scheduler.schedule(auction_id, auction["tCloseMs"])
+
+def reschedule_open_auctions():
+    """After recovery: re-arm close timers (overdue auctions close on the next tick)"""
+    for auction_id, auction in list(auctions.items()):
+        if auction["status"] == "OPEN":
+            close_scheduler.schedule(auction_id, auction["tCloseMs"])
 
 # -----------------------------
-# Get Auction State
+# Start Auction
 # -----------------------------
-@router.get("/{auction_id}")
-async def get_auction_state(auction_id: str):
+@router.post("/start/{instrument_id}")
+async def start_auction(instrument_id: str, req: AuctionStartRequest):
+    # 1. Check if instrument exists (parent or microBond)
+    found = lookup_instrument(instrument_id)
+    if not found:
+        raise HTTPException(status_code=404, detail="Bond/microBond not found")
+    parent, micro = found
+
+    # 2. Create + audit auction object
+    auction_id = new_auction(
+        instrument_id,
+        parent,
+        isin=req.isin,
+        lpStub=req.lpStub,
+        windowSeconds=req.windowSeconds,
+        bandOverride=req.bandOverride,
+        mode=req.mode,
+    )["id"]
+
+    # 3. Schedule close
+    run_auction_timer(auction_id)
+
+    return {"success": True, "auctionId": auction_id, "instrumentId": instrument_id}
+
+
+# -----------------------------
+# Extend / Close Auction early
+# -----------------------------
+class AuctionExtendRequest(BaseModel):
+    seconds: int = Field(gt=0)
+
+@applier("auction.extend")
+def apply_extend_auction(rec: dict):
+    auction = auctions[rec["auctionId"]]
+    auction["tCloseMs"] = rec["tCloseMs"]
+    order_books[auction["id"]].touch()
+    add_audit("AUCTION_EXTENDED", {"auctionId": auction["id"], "tCloseMs": auction["tCloseMs"]}, auction["id"], rec["ts"])
+    feed.publish(auction["id"], "auction_updated", lambda: {"tCloseMs": auction["tCloseMs"]})
+
+@router.post("/{auction_id}/extend")
+def extend_auction(auction_id: str, req: AuctionExtendRequest):
     auction = auctions.get(auction_id)
     if not auction:
         raise HTTPException(status_code=404, detail="Auction not found")
-    return auction
+    with auction_lock(auction_id):
+        if auction["status"] != "OPEN":
+            raise HTTPException(status_code=400, detail="Auction already closed")
+        commit("auction.extend", {"auctionId": auction_id, "tCloseMs": auction["tCloseMs"] + req.seconds * 1000, "ts": now_ms()})
+        close_scheduler.schedule(auction_id, auction["tCloseMs"])
+    return {"success": True, "auctionId": auction_id, "tCloseMs": auction["tCloseMs"]}
+
+@router.post("/{auction_id}/close")
+def close_auction_now(auction_id: str):
+    auction = auctions.get(auction_id)
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    with auction_lock(auction_id):
+        if auction["status"] != "OPEN":
+            raise HTTPException(status_code=400, detail="Auction already closed")
+        close_scheduler.cancel(auction_id)
+        result = close_auction(auction_id, "AUCTION_MANUAL_CLOSE")
+    return {"success": True, "auctionId": auction_id, **(result or {})}
+
+
+
+
+
+# -----------------------------
+# Auction Summaries (paginated; no orders/fills)
+# -----------------------------
+@router.get("/summaries")
+def list_auction_summaries(
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+):
+    """Newest first. Pass the X-Next-Cursor response header back as `cursor` for the next page."""
+    before = None
+    if cursor is not None:
+        if not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        before = int(cursor)
+    ids, next_cursor = summaries.page(limit, before, status)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    now = now_ms()
+    out = []
+    for auction_id in ids:
+        with auction_lock(auction_id):
+            out.append(auction_summaries[auction_id].to_dict(auctions[auction_id], now))
+    return out
 
 
 # -----------------------------
 # Get All Auctions (optional helper)
 # -----------------------------
+# Registered before /{auction_id} so "/allAuctions" is not captured as an id
 @router.get("/allAuctions")
-async def list_auctions():
-    return list(auctions.values())
+def list_auctions():
+    return [auction_view(a) for a in auctions.values()]
 
 
 # -----------------------------
-# Get Auction Result (after close)
+# Get Auction State
 # -----------------------------
-@router.get("/{auction_id}/result")
-async def get_auction_result(auction_id: str):
+@router.get("/{auction_id}")
+def get_auction_state(auction_id: str, request: Request):
+    """Serialized once per auction version; ETag / If-None-Match -> 304 when unchanged."""
+    auction = auctions.get(auction_id)
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    with auction_lock(auction_id):
+        version = order_books[auction_id].version
+        return response_cache.respond(request, ("auction", auction_id), version, lambda: auction_view(auction))
+
+
+# -----------------------------
+# Stream Auction State (SSE: snapshot, then deltas)
+# -----------------------------
+@router.get("/{auction_id}/stream")
+async def stream_auction(auction_id: str, last_event_id: Optional[str] = Header(None)):
     auction = auctions.get(auction_id)
     if not auction:
         raise HTTPException(status_code=404, detail="Auction not found")
+    sub = Subscriber(asyncio.get_running_loop())
+    resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    def handshake(last_seq):
+        # Under the auction lock no delta can slip between registration and snapshot
+        with auction_lock(auction_id):
+            seq, missed = feed.subscribe(auction_id, sub, last_seq)
+            return seq, missed, (auction_view(auction) if missed is None else None)
+
+    seq, missed, snap = await run_in_threadpool(handshake, resume_from)
 
-    if auction["status"] != "CLOSED":
-        raise HTTPException(status_code=400, detail="Auction still open")
+    async def events():
+        nonlocal seq, missed, snap
+        try:
+            while True:
+                if snap is not None:
+                    yield sse("snapshot", snap, seq)
+                    snap = None
+                for s, kind, data in missed or ():
+                    yield sse(kind, data, s)
+                missed = None
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if item is RESYNC:
+                    # Fell behind: re-register and start over from a fresh snapshot
+                    feed.unsubscribe(auction_id, sub)
+                    seq, missed, snap = await run_in_threadpool(handshake, None)
+                    continue
+                s, kind, data = item
+                if s > seq:
+                    seq = s
+                    yield sse(kind, data, s)
+        finally:
+            feed.unsubscribe(auction_id, sub)
+            if auction["status"] == "CLOSED" and auction["merkleRoot"] is not None:
+                feed.discard(auction_id)   # nothing left to publish or replay
 
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# -----------------------------
+# Get Auction Result (after close)
+# -----------------------------
+def _result(auction: dict, book: OrderBook) -> dict:
     return {
         "auctionId": auction["id"],
         "status": auction["status"],
         "clearingPrice": auction["clearingPrice"],
         "matchedNotional": auction["matchedNotional"],
-        "fills": auction["fills"],
+        "fills": book.fills(),
         "merkleRoot": auction["merkleRoot"],
     }
 
+@router.get("/{auction_id}/result")
+def get_auction_result(auction_id: str):
+    # Lock so a result is never read mid-clearing (or mid-archiving)
+    with auction_lock(auction_id):
+        auction = auctions.get(auction_id)
+        if auction is not None:
+            if auction["status"] != "CLOSED":
+                raise HTTPException(status_code=400, detail="Auction still open")
+            return _result(auction, order_books[auction_id])
+    archived = retention.load(auction_id)
+    if archived is None:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    return _result(archived.auction, archived.book)
+
+
+# -----------------------------
+# Trades (continuous auctions)
+# -----------------------------
+@router.get("/{auction_id}/trades")
+def get_auction_trades(auction_id: str, offset: int = Query(0, ge=0), limit: int = Query(500, ge=1, le=5000)):
+    """Executions in time order (continuous mode: one per maker/taker match)."""
+    auction = auctions.get(auction_id)
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    lob = lobs.get(auction_id)
+    if lob is None:
+        raise HTTPException(status_code=400, detail="Auction is not in continuous mode")
+    with auction_lock(auction_id):
+        return {
+            "auctionId": auction_id,
+            "lastPrice": lob.lastPrice,
+            "volume": lob.volume,
+            "trades": lob.trades[offset: offset + limit],
+        }
+
+
+# -----------------------------
+# Merkle inclusion proofs
+# -----------------------------
+def _proof_json(leaf: bytes, path) -> dict:
+    return {"leaf": leaf.hex(), "path": [{"hash": h.hex(), "side": side} for h, side in path]}
+
+def _sealed_tree(auction_id: str):
+    auction = auctions.get(auction_id)
+    if not auction:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    if auction["merkleRoot"] is None:
+        raise HTTPException(status_code=409, detail="Merkle root not available yet")
+    return auction, merkle_trees[auction_id]
+
+@router.get("/{auction_id}/proof/rfq/{rfq_id}")
+def get_rfq_proof(auction_id: str, rfq_id: str):
+    """Inclusion proofs of every audit event of an RFQ against the auction's merkleRoot"""
+    with auction_lock(auction_id):
+        auction, tree = _sealed_tree(auction_id)
+        leaves = [i for i in tree.rfqLeaves.get(rfq_id, ()) if i < tree.sealedAt]
+        if not leaves:
+            raise HTTPException(status_code=404, detail="RFQ not found in auction")
+        fills_root = tree.fills.root()
+        proofs = []
+        for i in leaves:
+            event = audit_events.auction_event(auction_id, i)
+            path = tree.events.proof(i, tree.sealedAt) + [(fills_root, "right")]
+            proofs.append({"index": i, "event": event, **_proof_json(merkle.leaf_hash(event), path)})
+        return {"auctionId": auction_id, "rfqId": rfq_id, "merkleRoot": auction["merkleRoot"], "proofs": proofs}
+
+@router.get("/{auction_id}/proof/fill/{rfq_id}")
+def get_fill_proof(auction_id: str, rfq_id: str):
+    """Inclusion proof of an RFQ's fill against the auction's merkleRoot"""
+    with auction_lock(auction_id):
+        auction, tree = _sealed_tree(auction_id)
+        book = order_books[auction_id]
+        row = book.index.get(rfq_id)
+        filled = book.col("filledQty")
+        if row is None or not filled[row] > 0:
+            raise HTTPException(status_code=404, detail="No fill for this RFQ")
+        i = int(np.count_nonzero(filled[:row] > 0))
+        rows = [row]
+        fill = fill_dicts([rfq_id], [book.userIds[row]], book.col("side")[rows], filled[rows], book.col("avgFillPrice")[rows])[0]
+        path = tree.fills.proof(i) + [(tree.events.root(tree.sealedAt), "left")]
+        return {"auctionId": auction_id, "rfqId": rfq_id, "merkleRoot": auction["merkleRoot"],
+                "index": i, "fill": fill, **_proof_json(merkle.leaf_hash(fill), path)}
+
 
 # -----------------------------
 # Get Auction Audit Trail
 # -----------------------------
 @router.get("/{auction_id}/audit")
-async def get_auction_audit(auction_id: str):
-    # filter audit events for this auction
-    related = [e for e in audit_events if e.get("auctionId") == auction_id]
-    if not related:
-        raise HTTPException(status_code=404, detail="No audit events for this auction")
-    return related
+async def get_auction_audit(
+    auction_id: str,
+    fromMs: Optional[int] = None,
+    toMs: Optional[int] = None,
+    types: Optional[str] = Query(None, description="Comma-separated event types"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, gt=0),
+):
+    # per-auction index lookup; only the requested page is materialized
+    type_list = [t for t in types.split(",") if t] if types else None
+    if not audit_events.count_for_auction(auction_id):
+        archived = await run_in_threadpool(retention.load, auction_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="No audit events for this auction")
+        events = [e for e in await run_in_threadpool(archived.events)
+                  if (fromMs is None or e["t"] >= fromMs) and (toMs is None or e["t"] < toMs)
+                  and (type_list is None or e["type"] in type_list)]
+        return events[offset: None if limit is None else offset + limit]
+    return audit_events.query(auction_id, fromMs, toMs, type_list, offset, limit)
 
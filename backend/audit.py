@@ -0,0 +1,309 @@
+# audit.py
+"""
+Segmented, indexed audit log.
+
+Events are numbered globally in append order and stored in fixed-size
+segments. Only a few recent segments stay resident as Python dicts; older
+sealed segments are spilled to immutable files and read back through mmap.
+Small resident columns (timestamp, event-type code) plus per-auction and
+per-type offset lists answer queries without touching event payloads; only
+the requested page is decoded. Spilled segments are mapped on demand through
+a small LRU of open maps, and a segment's file is deleted once every event in
+it belongs to an auction retention has dropped.
+"""
+import mmap
+import os
+import pickle
+import tempfile
+import struct
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+SEGMENT_EVENTS = int(os.environ.get("BONDMATCH_AUDIT_SEGMENT_EVENTS", "16384"))
+MAX_RESIDENT_SEGMENTS = int(os.environ.get("BONDMATCH_AUDIT_RESIDENT_SEGMENTS", "8"))
+MAX_OPEN_SEGMENTS = int(os.environ.get("BONDMATCH_AUDIT_OPEN_SEGMENTS", "64"))
+
+
+class _Maps:
+    """LRU of open segment maps; each holds a file descriptor, so only a few stay open."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._maps: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path: str, count: int, i: int) -> bytes:
+        """Event i's pickled bytes. Copied out under the lock, so eviction never closes a map mid-read."""
+        with self._lock:
+            mm = self._maps.get(path)
+            if mm is None:
+                with open(path, "rb") as f:
+                    mm = self._maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if len(self._maps) > self.capacity:
+                    self._maps.popitem(last=False)[1].close()
+            else:
+                self._maps.move_to_end(path)
+            # File layout: [pickled events][(count + 1) int64 offsets][int64 count]
+            table = len(mm) - 8 - (count + 1) * 8
+            lo, hi = struct.unpack_from("=qq", mm, table + i * 8)
+            return mm[lo:hi]
+
+    def close(self, path: str):
+        with self._lock:
+            mm = self._maps.pop(path, None)
+            if mm is not None:
+                mm.close()
+
+
+_maps = _Maps(MAX_OPEN_SEGMENTS)
+
+
+class _Segment:
+    __slots__ = ("start", "events", "path", "count", "live")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.events: Optional[List[dict]] = []
+        self.path: Optional[str] = None
+        self.count = 0
+        self.live = 0   # events not yet dropped with their auction
+
+    def get(self, i: int) -> Optional[dict]:
+        # Read once: spill() sets path before clearing `events`
+        events = self.events
+        if events is not None:
+            return events[i]
+        path = self.path
+        try:
+            return pickle.loads(_maps.read(path, self.count, i)) if path is not None else None
+        except FileNotFoundError:
+            return None     # released by a concurrent drop_auction
+
+    def spill(self, path: str):
+        offsets = array("q", [0])
+        with open(path + ".tmp", "wb") as f:
+            for e in self.events:
+                blob = pickle.dumps(e, protocol=5)
+                f.write(blob)
+                offsets.append(offsets[-1] + len(blob))
+            f.write(offsets.tobytes())
+            f.write(array("q", [self.count]).tobytes())
+        os.replace(path + ".tmp", path)
+        self.path = path
+        self.events = None
+
+    def release(self):
+        """Deletes the spilled file of a segment with no live events left."""
+        path, self.path = self.path, None
+        _maps.close(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def gone(self) -> bool:
+        return self.events is None and self.path is None
+
+    def __getstate__(self):
+        return {"start": self.start, "count": self.count, "path": self.path, "live": self.live,
+                "events": self.events if self.path is None else None}
+
+    def __setstate__(self, st):
+        self.start = st["start"]
+        self.count = st["count"]
+        self.events = st["events"]
+        self.path = st["path"]
+        self.live = st.get("live", st["count"])
+
+
+class AuditLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = [_Segment(0)]
+        self._starts: List[int] = [0]
+        self._ts = array("q")
+        self._type = array("H")
+        self._type_names: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self._by_auction: Dict[str, array] = {}
+        self._by_type: Dict[int, array] = {}
+        self._resident: List[_Segment] = []   # sealed, not yet spilled (oldest first)
+        self._spill_dir: Optional[str] = None
+
+    # -----------------------------
+    # Write path
+    # -----------------------------
+    def append(self, event: dict):
+        self.extend((event,))
+
+    def extend(self, events: Iterable[dict]):
+        """Appends events in order under a single lock acquisition."""
+        to_spill = []
+        with self._lock:
+            for event in events:
+                seg = self._append_locked(event)
+                if seg is not None:
+                    to_spill.append(seg)
+        # Sealed segments are immutable, so files are written outside the lock
+        for seg in to_spill:
+            seg.spill(os.path.join(self._spill_path(), f"audit-{seg.start:012d}.seg"))
+            with self._lock:
+                if not seg.live and seg.path is not None:
+                    seg.release()   # all its auctions were dropped while it was resident
+
+    def _append_locked(self, event: dict) -> Optional[_Segment]:
+        """Appends one event; returns a sealed segment that is due to be spilled, if any."""
+        n = len(self._ts)
+        code = self._type_codes.get(event["type"])
+        if code is None:
+            code = self._type_codes[event["type"]] = len(self._type_names)
+            self._type_names.append(event["type"])
+        self._ts.append(event["t"])
+        self._type.append(code)
+        aid = event.get("auctionId")
+        if aid is not None:
+            idx = self._by_auction.get(aid)
+            if idx is None:
+                idx = self._by_auction[aid] = array("q")
+            idx.append(n)
+        tidx = self._by_type.get(code)
+        if tidx is None:
+            tidx = self._by_type[code] = array("q")
+        tidx.append(n)
+
+        seg = self._segments[-1]
+        seg.events.append(event)
+        seg.count += 1
+        seg.live += 1
+        if seg.count >= SEGMENT_EVENTS:
+            self._resident.append(seg)
+            new = _Segment(n + 1)
+            self._segments.append(new)
+            self._starts.append(new.start)
+            if len(self._resident) > MAX_RESIDENT_SEGMENTS:
+                return self._resident.pop(0)
+        return None
+
+    def _spill_path(self) -> str:
+        if self._spill_dir is None:
+            data_dir = os.environ.get("BONDMATCH_DATA_DIR")
+            if data_dir:
+                self._spill_dir = os.path.join(data_dir, "audit")
+                os.makedirs(self._spill_dir, exist_ok=True)
+            else:
+                self._spill_dir = tempfile.mkdtemp(prefix="bondmatch-audit-")
+        return self._spill_dir
+
+    # -----------------------------
+    # Read path
+    # -----------------------------
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def get(self, n: int) -> Optional[dict]:
+        k = bisect_right(self._starts, n) - 1
+        seg = self._segments[k]
+        return seg.get(n - seg.start)
+
+    def __iter__(self) -> Iterator[dict]:
+        for n in range(len(self)):
+            yield self.get(n)
+
+    def query(
+        self,
+        auction_id: Optional[str] = None,
+        t_from: Optional[int] = None,
+        t_to: Optional[int] = None,
+        types: Optional[Iterable[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Events matching all given filters, in append order; t_to is exclusive."""
+        with self._lock:
+            page = self._select_locked(auction_id, t_from, t_to, types, offset, limit)
+        return [e for e in map(self.get, page) if e is not None]
+
+    def _select_locked(self, auction_id, t_from, t_to, types, offset, limit) -> List[int]:
+        """Global ids of the requested page. The NumPy views over the index arrays die with
+        this frame, before the lock is released (an exported buffer blocks array.append)."""
+        n = len(self._ts)
+        if auction_id is not None:
+            ids = np.frombuffer(self._by_auction.get(auction_id, array("q")), dtype=np.int64)
+        else:
+            ids = None
+        codes = None
+        if types:
+            codes = [self._type_codes[t] for t in types if t in self._type_codes]
+            if ids is None:
+                parts = [np.frombuffer(self._by_type[c], dtype=np.int64) for c in codes]
+                ids = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        if ids is None:
+            ids = np.arange(n, dtype=np.int64)
+        gone = np.array([seg.gone for seg in self._segments], dtype=bool)
+        if gone.any():
+            # Only reachable without an auction filter: events of dropped auctions in deleted files
+            ids = ids[~gone[np.searchsorted(self._starts, ids, side="right") - 1]]
+        ts = np.frombuffer(self._ts, dtype=np.int64, count=n)
+        type_col = np.frombuffer(self._type, dtype=np.uint16, count=n)
+        mask = np.ones(len(ids), dtype=bool)
+        if t_from is not None:
+            mask &= ts[ids] >= t_from
+        if t_to is not None:
+            mask &= ts[ids] < t_to
+        if codes is not None:
+            mask &= np.isin(type_col[ids], codes)
+        ids = ids[mask]
+        return ids[offset: None if limit is None else offset + limit].tolist()
+
+    def auction_event(self, auction_id: str, i: int) -> Optional[dict]:
+        """The auction's i-th event (0-based, in append order), or None."""
+        with self._lock:
+            idx = self._by_auction.get(auction_id)
+            if idx is None or not 0 <= i < len(idx):
+                return None
+            n = idx[i]
+        return self.get(n)
+
+    def count_for_auction(self, auction_id: str) -> int:
+        return len(self._by_auction.get(auction_id, ()))
+
+    def drop_auction(self, auction_id: str):
+        """
+        Forgets an auction's index (retention archived its events); global numbering is
+        kept. Spilled segments left with no live events have their files deleted.
+        """
+        with self._lock:
+            idx = self._by_auction.pop(auction_id, None)
+            if not idx:
+                return
+            ks = np.searchsorted(self._starts, np.frombuffer(idx, dtype=np.int64), side="right") - 1
+            ks, counts = np.unique(ks, return_counts=True)
+            for k, c in zip(ks.tolist(), counts.tolist()):
+                seg = self._segments[k]
+                seg.live -= c
+                if not seg.live and seg.path is not None:
+                    seg.release()
+
+    # -----------------------------
+    # Snapshot support
+    # -----------------------------
+    def __getstate__(self):
+        st = self.__dict__.copy()
+        del st["_lock"]
+        return st
+
+    def __setstate__(self, st):
+        self.__dict__.update(st)
+        self._lock = threading.Lock()
+
+    def load(self, other: "AuditLog"):
+        """Replaces this log's contents with `other`'s (used by snapshot restore)."""
+        with self._lock:
+            st = other.__getstate__()
+            self.__dict__.update(st)
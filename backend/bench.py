@@ -0,0 +1,290 @@
+# bench.py
+"""
+Load generator + latency benchmark for the auction engine.
+
+Drives the app in-process (FastAPI TestClient, no network) or over a local
+uvicorn server (`--mode uvicorn`, needs uvicorn installed) and reports, per
+scenario: throughput, p50/p99/p999/max latency and peak RSS. With several
+scenarios each one runs in a fresh bench process (and, for uvicorn, a fresh
+server), so its peak RSS is its own rather than the high-water mark of the
+scenarios before it. Results are written as JSON (tagged with the git commit)
+so runs can be diffed across commits.
+
+    cd backend
+    python bench.py                              # all scenarios, in-process
+    python bench.py --scenarios hot_rfq,mass_close --scale 2 --concurrency 8
+    python bench.py --mode uvicorn --out /tmp/bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import Hdr, QUANTILES, QUANTILE_NAMES, rss_bytes
+
+
+# -----------------------------
+# Targets
+# -----------------------------
+class InProcess:
+    """One entered TestClient (lifespan run, one portal) shared by all worker threads."""
+
+    def __init__(self):
+        from fastapi.testclient import TestClient
+        from main import app
+        self._client = TestClient(app)
+        self._client.__enter__()
+
+    def client(self):
+        return self._client
+
+    def peak_rss(self) -> int:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def close(self):
+        self._client.__exit__(None, None, None)
+
+
+class Uvicorn:
+    """A uvicorn subprocess on localhost; one keep-alive httpx client per worker thread."""
+
+    def __init__(self, port: int):
+        import httpx
+        self._httpx = httpx
+        self.base = f"http://127.0.0.1:{port}"
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        self._local = threading.local()
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                if httpx.get(self.base + "/health/ping").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if self.proc.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit("uvicorn did not start (is it installed?)")
+            time.sleep(0.1)
+
+    def client(self):
+        c = getattr(self._local, "client", None)
+        if c is None:
+            c = self._local.client = self._httpx.Client(base_url=self.base, timeout=60)
+        return c
+
+    def peak_rss(self) -> int:
+        with open(f"/proc/{self.proc.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait(timeout=10)
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+class Run:
+    def __init__(self, target, concurrency: int):
+        self.target = target
+        self.concurrency = concurrency
+
+    def setup(self, method: str, path: str, **kw) -> Any:
+        """Untimed request (scenario preparation)."""
+        return self.call(None, None, method, path, **kw)
+
+    def call(self, hdr: Optional[Hdr], lock: Optional[threading.Lock], method: str, path: str, **kw) -> Any:
+        t0 = time.perf_counter()
+        r = self.target.client().request(method, path, **kw)
+        if hdr is not None:
+            us = int((time.perf_counter() - t0) * 1e6)
+            with lock:
+                hdr.record(us)
+        if r.status_code >= 400:
+            raise RuntimeError(f"{method} {path} -> {r.status_code}: {r.text[:200]}")
+        return r.json()
+
+    def measure(self, name: str, jobs: List[Callable[[Callable], Any]]) -> Dict[str, Any]:
+        """Runs each job(call) on the worker pool; every request they make is timed."""
+        hdr, lock = Hdr(), threading.Lock()
+
+        def call(method, path, **kw):
+            return self.call(hdr, lock, method, path, **kw)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            list(pool.map(lambda job: job(call), jobs))
+        elapsed = time.perf_counter() - t0
+        return {
+            "scenario": name,
+            "requests": hdr.n,
+            "seconds": round(elapsed, 4),
+            "throughput": round(hdr.n / elapsed, 1) if elapsed else None,
+            **{f"{k}Ms": hdr.quantile(q) / 1e3 for q, k in zip(QUANTILES, QUANTILE_NAMES)},
+            "maxMs": hdr.max / 1e3,
+            "meanMs": round(hdr.total / hdr.n / 1e3, 4) if hdr.n else None,
+            "peakRssBytes": self.target.peak_rss(),
+        }
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+def new_bond(call, face_value: float = 100.0) -> str:
+    return call("POST", "/bond/create", json={"name": "BENCH", "faceValue": face_value})["bond"]["id"]
+
+
+def start_auction(call, instrument_id: str) -> str:
+    body = {"isin": "BENCH", "lpStub": "LP", "windowSeconds": 3600}
+    return call("POST", f"/auction/start/{instrument_id}", json=body)["auctionId"]
+
+
+def order(instrument_id: str, rnd: random.Random, **extra) -> dict:
+    return {
+        "instrumentId": instrument_id,
+        "userId": f"U{rnd.randrange(1000)}",
+        "side": rnd.choice(("BUY", "SELL")),
+        "qty": rnd.randrange(1, 100),
+        "limitPrice": None if rnd.random() < 0.1 else round(rnd.uniform(99.5, 100.5), 2),
+        **extra,
+    }
+
+
+def bonds_scenario(run: Run, scale: int):
+    n = 200 * scale
+    return run.measure("bonds", [
+        (lambda call: call("POST", f"/bond/split/{new_bond(call)}", params={"parts": 1000}))
+        for _ in range(n)
+    ])
+
+
+def rfq_storm(run: Run, scale: int, auctions: int, name: str):
+    instruments = [new_bond(run.setup) for _ in range(auctions)]
+    for bond_id in instruments:
+        start_auction(run.setup, bond_id)
+    rnd = random.Random(auctions)
+    bodies = [order(instruments[i % auctions], rnd) for i in range(2000 * scale)]
+    return run.measure(name, [(lambda call, b=b: call("POST", "/rfq/create", json=b)) for b in bodies])
+
+
+def churn_scenario(run: Run, scale: int):
+    bond_id = new_bond(run.setup)
+    start_auction(run.setup, bond_id)
+    rnd = random.Random(7)
+    ids = [run.setup("POST", "/rfq/create", json=order(bond_id, rnd))["id"] for _ in range(1000 * scale)]
+    jobs = []
+    for i, rfq_id in enumerate(ids):
+        if i % 3 == 0:
+            jobs.append(lambda call, r=rfq_id: call("POST", f"/rfq/{r}/cancel"))
+        else:
+            body = {"qty": rnd.randrange(1, 100), "limitPrice": round(rnd.uniform(99.5, 100.5), 2)}
+            jobs.append(lambda call, r=rfq_id, b=body: call("POST", f"/rfq/{r}/modify", json=b))
+    return run.measure("churn", jobs)
+
+
+def mass_close_scenario(run: Run, scale: int):
+    rnd = random.Random(11)
+    aids = []
+    for _ in range(50 * scale):
+        bond_id = new_bond(run.setup)
+        aids.append(start_auction(run.setup, bond_id))
+        run.setup("POST", "/rfq/batch", json=[order(bond_id, rnd) for _ in range(200)])
+    return run.measure("mass_close", [(lambda call, a=a: call("POST", f"/auction/{a}/close")) for a in aids])
+
+
+SCENARIOS: Dict[str, Callable[[Run, int], Dict[str, Any]]] = {
+    "bonds": bonds_scenario,
+    "hot_rfq": lambda run, scale: rfq_storm(run, scale, 3, "hot_rfq"),
+    "cold_rfq": lambda run, scale: rfq_storm(run, scale, 500 * scale, "cold_rfq"),
+    "churn": churn_scenario,
+    "mass_close": mass_close_scenario,
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result: Dict[str, Any]):
+    print(f"{result['scenario']:<11} {result['requests']:>7} req  {result['throughput']:>9} req/s  "
+          f"p50 {result['p50Ms']:.3f}ms  p99 {result['p99Ms']:.3f}ms  p999 {result['p999Ms']:.3f}ms  "
+          f"peak RSS {result['peakRssBytes'] / 2**20:.0f} MiB")
+
+
+def run_isolated(args: argparse.Namespace, name: str) -> Dict[str, Any]:
+    """Runs one scenario in a fresh bench process and returns its result."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "result.json")
+        subprocess.run([
+            sys.executable, os.path.abspath(__file__), "--mode", args.mode, "--scenarios", name,
+            "--scale", str(args.scale), "--concurrency", str(args.concurrency), "--port", str(args.port),
+            "--out", out, "--quiet",
+        ], check=True)
+        with open(out) as f:
+            return json.load(f)["scenarios"][0]
+
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    p.add_argument("--scenarios", default=",".join(SCENARIOS))
+    p.add_argument("--scale", type=int, default=1, help="multiplies every scenario's size")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--out", help="JSON output path (default bench-<commit>.json)")
+    p.add_argument("--quiet", action="store_true", help=argparse.SUPPRESS)   # child of run_isolated
+    args = p.parse_args(argv)
+
+    names = [s for s in args.scenarios.split(",") if s]
+    unknown = [s for s in names if s not in SCENARIOS]
+    if unknown:
+        p.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "mode": args.mode,
+        "scale": args.scale,
+        "concurrency": args.concurrency,
+        "startedAt": int(time.time() * 1000),
+        "scenarios": [],
+    }
+    if len(names) > 1:
+        for name in names:
+            report["scenarios"].append(run_isolated(args, name))
+    else:
+        logging.disable(logging.INFO)
+        target = Uvicorn(args.port) if args.mode == "uvicorn" else InProcess()
+        try:
+            result = SCENARIOS[names[0]](Run(target, args.concurrency), args.scale)
+        finally:
+            target.close()
+        result["rssBytes"] = rss_bytes() if args.mode == "inprocess" else None
+        report["scenarios"].append(result)
+        print_result(result)
+    out = args.out or f"bench-{commit or 'local'}.json"
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    if not args.quiet:
+        print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
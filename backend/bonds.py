@@ -1,29 +1,79 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
-from uuid import uuid4
+from sharding import new_id
 import state
+from locking import bond_lock
+from micro_range import MicroRange, parse_micro_id
+from persistence import applier, commit
 
 router = APIRouter()
 
+SPLIT_PREVIEW = 100   # micro-bonds echoed back by /split; the rest are fetched on demand
+
+def lookup_instrument(instrument_id: str):
+    """
+    O(1) lookup: bond ids via the instrument index, micro-bond ids by parsing
+    `{parentId}-m{i}` against the parent's range (materialized on the fly).
+    Returns (parent, micro) where micro is None for a parent bond id; None if unknown.
+    """
+    found = state.instruments.get(instrument_id)
+    if found is not None:
+        return found
+    parsed = parse_micro_id(instrument_id)
+    if parsed is None:
+        return None
+    parent_id, i = parsed
+    rng = state.micro_ranges.get(parent_id)
+    if rng is None or i not in rng:
+        return None
+    return state.bonds[parent_id], rng.get(i)
+
 @router.get("/")
-def get_bonds():
-    return state.bonds
+def get_bonds(includeMicro: bool = False, microLimit: int = Query(SPLIT_PREVIEW, ge=0)):
+    """
+    Bonds keyed by id. Micro-bonds are listed only with includeMicro=true
+    (first `microLimit` per bond; page the rest via /bond/{id}/micro).
+    """
+    if not includeMicro:
+        return state.bonds
+    out = {}
+    for bond_id, bond in state.bonds.items():
+        rng = state.micro_ranges.get(bond_id)
+        out[bond_id] = {**bond, "microBonds": rng.page(0, microLimit) if rng else []}
+    return out
 
 class BondCreate(BaseModel):
     name: str
     faceValue: float = Field(gt=0)
 
-@router.post("/create")
-def create_bond(req: BondCreate):
-    bond_id = str(uuid4())
-    state.bonds[bond_id] = {
-        "id": bond_id,
-        "name": req.name,
-        "faceValue": req.faceValue,
-        "microBonds": [],
+@applier("bond.create")
+def apply_create_bond(rec: dict) -> dict:
+    bond = {
+        "id": rec["id"],
+        "name": rec["name"],
+        "faceValue": rec["faceValue"],
+        "microCount": 0,
         "status": "active"
     }
-    return {"success": True, "bond": state.bonds[bond_id]}
+    state.bonds[bond["id"]] = bond
+    state.instruments[bond["id"]] = (bond, None)
+    return bond
+
+@router.post("/create")
+def create_bond(req: BondCreate):
+    bond = commit("bond.create", {"id": new_id(), "name": req.name, "faceValue": req.faceValue})
+    return {"success": True, "bond": bond}
+
+@applier("bond.split")
+def apply_split_bond(rec: dict) -> dict:
+    bond_id = rec["bondId"]
+    parent = state.bonds[bond_id]
+    parts = rec["parts"]
+    # Re-split replaces the previous range (ids are reused by index, overrides reset)
+    state.micro_ranges[bond_id] = MicroRange(bond_id, parts, parent["faceValue"] / parts)
+    parent["microCount"] = parts
+    parent["status"] = "split"
+    return parent
 
 @router.post("/split/{bond_id}")
 def split_bond(bond_id: str, parts: int):
@@ -32,16 +82,48 @@ def split_bond(bond_id: str, parts: int):
     if parts <= 0:
         raise HTTPException(status_code=400, detail="parts must be > 0")
 
-    parent = state.bonds[bond_id]
-    unit_value = parent["faceValue"] / parts
-    parent["microBonds"] = []
-    for _ in range(parts):
-        mid = str(uuid4())
-        parent["microBonds"].append({
-            "id": mid,
-            "parentId": bond_id,
-            "value": unit_value,
-            "status": "available",
-        })
-    parent["status"] = "split"
-    return {"parentBond": bond_id, "microBonds": parent["microBonds"]}
+    # Serialize concurrent re-splits of the same bond
+    with bond_lock(bond_id):
+        commit("bond.split", {"bondId": bond_id, "parts": parts})
+        rng = state.micro_ranges[bond_id]
+        return {
+            "parentBond": bond_id,
+            "microCount": rng.count,
+            "unitValue": rng.unitValue,
+            "microBonds": rng.page(0, SPLIT_PREVIEW),
+        }
+
+@router.get("/{bond_id}/micro")
+def list_micro_bonds(bond_id: str, offset: int = Query(0, ge=0), limit: int = Query(SPLIT_PREVIEW, ge=1, le=10000)):
+    if bond_id not in state.bonds:
+        raise HTTPException(status_code=404, detail="Bond not found")
+    rng = state.micro_ranges.get(bond_id)
+    return {
+        "parentBond": bond_id,
+        "microCount": rng.count if rng else 0,
+        "microBonds": rng.page(offset, limit) if rng else [],
+    }
+
+@router.get("/micro/{micro_id}")
+def get_micro_bond(micro_id: str):
+    found = lookup_instrument(micro_id)
+    if not found or found[1] is None:
+        raise HTTPException(status_code=404, detail="Micro-bond not found")
+    return found[1]
+
+class MicroStatus(BaseModel):
+    status: str = Field(min_length=1)
+
+@applier("bond.micro_status")
+def apply_micro_status(rec: dict):
+    parent_id, i = parse_micro_id(rec["microId"])
+    state.micro_ranges[parent_id].set_status(i, rec["status"])
+
+@router.patch("/micro/{micro_id}/status")
+def set_micro_status(micro_id: str, req: MicroStatus):
+    found = lookup_instrument(micro_id)
+    if not found or found[1] is None:
+        raise HTTPException(status_code=404, detail="Micro-bond not found")
+    with bond_lock(found[0]["id"]):
+        commit("bond.micro_status", {"microId": micro_id, "status": req.status})
+    return lookup_instrument(micro_id)[1]
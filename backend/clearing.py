@@ -0,0 +1,154 @@
+# clearing.py
+"""
+Uniform-price call-auction clearing.
+
+Bids and offers are aggregated into cumulative demand/supply curves on the
+band's tick grid with NumPy; the clearing price is the in-band price that
+maximizes matched volume. Ties are broken by smallest imbalance, then by distance to
+the reference price. Matched volume is allocated pro-rata on the long side
+(the engine's rule); uniform_price() also takes "price_time", which fills the
+long side best price first, then by priority (earliest first), as used by the
+replay backtester.
+"""
+from typing import Optional, Dict, Any, Tuple
+import numpy as np
+
+from order_book import OrderBook, BUY, SELL, OPEN, FILLED, PARTIALLY_FILLED, UNFILLED
+
+# Half-width of the price band around the reference (face) price.
+# Same 50p band the fair-price stub uses.
+DEFAULT_BAND = 0.50
+# Largest bandOverride accepted (clearing works on a grid of 2 * band / TICK prices)
+MAX_BAND = 10.0
+# Price grid the clearing price is chosen from
+TICK = 0.01
+EPS = 1e-9
+ALLOCATIONS = ("pro_rata", "price_time")
+
+
+def auction_band(face_value: float, band_override: Optional[float] = None) -> Dict[str, float]:
+    ref = float(face_value)
+    half = float(band_override) if band_override is not None else DEFAULT_BAND
+    return {"ref": ref, "low": round(ref - half, 6), "high": round(ref + half, 6)}
+
+
+def uniform_price(
+    buy_px: np.ndarray,
+    buy_qty: np.ndarray,
+    sell_px: np.ndarray,
+    sell_qty: np.ndarray,
+    band_low: float,
+    band_high: float,
+    ref: float,
+    allocation: str = "pro_rata",
+    buy_priority: Optional[np.ndarray] = None,
+    sell_priority: Optional[np.ndarray] = None,
+) -> Tuple[Optional[float], float, np.ndarray, np.ndarray]:
+    """
+    Market orders are encoded as +inf (buy) / -inf (sell) limit prices.
+    Returns (price, matched_qty, buy_fill, sell_fill); price is None when nothing crosses.
+    `*_priority` (lower first, default: input order) only matter for price_time.
+
+    Limits are snapped onto the band's tick grid conservatively (buys down,
+    sells up) so the curves are built with bincount/cumsum in O(n + ticks).
+    """
+    buy_fill = np.zeros(len(buy_qty))
+    sell_fill = np.zeros(len(sell_qty))
+    if len(buy_qty) == 0 or len(sell_qty) == 0:
+        return None, 0.0, buy_fill, sell_fill
+
+    n_ticks = int(round((band_high - band_low) / TICK)) + 1
+    grid = band_low + np.arange(n_ticks) * TICK
+
+    # Tick index of each limit; buys above the band bid at the top, sells below it offer at the bottom
+    b_idx = np.floor((np.clip(buy_px, band_low - TICK, band_high) - band_low) / TICK + EPS)
+    s_idx = np.ceil((np.clip(sell_px, band_low, band_high + TICK) - band_low) / TICK - EPS)
+    b_ok = b_idx >= 0
+    s_ok = s_idx < n_ticks
+    b_idx = b_idx.astype(np.int64)
+    s_idx = s_idx.astype(np.int64)
+
+    # Demand(p) = qty of buys with limit >= p ; Supply(p) = qty of sells with limit <= p
+    demand = np.cumsum(np.bincount(b_idx[b_ok], buy_qty[b_ok], n_ticks)[::-1])[::-1]
+    supply = np.cumsum(np.bincount(s_idx[s_ok], sell_qty[s_ok], n_ticks))
+
+    matched = np.minimum(demand, supply)
+    # lexsort: last key is primary
+    best = int(np.lexsort((np.abs(grid - ref), np.abs(demand - supply), -matched))[0])
+    volume = float(matched[best])
+    if volume <= 0:
+        return None, 0.0, buy_fill, sell_fill
+
+    price = round(float(grid[best]), 6)
+    buy_elig = b_ok & (b_idx >= best)
+    sell_elig = s_ok & (s_idx <= best)
+    if allocation == "price_time":
+        buy_fill[buy_elig] = _price_time(buy_qty[buy_elig], -buy_px[buy_elig], _subset(buy_priority, buy_elig), volume)
+        sell_fill[sell_elig] = _price_time(sell_qty[sell_elig], sell_px[sell_elig], _subset(sell_priority, sell_elig), volume)
+    else:
+        buy_fill[buy_elig] = buy_qty[buy_elig] * (volume / demand[best])
+        sell_fill[sell_elig] = sell_qty[sell_elig] * (volume / supply[best])
+    return price, volume, buy_fill, sell_fill
+
+
+def _subset(priority: Optional[np.ndarray], mask: np.ndarray) -> np.ndarray:
+    return priority[mask] if priority is not None else np.flatnonzero(mask)
+
+
+def _price_time(qty: np.ndarray, key: np.ndarray, priority: np.ndarray, volume: float) -> np.ndarray:
+    """Fills `volume` in (key, priority) order, lowest first; the last order filled may be partial."""
+    order = np.lexsort((priority, key))
+    q = qty[order]
+    before = np.cumsum(q) - q
+    fill = np.empty(len(q))
+    fill[order] = np.clip(volume - before, 0.0, q)
+    return fill
+
+
+def clear_auction(auction: Dict[str, Any], book: OrderBook) -> Dict[str, Any]:
+    """
+    Clears the OPEN rows of an auction's order book in place: sets band,
+    clearingPrice and matchedNotional on the auction, and writes
+    filledQty/avgFillPrice/status columns. Fills are read back via book.fills().
+    Nothing is written until the clearing price is found, so a failure leaves
+    the auction and book untouched.
+    """
+    meta = auction.get("meta", {})
+    band = auction.get("band") or auction_band(meta.get("faceValue", 100.0), auction.get("bandOverride"))
+
+    side = book.col("side")
+    status = book.col("status")
+    px = book.col("limitPrice")
+    qty = book.col("qty")
+    live = status == OPEN
+    buy_rows = np.flatnonzero(live & (side == BUY))
+    sell_rows = np.flatnonzero(live & (side == SELL))
+
+    # NaN limit = market order
+    buy_px = np.nan_to_num(px[buy_rows], nan=np.inf)
+    sell_px = np.nan_to_num(px[sell_rows], nan=-np.inf)
+
+    price, volume, buy_fill, sell_fill = uniform_price(
+        buy_px, qty[buy_rows], sell_px, qty[sell_rows], band["low"], band["high"], band["ref"]
+    )
+
+    auction["band"] = band
+    filled = book.col("filledQty")
+    avg = book.col("avgFillPrice")
+    filled[buy_rows] = buy_fill
+    filled[sell_rows] = sell_fill
+    live_rows = np.flatnonzero(live)
+    f = filled[live_rows]
+    q = qty[live_rows]
+    status[live_rows] = np.where(f <= 0, UNFILLED, np.where(f < q, PARTIALLY_FILLED, FILLED))
+    if price is not None:
+        avg[live_rows[f > 0]] = price
+
+    auction["clearingPrice"] = price
+    auction["matchedNotional"] = volume * price if price is not None else 0.0
+    return {
+        "clearingPrice": price,
+        "matchedQty": volume,
+        "matchedNotional": auction["matchedNotional"],
+        "fillCount": int(np.count_nonzero(f > 0)),
+    }
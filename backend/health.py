@@ -1,8 +1,36 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 import state
+import metrics
+import pricing
+import response_cache
+import retention
 
 router = APIRouter()
 
+
+def open_auction_ids() -> list:
+    return [aid for iid in list(state.open_auctions) for aid in list(state.open_auctions.get(iid, ()))]
+
+
+def open_orders() -> int:
+    """Live orders across OPEN auctions (book depth), from the incremental summaries"""
+    total = 0
+    for auction_id in open_auction_ids():
+        summary = state.auction_summaries.get(auction_id)
+        if summary is not None:
+            total += summary.counts["BUY"] + summary.counts["SELL"]
+    return total
+
+
+# State-derived gauges are evaluated at scrape time only
+metrics.Gauge("bondmatch_open_auctions", "Auctions currently OPEN", lambda: len(open_auction_ids()))
+metrics.Gauge("bondmatch_auctions", "Auctions held in memory", lambda: len(state.auctions))
+metrics.Gauge("bondmatch_rfqs", "RFQs held in memory", lambda: len(state.rfqs))
+metrics.Gauge("bondmatch_book_open_orders", "Live orders in OPEN auctions", open_orders)
+metrics.Gauge("bondmatch_audit_events", "Audit events recorded", lambda: len(state.audit_events))
+
+
 @router.get("/ping")
 def ping():
     return {"status": "ok"}
@@ -12,7 +40,20 @@ def stats():
     return {
         "bonds": len(state.bonds),
         "auctions": len(state.auctions),
-        "orders": len(state.orders),
-        "fills": len(state.fills),
+        "openAuctions": len(open_auction_ids()),
+        "orders": len(state.rfqs),
+        "openOrders": open_orders(),
+        "fills": state.totals["fills"],
         "audit_events": len(state.audit_events),
+        "bookColumnBytes": int(metrics.book_bytes.value()),
+        "residentBytes": int(metrics.rss.value()),
+        "schedulerLag": metrics.scheduler_lag.snapshot(),
+        "priceCache": pricing.cache_stats(),
+        "responseCache": response_cache.cache_stats(),
+        "archive": retention.stats(),
     }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
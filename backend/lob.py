@@ -0,0 +1,181 @@
+# lob.py
+"""
+Continuous price-time-priority matching (auctions started with mode=CONTINUOUS).
+
+The auction's columnar OrderBook stays the record of every order (qty,
+filledQty, avgFillPrice, status); a LimitOrderBook only indexes the resting
+rows. Each side is a heap of price levels (lazy deletion) with a FIFO queue of
+rows per level and its live quantity, so opening a level is O(log P), reading
+the best price is O(1) amortized and a cancel is O(1): queue entries carry a
+token, and an entry whose row was cancelled or re-queued (modify) is skipped
+when it reaches the front.
+
+Incoming orders match at once against the opposite side, at the resting
+order's price:
+  GTC  the remainder rests at its limit
+  IOC  the remainder is cancelled (PARTIALLY_FILLED, or UNFILLED if nothing traded)
+  AON  fills completely on arrival or not at all; it never rests
+Market orders (no limit) trade up to the auction band and never rest.
+At close, resting orders end PARTIALLY_FILLED or UNFILLED.
+
+There is no self-trade prevention: an order can match a resting order of the
+same userId. Clients that must avoid it should cancel their own resting
+orders first.
+"""
+import heapq
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from order_book import OrderBook, BUY, OPEN, FILLED, PARTIALLY_FILLED, UNFILLED, SIDES, TIF_CODE
+
+EPS = 1e-9
+IOC = TIF_CODE["IOC"]
+AON = TIF_CODE["AON"]
+
+Trade = Tuple[int, float, float]   # (maker row, qty, price)
+Entry = Tuple[int, int]            # (row, token)
+
+
+class _Side:
+    __slots__ = ("sign", "heap", "queues", "qty")
+
+    def __init__(self, sign: int):
+        self.sign = sign                          # -1 for bids (max-heap), 1 for asks
+        self.heap: List[float] = []
+        self.queues: Dict[float, Deque[Entry]] = {}
+        self.qty: Dict[float, float] = {}         # live quantity per level
+
+    def best(self) -> Optional[float]:
+        heap = self.heap
+        while heap and self.sign * heap[0] not in self.queues:
+            heapq.heappop(heap)
+        return self.sign * heap[0] if heap else None
+
+    def rest(self, px: float, entry: Entry, qty: float):
+        q = self.queues.get(px)
+        if q is None:
+            q = self.queues[px] = deque()
+            self.qty[px] = 0.0
+            heapq.heappush(self.heap, self.sign * px)
+        q.append(entry)
+        self.qty[px] += qty
+
+    def reduce(self, px: float, qty: float):
+        left = self.qty[px] - qty
+        if left <= EPS:
+            # Level empty: drop it (queued cancelled rows go with it; the heap entry is skipped lazily)
+            del self.queues[px]
+            del self.qty[px]
+        else:
+            self.qty[px] = left
+
+    def available(self, crosses) -> float:
+        return sum(q for px, q in self.qty.items() if crosses(px))
+
+
+class LimitOrderBook:
+    __slots__ = ("bids", "asks", "resting", "tokens", "trades", "lastPrice", "volume", "notional")
+
+    def __init__(self):
+        self.bids = _Side(-1)
+        self.asks = _Side(1)
+        self.resting: Dict[int, int] = {}   # row -> token of its live queue entry
+        self.tokens = 0
+        self.trades: List[Dict[str, Any]] = []
+        self.lastPrice: Optional[float] = None
+        self.volume = 0.0
+        self.notional = 0.0
+
+    @staticmethod
+    def _fill(book: OrderBook, row: int, qty: float, px: float):
+        c = book.cols
+        done = c["filledQty"][row]
+        avg = c["avgFillPrice"][row]
+        c["avgFillPrice"][row] = px if done <= 0 else (avg * done + px * qty) / (done + qty)
+        c["filledQty"][row] = done + qty
+
+    def submit(self, book: OrderBook, row: int, band: Dict[str, float], ts: int) -> List[Trade]:
+        """Matches an OPEN row (new, or re-submitted after a modify) and rests what is left."""
+        c = book.cols
+        buy = c["side"][row] == BUY
+        tif = c["tif"][row]
+        lp = float(c["limitPrice"][row])
+        market = lp != lp
+        remaining = float(c["qty"][row] - c["filledQty"][row])
+        opp, own = (self.asks, self.bids) if buy else (self.bids, self.asks)
+        limit = (band["high"] if buy else band["low"]) if market else lp
+        crosses = (lambda px: px <= limit + EPS) if buy else (lambda px: px >= limit - EPS)
+
+        trades: List[Trade] = []
+        if tif == AON and opp.available(crosses) < remaining - EPS:
+            c["status"][row] = UNFILLED
+            return trades
+
+        while remaining > EPS:
+            px = opp.best()
+            if px is None or not crosses(px):
+                break
+            queue = opp.queues[px]
+            maker, token = queue[0]
+            if self.resting.get(maker) != token:
+                queue.popleft()     # cancelled or re-queued; its qty already left the level
+                continue
+            x = min(remaining, float(c["qty"][maker] - c["filledQty"][maker]))
+            self._fill(book, maker, x, px)
+            self._fill(book, row, x, px)
+            remaining -= x
+            if c["qty"][maker] - c["filledQty"][maker] <= EPS:
+                c["status"][maker] = FILLED
+                del self.resting[maker]
+                queue.popleft()
+            opp.reduce(px, x)
+            trades.append((maker, x, px))
+            self.trades.append({
+                "ts": ts,
+                "price": px,
+                "qty": x,
+                "buyRfqId": book.ids[row if buy else maker],
+                "sellRfqId": book.ids[maker if buy else row],
+                "aggressor": SIDES[c["side"][row]],
+            })
+            self.lastPrice = px
+            self.volume += x
+            self.notional += x * px
+
+        if remaining <= EPS:
+            c["status"][row] = FILLED
+        elif market or tif == IOC or tif == AON:
+            c["status"][row] = PARTIALLY_FILLED if c["filledQty"][row] > 0 else UNFILLED
+        else:
+            self.tokens += 1
+            self.resting[row] = self.tokens
+            own.rest(lp, (row, self.tokens), remaining)
+        return trades
+
+    def cancel(self, book: OrderBook, row: int):
+        """Takes a resting row's remaining qty off its level (call before changing its status)."""
+        if self.resting.pop(row, None) is None:
+            return
+        c = book.cols
+        side = self.bids if c["side"][row] == BUY else self.asks
+        side.reduce(float(c["limitPrice"][row]), float(c["qty"][row] - c["filledQty"][row]))
+
+    def close(self, auction: Dict[str, Any], book: OrderBook) -> Dict[str, Any]:
+        """End of the trading window: resting rows are finalized; nothing is re-auctioned."""
+        status = book.col("status")
+        filled = book.col("filledQty")
+        live = np.flatnonzero(status == OPEN)
+        status[live] = np.where(filled[live] > 0, PARTIALLY_FILLED, UNFILLED)
+        self.bids = _Side(-1)
+        self.asks = _Side(1)
+        self.resting = {}
+        auction["clearingPrice"] = self.lastPrice
+        auction["matchedNotional"] = self.notional
+        return {
+            "clearingPrice": self.lastPrice,
+            "matchedQty": self.volume,
+            "matchedNotional": self.notional,
+            "fillCount": int(np.count_nonzero(filled > 0)),
+        }
@@ -0,0 +1,41 @@
+# locking.py
+"""
+Fine-grained locks over the shared state in state.py.
+
+Sync route handlers run on the threadpool and the close scheduler runs on its
+own thread, so every mutation of an auction (its dict, its OrderBook and the
+RFQs in it) happens under that auction's lock. Different auctions never
+contend with each other; closing is atomic with respect to RFQ inserts.
+Instrument locks serialize "find or create the open auction" per instrument.
+
+Locks are kept out of the state objects themselves so state stays picklable.
+"""
+import threading
+from typing import Dict, Hashable
+
+
+class KeyedLocks:
+    """Lazily created RLock per key."""
+
+    def __init__(self):
+        self._locks: Dict[Hashable, threading.RLock] = {}
+        self._guard = threading.Lock()
+
+    def __call__(self, key: Hashable) -> threading.RLock:
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(key, threading.RLock())
+        return lock
+
+    def discard(self, key: Hashable):
+        with self._guard:
+            self._locks.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+auction_lock = KeyedLocks()
+instrument_lock = KeyedLocks()
+bond_lock = KeyedLocks()
@@ -1,14 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 import logging
+import os
 
 # Routers
 from bonds import router as bonds_router
 from auctions import router as auctions_router
 from health import router as health_router
 from rfq import router as rfq_router
+from auctions import reschedule_open_auctions, finalize_pending_merkle_roots
+from rfq import rearm_quote_expiry
+import persistence
+import merkle
+import pricing
+import retention
+import metrics
 
 
-app = FastAPI(title="BondMatch++ Auction Engine (In-Memory)", version="0.3")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Durable mode: recover state from snapshot + WAL, then log every mutation
+    data_dir = os.environ.get("BONDMATCH_DATA_DIR")
+    if data_dir:
+        persistence.open_data_dir(data_dir)
+        reschedule_open_auctions()
+        rearm_quote_expiry()
+        finalize_pending_merkle_roots()
+    retention.start()
+    yield
+    persistence.close()
+    merkle.shutdown()
+    pricing.service.shutdown()
+
+
+app = FastAPI(title="BondMatch++ Auction Engine (In-Memory)", version="0.3", lifespan=lifespan)
 
 # Logging config
 logging.basicConfig(
@@ -16,6 +41,9 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
+# Per-endpoint latency histograms (exposed at /health/metrics)
+app.add_middleware(metrics.LatencyMiddleware)
+
 # Mount routers
 app.include_router(bonds_router, prefix="/bond", tags=["Bonds"])
 app.include_router(auctions_router, prefix="/auction", tags=["Auctions"])
@@ -0,0 +1,182 @@
+# merkle.py
+"""
+Incremental Merkle accumulators for auction integrity.
+
+An Accumulator is a Merkle mountain range over 32-byte SHA-256 leaves. Every
+completed node is kept per level, so appending a leaf costs O(log n) hashes
+(amortized O(1)), the root for any prefix size n is the right-to-left fold
+of its O(log n) peaks, and inclusion proofs need no rehashing.
+
+    leaf  = sha256(0x00 || canonical JSON of the item)
+    node  = sha256(0x01 || left || right)
+    root  = node(events root, fills root) for a closed auction
+
+A proof is a list of (sibling hash, side) pairs applied from the leaf up.
+This module has no dependency on state so it can run in worker processes.
+Fill leaves hash the same dicts the result endpoint returns (OrderBook.fills).
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from order_book import fill_dicts
+
+HASH_SIZE = 32
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+# Fill sets smaller than this are hashed inline rather than shipped to a worker
+INLINE_FILLS = int(os.environ.get("BONDMATCH_MERKLE_INLINE_FILLS", "2048"))
+WORKERS = int(os.environ.get("BONDMATCH_MERKLE_WORKERS", str(os.cpu_count() or 1)))
+
+_sha256 = hashlib.sha256
+
+
+def canonical(item: dict) -> bytes:
+    return json.dumps(item, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def leaf_hash(item: dict) -> bytes:
+    return _sha256(b"\x00" + canonical(item)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return _sha256(b"\x01" + left + right).digest()
+
+
+class Accumulator:
+    __slots__ = ("levels",)
+
+    def __init__(self, levels: Optional[List[bytearray]] = None):
+        self.levels = levels or [bytearray()]
+
+    def __len__(self) -> int:
+        return len(self.levels[0]) // HASH_SIZE
+
+    def _node(self, h: int, k: int) -> bytes:
+        return bytes(self.levels[h][k * HASH_SIZE:(k + 1) * HASH_SIZE])
+
+    def append(self, leaf: bytes):
+        levels = self.levels
+        levels[0] += leaf
+        node = leaf
+        h = 0
+        # Each completed pair at level h yields one node at level h + 1 (binary carry)
+        while len(levels[h]) // HASH_SIZE % 2 == 0:
+            node = node_hash(bytes(levels[h][-2 * HASH_SIZE:-HASH_SIZE]), node)
+            h += 1
+            if h == len(levels):
+                levels.append(bytearray())
+            levels[h] += node
+
+    @classmethod
+    def build(cls, leaves: bytes) -> "Accumulator":
+        """Bulk construction from concatenated leaf hashes (same nodes as repeated append)."""
+        levels = [bytearray(leaves)]
+        cur = leaves
+        while len(cur) >= 2 * HASH_SIZE:
+            pairs = len(cur) // (2 * HASH_SIZE)
+            cur = b"".join([_sha256(b"\x01" + cur[i * 64:(i + 1) * 64]).digest() for i in range(pairs)])
+            levels.append(bytearray(cur))
+        return cls(levels)
+
+    def _peaks(self, n: int) -> List[Tuple[int, int]]:
+        """(level, index) of the peaks for the first n leaves, highest first."""
+        return [(h, (n >> h) - 1) for h in range(n.bit_length() - 1, -1, -1) if n >> h & 1]
+
+    def _bag(self, peaks: List[Tuple[int, int]]) -> bytes:
+        acc = self._node(*peaks[-1])
+        for h, k in reversed(peaks[:-1]):
+            acc = node_hash(self._node(h, k), acc)
+        return acc
+
+    def root(self, n: Optional[int] = None) -> bytes:
+        n = len(self) if n is None else n
+        if n == 0:
+            return EMPTY_ROOT
+        return self._bag(self._peaks(n))
+
+    def proof(self, i: int, n: Optional[int] = None) -> List[Tuple[bytes, str]]:
+        """Inclusion path for leaf i against root(n)."""
+        n = len(self) if n is None else n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        path = []
+        h, k = 0, i
+        while not (n >> h & 1 and k == (n >> h) - 1):
+            sib = k ^ 1
+            path.append((self._node(h, sib), "left" if sib < k else "right"))
+            k >>= 1
+            h += 1
+        peaks = self._peaks(n)
+        j = peaks.index((h, k))
+        if j < len(peaks) - 1:
+            path.append((self._bag(peaks[j + 1:]), "right"))
+        for ph, pk in reversed(peaks[:j]):
+            path.append((self._node(ph, pk), "left"))
+        return path
+
+
+def verify(leaf: bytes, path: List[Tuple[bytes, str]], root: bytes) -> bool:
+    h = leaf
+    for sib, side in path:
+        h = node_hash(sib, h) if side == "left" else node_hash(h, sib)
+    return h == root
+
+
+class AuctionMerkle:
+    """Per-auction accumulators: audit events while OPEN, fills once cleared."""
+    __slots__ = ("events", "fills", "rfqLeaves", "sealedAt")
+
+    def __init__(self):
+        self.events = Accumulator()
+        self.fills: Optional[Accumulator] = None
+        self.rfqLeaves: Dict[str, List[int]] = {}   # rfq_id -> event leaf indices
+        self.sealedAt: Optional[int] = None         # event count covered by the root
+
+    def add_event(self, event: dict):
+        if self.sealedAt is not None:
+            return
+        rfq_id = event["payload"].get("rfqId")
+        if rfq_id is not None:
+            self.rfqLeaves.setdefault(rfq_id, []).append(len(self.events))
+        self.events.append(leaf_hash(event))
+
+    def seal(self):
+        self.sealedAt = len(self.events)
+
+    def root(self) -> bytes:
+        return node_hash(self.events.root(self.sealedAt), self.fills.root())
+
+
+# -----------------------------
+# Fill hashing (off the close path)
+# -----------------------------
+def hash_fills(columns: tuple) -> List[bytearray]:
+    """Worker entry point: builds the fills accumulator from OrderBook.fill_columns()."""
+    fills = fill_dicts(*columns)
+    leaves = b"".join([_sha256(b"\x00" + canonical(f)).digest() for f in fills])
+    return Accumulator.build(leaves).levels
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def submit_fills(columns: tuple) -> Future:
+    """Hashes fills inline when small, otherwise in a worker process (no GIL contention)."""
+    global _pool
+    if len(columns[0]) < INLINE_FILLS:
+        fut = Future()
+        fut.set_result(hash_fills(columns))
+        return fut
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool.submit(hash_fills, columns)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
@@ -0,0 +1,247 @@
+# metrics.py
+"""
+In-process metrics with a Prometheus text exposition.
+
+Counters and gauges are O(1) to update; histograms are HDR-style log-linear
+bucket arrays (16 sub-buckets per power of two, <= 6.25% relative error) so
+recording is O(1) and quantiles are read out at scrape time. Gauges can also
+be callbacks evaluated only at scrape, for values derived from state.
+
+No dependencies on the rest of the backend, so any module can import it.
+"""
+import abc
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+SUB_BITS = 4
+SUB = 1 << SUB_BITS
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+QUANTILE_NAMES = ("p50", "p90", "p99", "p999")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+REGISTRY: List["_Metric"] = []
+
+
+def _key(labels: dict) -> Labels:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _fmt_labels(key: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> str:
+        return f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.kind}\n" + "".join(self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, n: float = 1, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_fmt_labels(k)} {v}\n" for k, v in list(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help)
+        self._value = 0.0
+        self._fn = fn
+
+    def set(self, v: float):
+        self._value = v
+
+    def inc(self, n: float = 1):
+        with self._lock:
+            self._value += n
+
+    def dec(self, n: float = 1):
+        self.inc(-n)
+
+    def value(self) -> float:
+        return self._fn() if self._fn else self._value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {self.value()}\n"]
+
+
+class Hdr:
+    """Log-linear histogram over non-negative integers (e.g. microseconds)."""
+    __slots__ = ("counts", "total", "n", "max")
+
+    def __init__(self, max_bits: int = 40):
+        self.counts = [0] * ((max_bits - SUB_BITS + 1) * SUB)
+        self.total = 0
+        self.n = 0
+        self.max = 0
+
+    @staticmethod
+    def index(v: int) -> int:
+        if v < 2 * SUB:
+            return v
+        e = v.bit_length() - SUB_BITS - 1
+        return SUB * (e + 1) + (v >> e) - SUB
+
+    @staticmethod
+    def upper(i: int) -> int:
+        """Largest value mapped to bucket i."""
+        if i < 2 * SUB:
+            return i
+        e = i // SUB - 1
+        return ((i % SUB + SUB + 1) << e) - 1
+
+    def record(self, v: int):
+        i = self.index(v)
+        if i >= len(self.counts):
+            i = len(self.counts) - 1
+        self.counts[i] += 1
+        self.total += v
+        self.n += 1
+        if v > self.max:
+            self.max = v
+
+    def quantile(self, q: float) -> int:
+        if not self.n:
+            return 0
+        rank = max(1, int(q * self.n + 0.5))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self.upper(i), self.max)
+        return self.max
+
+
+class Histogram(_Metric):
+    """Latency histogram in seconds, stored as HDR microsecond buckets; exported as a summary."""
+    kind = "summary"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._hdrs: Dict[Labels, Hdr] = {}
+
+    def observe(self, seconds: float, **labels):
+        key = _key(labels)
+        us = int(seconds * 1e6) if seconds > 0 else 0
+        with self._lock:
+            h = self._hdrs.get(key)
+            if h is None:
+                h = self._hdrs[key] = Hdr()
+            h.record(us)
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        with self._lock:
+            h = self._hdrs.get(_key(labels))
+            if h is None:
+                return {"count": 0}
+            return {
+                "count": h.n,
+                "mean": h.total / h.n / 1e6,
+                **{name: h.quantile(q) / 1e6 for q, name in zip(QUANTILES, QUANTILE_NAMES)},
+                "max": h.max / 1e6,
+            }
+
+    def samples(self) -> List[str]:
+        out = []
+        with self._lock:
+            for key, h in self._hdrs.items():
+                for q in QUANTILES:
+                    out.append(f"{self.name}{_fmt_labels(key, ('quantile', str(q)))} {h.quantile(q) / 1e6}\n")
+                out.append(f"{self.name}_sum{_fmt_labels(key)} {h.total / 1e6}\n")
+                out.append(f"{self.name}_count{_fmt_labels(key)} {h.n}\n")
+        return out
+
+
+def render() -> str:
+    return "".join(m.render() for m in REGISTRY)
+
+
+# -----------------------------
+# Process memory
+# -----------------------------
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# -----------------------------
+# ASGI latency middleware
+# -----------------------------
+class LatencyMiddleware:
+    """Records time to response start per (method, handler, status); handler is the endpoint's name."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                http_requests.observe(
+                    time.perf_counter() - t0,
+                    method=scope["method"],
+                    handler=route.name if route is not None else "unmatched",
+                    status=str(message["status"]),
+                )
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
+
+
+# -----------------------------
+# Engine metrics
+# -----------------------------
+http_requests = Histogram("bondmatch_http_request_seconds", "Time to response start per endpoint")
+rfq_events = Counter("bondmatch_rfq_events_total", "RFQ mutations accepted via the API, by action")
+auctions_closed = Counter("bondmatch_auctions_closed_total", "Auctions closed and cleared")
+auctions_archived = Counter("bondmatch_auctions_archived_total", "Closed auctions moved to the on-disk archive")
+fills_total = Counter("bondmatch_fills_total", "Fills produced by clearing")
+clearing_seconds = Histogram("bondmatch_clearing_seconds", "Uniform-price clearing time per auction")
+scheduler_lag = Histogram("bondmatch_scheduler_lag_seconds", "Delay between an auction's tCloseMs and its close firing")
+book_bytes = Gauge("bondmatch_book_column_bytes", "Bytes allocated to order book columns")
+rss = Gauge("bondmatch_process_resident_bytes", "Resident set size of the process", rss_bytes)
+pricing_requests = Counter("bondmatch_pricing_requests_total", "Model price refreshes requested (before coalescing)")
+pricing_model_seconds = Histogram("bondmatch_pricing_model_seconds", "Price provider latency per coalesced batch")
@@ -0,0 +1,60 @@
+# micro_range.py
+"""
+Lazy micro-bonds of a split bond.
+
+A split is stored as a range (parent id, count, unit value) instead of one
+dict per unit: micro-bond ids are derived from the parent and the unit index
+(`{parentId}-m{i}`), per-unit status lives in a sparse override map (units
+are "available" unless overridden), and a micro-bond only becomes a dict when
+it is fetched. Splitting is O(1) whatever the number of parts.
+"""
+from typing import Dict, List, Optional
+
+DEFAULT_STATUS = "available"
+SEP = "-m"
+
+
+def micro_id(parent_id: str, i: int) -> str:
+    return f"{parent_id}{SEP}{i}"
+
+
+def parse_micro_id(instrument_id: str):
+    """Returns (parent_id, index) for a well-formed micro-bond id, else None."""
+    parent_id, sep, idx = instrument_id.rpartition(SEP)
+    if not sep or not idx.isdigit() or (len(idx) > 1 and idx[0] == "0"):
+        return None
+    return parent_id, int(idx)
+
+
+class MicroRange:
+    __slots__ = ("parentId", "count", "unitValue", "overrides")
+
+    def __init__(self, parent_id: str, count: int, unit_value: float):
+        self.parentId = parent_id
+        self.count = count
+        self.unitValue = unit_value
+        self.overrides: Dict[int, str] = {}
+
+    def __contains__(self, i: int) -> bool:
+        return 0 <= i < self.count
+
+    def status(self, i: int) -> str:
+        return self.overrides.get(i, DEFAULT_STATUS)
+
+    def set_status(self, i: int, status: str):
+        if status == DEFAULT_STATUS:
+            self.overrides.pop(i, None)
+        else:
+            self.overrides[i] = status
+
+    def get(self, i: int) -> dict:
+        return {
+            "id": micro_id(self.parentId, i),
+            "parentId": self.parentId,
+            "value": self.unitValue,
+            "status": self.status(i),
+        }
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        stop = self.count if limit is None else min(self.count, offset + limit)
+        return [self.get(i) for i in range(max(offset, 0), stop)]
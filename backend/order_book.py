@@ -0,0 +1,305 @@
+# order_book.py
+"""
+Columnar per-auction order book.
+
+Hot numeric fields live in typed NumPy columns that grow geometrically;
+ids/userIds are plain lists and rarely-set string/object fields live in
+sparse side tables keyed by row. Clearing and list endpoints read the
+columns directly.
+"""
+import sys
+import time
+from typing import Optional, Dict, Any, List, Iterable
+import numpy as np
+
+import metrics
+from quote_book import QuoteBook
+
+SIDES = ("BUY", "SELL")
+STATUSES = ("OPEN", "CANCELLED", "FILLED", "PARTIALLY_FILLED", "UNFILLED")
+TIFS = ("GTC", "AON", "IOC")
+
+SIDE_CODE = {s: i for i, s in enumerate(SIDES)}
+STATUS_CODE = {s: i for i, s in enumerate(STATUSES)}
+TIF_CODE = {s: i for i, s in enumerate(TIFS)}
+
+BUY = SIDE_CODE["BUY"]
+SELL = SIDE_CODE["SELL"]
+OPEN = STATUS_CODE["OPEN"]
+CANCELLED = STATUS_CODE["CANCELLED"]
+FILLED = STATUS_CODE["FILLED"]
+PARTIALLY_FILLED = STATUS_CODE["PARTIALLY_FILLED"]
+UNFILLED = STATUS_CODE["UNFILLED"]
+
+# column name -> dtype; NaN encodes None in float columns
+COLUMNS = {
+    "side": np.int8,
+    "status": np.int8,
+    "tif": np.int8,
+    "qty": np.float64,
+    "limitPrice": np.float64,
+    "filledQty": np.float64,
+    "avgFillPrice": np.float64,
+    "fairPrice": np.float64,
+    "bandLow": np.float64,
+    "bandHigh": np.float64,
+    "ts": np.int64,
+    "seq": np.int64,
+    "version": np.int64,   # book version of the row's last change
+}
+# sparse per-row fields: explanation, quotes, acceptedQuote, tsCancelled, tsModified
+SIDE_TABLES = ("explanation", "quotes", "acceptedQuote", "tsCancelled", "tsModified")
+
+INITIAL_CAPACITY = 16
+ROW_BYTES = sum(np.dtype(t).itemsize for t in COLUMNS.values())
+
+
+def _opt(x: float) -> Optional[float]:
+    return None if x != x else x
+
+
+class OrderBook:
+    def __init__(self, auction_id: str, instrument_id: str, parent_id: str, micro_id: Optional[str]):
+        self.auctionId = auction_id
+        self.instrumentId = instrument_id
+        self.parentId = parent_id
+        self.microId = micro_id
+        self.size = 0
+        self.version = 0   # bumped by every mutation of the auction or its rows (see touch)
+        self.capacity = INITIAL_CAPACITY
+        self.cols: Dict[str, np.ndarray] = {k: np.empty(INITIAL_CAPACITY, dtype=t) for k, t in COLUMNS.items()}
+        metrics.book_bytes.inc(INITIAL_CAPACITY * ROW_BYTES)
+        self.ids: List[str] = []
+        self.userIds: List[str] = []
+        self.index: Dict[str, int] = {}   # rfq_id -> row
+        self.extra: Dict[str, Dict[int, Any]] = {k: {} for k in SIDE_TABLES}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def col(self, name: str) -> np.ndarray:
+        """Live view of a column (first `size` rows)."""
+        return self.cols[name][: self.size]
+
+    def _grow(self, need: int):
+        cap = self.capacity
+        while cap < need:
+            cap *= 2
+        for k, arr in self.cols.items():
+            new = np.empty(cap, dtype=arr.dtype)
+            new[: self.size] = arr[: self.size]
+            self.cols[k] = new
+        metrics.book_bytes.inc((cap - self.capacity) * ROW_BYTES)
+        self.capacity = cap
+
+    def append(
+        self,
+        rfq_id: str,
+        *,
+        userId: str,
+        side: str,
+        qty: float,
+        limitPrice: Optional[float],
+        timeInForce: str,
+        ts: int,
+        seq: int,
+        fairPrice: Optional[float] = None,
+        bandLow: Optional[float] = None,
+        bandHigh: Optional[float] = None,
+        explanation: Optional[str] = None,
+    ) -> int:
+        row = self.size
+        if row >= self.capacity:
+            self._grow(row + 1)
+        c = self.cols
+        nan = float("nan")
+        c["side"][row] = SIDE_CODE[side]
+        c["status"][row] = OPEN
+        c["tif"][row] = TIF_CODE[timeInForce]
+        c["qty"][row] = qty
+        c["limitPrice"][row] = nan if limitPrice is None else limitPrice
+        c["filledQty"][row] = 0.0
+        c["avgFillPrice"][row] = nan
+        c["fairPrice"][row] = nan if fairPrice is None else fairPrice
+        c["bandLow"][row] = nan if bandLow is None else bandLow
+        c["bandHigh"][row] = nan if bandHigh is None else bandHigh
+        c["ts"][row] = ts
+        c["seq"][row] = seq
+        self.version += 1
+        c["version"][row] = self.version
+        self.ids.append(rfq_id)
+        self.userIds.append(sys.intern(userId))
+        self.index[rfq_id] = row
+        if explanation is not None:
+            self.extra["explanation"][row] = sys.intern(explanation)
+        self.size = row + 1
+        return row
+
+    def append_many(
+        self,
+        rfq_ids: List[str],
+        *,
+        userIds: List[str],
+        side: List[str],
+        qty: List[float],
+        limitPrice: List[Optional[float]],
+        timeInForce: List[str],
+        ts: int,
+        seq: List[int],
+        fairPrice: List[Optional[float]],
+        bandLow: List[Optional[float]],
+        bandHigh: List[Optional[float]],
+        explanation: List[Optional[str]],
+    ) -> range:
+        """Bulk append: one slice assignment per column. Returns the new rows."""
+        n = len(rfq_ids)
+        start = self.size
+        if start + n > self.capacity:
+            self._grow(start + n)
+        c = self.cols
+        rows = slice(start, start + n)
+        c["side"][rows] = [SIDE_CODE[s] for s in side]
+        c["status"][rows] = OPEN
+        c["tif"][rows] = [TIF_CODE[t] for t in timeInForce]
+        c["qty"][rows] = qty
+        c["filledQty"][rows] = 0.0
+        c["avgFillPrice"][rows] = np.nan
+        # dtype=float maps None -> NaN
+        for name, values in (("limitPrice", limitPrice), ("fairPrice", fairPrice), ("bandLow", bandLow), ("bandHigh", bandHigh)):
+            c[name][rows] = np.array(values, dtype=np.float64)
+        c["ts"][rows] = ts
+        c["seq"][rows] = seq
+        self.version += 1
+        c["version"][rows] = self.version
+        self.ids.extend(rfq_ids)
+        self.userIds.extend(map(sys.intern, userIds))
+        self.index.update(zip(rfq_ids, range(start, start + n)))
+        ex = self.extra["explanation"]
+        for i, e in enumerate(explanation):
+            if e is not None:
+                ex[start + i] = sys.intern(e)
+        self.size = start + n
+        return range(start, start + n)
+
+    def touch(self, rows=None) -> int:
+        """
+        Bumps the book version after a mutation; `rows` (row, slice or index
+        array) are stamped with it as their own version. Returns the new version.
+        """
+        self.version += 1
+        if rows is not None:
+            self.cols["version"][rows] = self.version
+        return self.version
+
+    def rows_for_user(self, user_id: str) -> List[int]:
+        return [i for i, u in enumerate(self.userIds) if u == user_id]
+
+    def to_dicts(self, rows: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Serializes rows (default: all) to API dicts, column-at-a-time."""
+        if rows is None:
+            rows = range(self.size)
+        rows = list(rows)
+        cols = {k: self.cols[k][rows].tolist() for k in COLUMNS}
+        ex = self.extra
+        out = []
+        now = int(time.time() * 1000)   # quotes past their expiry are hidden until evicted
+        for i, r in enumerate(rows):
+            qb = ex["quotes"].get(r)
+            d = {
+                "id": self.ids[r],
+                "auctionId": self.auctionId,
+                "instrumentId": self.instrumentId,
+                "parentId": self.parentId,
+                "microId": self.microId,
+                "userId": self.userIds[r],
+                "side": SIDES[cols["side"][i]],
+                "qty": cols["qty"][i],
+                "limitPrice": _opt(cols["limitPrice"][i]),
+                "timeInForce": TIFS[cols["tif"][i]],
+                "status": STATUSES[cols["status"][i]],
+                "ts": cols["ts"][i],
+                "seq": cols["seq"][i],
+                "filledQty": cols["filledQty"][i],
+                "avgFillPrice": _opt(cols["avgFillPrice"][i]),
+                "fairPrice": _opt(cols["fairPrice"][i]),
+                "bandLow": _opt(cols["bandLow"][i]),
+                "bandHigh": _opt(cols["bandHigh"][i]),
+                "explanation": ex["explanation"].get(r),
+                "quotes": qb.to_list(now) if qb else [],
+                "bestQuote": qb.best(now) if qb else None,
+                "acceptedQuote": ex["acceptedQuote"].get(r),
+                "version": cols["version"][i],
+            }
+            if r in ex["tsCancelled"]:
+                d["ts_cancelled"] = ex["tsCancelled"][r]
+            if r in ex["tsModified"]:
+                d["ts_modified"] = ex["tsModified"][r]
+            out.append(d)
+        return out
+
+    # -----------------------------
+    # Archive support (retention.py)
+    # -----------------------------
+    def to_archive(self):
+        """(JSON-able meta, {column: array trimmed to size}) describing the whole book."""
+        ex = self.extra
+        meta = {
+            "auctionId": self.auctionId,
+            "instrumentId": self.instrumentId,
+            "parentId": self.parentId,
+            "microId": self.microId,
+            "version": self.version,
+            "ids": self.ids,
+            "userIds": self.userIds,
+            "extra": {
+                **{k: {str(r): v for r, v in ex[k].items()} for k in SIDE_TABLES if k != "quotes"},
+                "quotes": {str(r): [q for _, q in qb.dealers.values()] for r, qb in ex["quotes"].items()},
+            },
+        }
+        return meta, {k: self.col(k).copy() for k in COLUMNS}
+
+    @classmethod
+    def from_archive(cls, meta: Dict[str, Any], cols: Dict[str, np.ndarray]) -> "OrderBook":
+        """Read-only book rebuilt from to_archive() output (not counted in book_bytes)."""
+        book = cls.__new__(cls)
+        book.auctionId = meta["auctionId"]
+        book.instrumentId = meta["instrumentId"]
+        book.parentId = meta["parentId"]
+        book.microId = meta["microId"]
+        book.version = meta["version"]
+        book.ids = meta["ids"]
+        book.userIds = meta["userIds"]
+        book.size = book.capacity = len(book.ids)
+        book.cols = cols
+        book.index = {rfq_id: row for row, rfq_id in enumerate(book.ids)}
+        book.extra = {k: {int(r): v for r, v in meta["extra"].get(k, {}).items()} for k in SIDE_TABLES}
+        side = cols["side"]
+        for r, quotes in book.extra["quotes"].items():
+            qb = book.extra["quotes"][r] = QuoteBook(SIDES[side[r]])
+            for q in quotes:
+                qb.put(q)
+        return book
+
+    def fill_columns(self):
+        """(rfqIds, userIds, side codes, qty, price) for rows with filledQty > 0, in row order."""
+        filled = self.col("filledQty")
+        rows = np.flatnonzero(filled > 0)
+        ids, users = self.ids, self.userIds
+        return (
+            [ids[r] for r in rows.tolist()],
+            [users[r] for r in rows.tolist()],
+            self.col("side")[rows],
+            filled[rows],
+            self.col("avgFillPrice")[rows],
+        )
+
+    def fills(self) -> List[Dict[str, Any]]:
+        """Executions recorded by clearing (rows with filledQty > 0)."""
+        return fill_dicts(*self.fill_columns())
+
+
+def fill_dicts(rfq_ids, user_ids, side, qty, price) -> List[Dict[str, Any]]:
+    return [
+        {"rfqId": r, "userId": u, "side": SIDES[s], "qty": q, "price": p}
+        for r, u, s, q, p in zip(rfq_ids, user_ids, side.tolist(), qty.tolist(), price.tolist())
+    ]
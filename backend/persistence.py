@@ -0,0 +1,347 @@
+# persistence.py
+"""
+Write-ahead log + snapshots for the in-memory state in state.py.
+
+Every mutation goes through commit(op, rec): the registered applier for `op`
+mutates state and the record is appended to an in-memory WAL buffer. A
+flusher thread writes the buffer and fsyncs it every FLUSH_INTERVAL_MS
+(group commit), so order entry never waits on the disk; at most one flush
+interval of acknowledged writes can be lost on a crash.
+
+Records are length-prefixed and CRC-checked:  <u32 len><u32 crc32><pickle (lsn, op, rec)>
+Appliers must be deterministic given `rec` (ids and timestamps are decided by
+the caller and recorded), so recovery is: load the newest snapshot, then
+re-apply every WAL record with a higher LSN.
+
+Appliers are also all-or-nothing: callers validate the request before
+commit(), and an applier does everything that can fail (lookups, clearing)
+before its first mutation. A record is logged only after its applier returns,
+so an applier that raises must leave state as it found it, or memory and the
+WAL would disagree after a restart.
+
+Snapshots fork the process while new commits are briefly held at a gate; the
+child pickles the copy-on-write state and exits, so the parent never pauses
+for serialization. The WAL is rotated at each snapshot and older segments are
+deleted once the snapshot is durable.
+
+Enabled by setting BONDMATCH_DATA_DIR; without it commit() just applies.
+"""
+import glob
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+import state
+import rfq_store
+from rfq_index import rfq_index
+import summaries
+
+HEADER = struct.Struct("<II")
+FLUSH_INTERVAL_MS = int(os.environ.get("BONDMATCH_WAL_FLUSH_MS", "5"))
+SNAPSHOT_INTERVAL_S = int(os.environ.get("BONDMATCH_SNAPSHOT_INTERVAL_S", "300"))
+SNAPSHOT_EVERY_RECORDS = int(os.environ.get("BONDMATCH_SNAPSHOT_EVERY", "250000"))
+
+# State collections captured by a snapshot (restored in place: other modules hold references).
+# state.rfqs is not stored: its handles are rebuilt from the order books.
+SNAPSHOT_DICTS = ("bonds", "micro_ranges", "instruments", "auctions", "open_auctions", "auction_summaries", "order_books", "lobs", "instrument_quotes", "archived_auctions", "archived_rfqs", "totals", "merkle_trees", "orders", "fills")
+
+APPLIERS: Dict[str, Callable[[dict], Any]] = {}
+
+log = logging.getLogger("persistence")
+
+
+def applier(op: str):
+    """Registers the state mutation for a WAL op (deterministic, all-or-nothing)."""
+    def deco(fn):
+        APPLIERS[op] = fn
+        return fn
+    return deco
+
+
+# -----------------------------
+# Commit gate
+# -----------------------------
+class Gate:
+    """Shared/exclusive gate: commits enter shared, the snapshot cut enters exclusive."""
+
+    def __init__(self):
+        self._cv = threading.Condition(threading.Lock())
+        self._active = 0
+        self._closed = False
+
+    def enter(self):
+        with self._cv:
+            while self._closed:
+                self._cv.wait()
+            self._active += 1
+
+    def exit(self):
+        with self._cv:
+            self._active -= 1
+            if self._active == 0 and self._closed:
+                self._cv.notify_all()
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            while self._active:
+                self._cv.wait()
+
+    def open(self):
+        with self._cv:
+            self._closed = False
+            self._cv.notify_all()
+
+
+# -----------------------------
+# WAL
+# -----------------------------
+def _segment_path(data_dir: str, first_lsn: int) -> str:
+    return os.path.join(data_dir, f"wal-{first_lsn:020d}.log")
+
+
+def _snapshot_path(data_dir: str, lsn: int) -> str:
+    return os.path.join(data_dir, f"snapshot-{lsn:020d}.pkl")
+
+
+class WriteAheadLog:
+    def __init__(self, data_dir: str, next_lsn: int):
+        self.data_dir = data_dir
+        self.lsn = next_lsn - 1
+        self._buf = bytearray()
+        self._lock = threading.Lock()      # guards lsn + buffer (held for microseconds)
+        self._io_lock = threading.Lock()   # guards the file (held across write + fsync)
+        self._file = open(_segment_path(data_dir, next_lsn), "ab")
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._run, name="wal-flusher", daemon=True)
+        self._flusher.start()
+
+    def append(self, op: str, rec: dict) -> int:
+        with self._lock:
+            self.lsn += 1
+            payload = pickle.dumps((self.lsn, op, rec), protocol=5)
+            self._buf += HEADER.pack(len(payload), zlib.crc32(payload))
+            self._buf += payload
+            return self.lsn
+
+    def flush(self):
+        """Group commit: everything appended so far is written with one fsync."""
+        with self._io_lock:
+            with self._lock:
+                buf, self._buf = self._buf, bytearray()
+            if buf:
+                self._file.write(buf)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def rotate(self) -> int:
+        """Flushes and starts a new segment; returns the last LSN of the old one.
+        Callers hold the commit gate closed, so no append races the switch."""
+        with self._io_lock:
+            with self._lock:
+                buf, self._buf = self._buf, bytearray()
+                lsn = self.lsn
+            self._file.write(buf)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = open(_segment_path(self.data_dir, lsn + 1), "ab")
+            return lsn
+
+    def _run(self):
+        while not self._stop.wait(FLUSH_INTERVAL_MS / 1000):
+            try:
+                self.flush()
+            except OSError:
+                log.exception("WAL flush failed")
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
+        with self._io_lock:
+            self._file.close()
+
+
+def read_segment(path: str):
+    """Yields (lsn, op, rec) from one segment; stops at a torn or corrupt tail."""
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    end = len(data)
+    while pos + HEADER.size <= end:
+        size, crc = HEADER.unpack_from(data, pos)
+        start = pos + HEADER.size
+        if start + size > end:
+            break
+        payload = data[start:start + size]
+        if zlib.crc32(payload) != crc:
+            log.warning("corrupt WAL record in %s at offset %d; ignoring tail", path, pos)
+            break
+        yield pickle.loads(payload)
+        pos = start + size
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+_gate = Gate()
+_wal: Optional[WriteAheadLog] = None
+_snapshot_lsn = 0
+_last_snapshot_at = 0.0
+_snapshot_thread: Optional[threading.Thread] = None
+_snapshot_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return _wal is not None
+
+
+def commit(op: str, rec: dict):
+    """Applies a mutation and logs it. Returns whatever the applier returns; if it raises, nothing is logged."""
+    if _wal is None:
+        return APPLIERS[op](rec)
+    _gate.enter()
+    try:
+        result = APPLIERS[op](rec)
+        _wal.append(op, rec)
+        return result
+    finally:
+        _gate.exit()
+
+
+def _capture() -> dict:
+    return {
+        "dicts": {name: getattr(state, name) for name in SNAPSHOT_DICTS},
+        "audit_events": state.audit_events,
+    }
+
+
+def _restore(snap: dict):
+    for name, value in snap["dicts"].items():
+        target = getattr(state, name)
+        target.clear()
+        target.update(value)
+    state.audit_events.load(snap["audit_events"])
+    state.rfqs.clear()
+    for book in state.order_books.values():
+        for row, rfq_id in enumerate(book.ids):
+            state.rfqs[rfq_id] = rfq_store.Rfq(book, row)
+    rfq_index.rebuild(state.rfqs.values())
+    summaries.rebuild()
+
+
+def _write_snapshot(path: str, lsn: int):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"lsn": lsn, **_capture()}, f, protocol=5)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def snapshot():
+    """Takes a snapshot at the current LSN and trims WAL segments it covers."""
+    global _snapshot_lsn, _last_snapshot_at
+    if _wal is None:
+        return
+    with _snapshot_lock:
+        _gate.close()
+        try:
+            lsn = _wal.rotate()
+            path = _snapshot_path(_wal.data_dir, lsn)
+            if hasattr(os, "fork"):
+                pid = os.fork()
+                if pid == 0:
+                    # Child: the forked address space is a consistent copy at `lsn`
+                    code = 0
+                    try:
+                        _write_snapshot(path, lsn)
+                    except BaseException:
+                        code = 1
+                    os._exit(code)
+            else:
+                pid = 0
+                _write_snapshot(path, lsn)
+        finally:
+            _gate.open()
+        if pid:
+            _, status = os.waitpid(pid, 0)
+            if os.waitstatus_to_exitcode(status) != 0:
+                log.error("snapshot child failed (lsn=%d)", lsn)
+                return
+        _prune(_wal.data_dir, lsn)
+        _snapshot_lsn = lsn
+        _last_snapshot_at = time.time()
+        log.info("snapshot written at lsn=%d", lsn)
+
+
+def _prune(data_dir: str, lsn: int):
+    for p in glob.glob(os.path.join(data_dir, "snapshot-*.pkl")):
+        if p != _snapshot_path(data_dir, lsn):
+            os.remove(p)
+    for p in glob.glob(os.path.join(data_dir, "wal-*.log")):
+        if int(os.path.basename(p)[4:-4]) <= lsn:
+            os.remove(p)
+
+
+def _snapshot_loop():
+    while _wal is not None:
+        time.sleep(1)
+        wal = _wal
+        if wal is None:
+            return
+        due = time.time() - _last_snapshot_at >= SNAPSHOT_INTERVAL_S
+        if wal.lsn > _snapshot_lsn and (due or wal.lsn - _snapshot_lsn >= SNAPSHOT_EVERY_RECORDS):
+            try:
+                snapshot()
+            except Exception:
+                log.exception("snapshot failed")
+
+
+def recover(data_dir: str) -> int:
+    """Loads the newest snapshot and replays the WAL tail. Returns the last LSN."""
+    last = 0
+    snaps = sorted(glob.glob(os.path.join(data_dir, "snapshot-*.pkl")))
+    if snaps:
+        with open(snaps[-1], "rb") as f:
+            snap = pickle.load(f)
+        _restore(snap)
+        last = snap["lsn"]
+    base = last
+    replayed = 0
+    for seg in sorted(glob.glob(os.path.join(data_dir, "wal-*.log"))):
+        for lsn, op, rec in read_segment(seg):
+            if lsn <= last:
+                continue
+            APPLIERS[op](rec)
+            last = lsn
+            replayed += 1
+    rfq_store.reset_seq(max((int(b.col("seq").max()) for b in state.order_books.values() if len(b)), default=-1) + 1)
+    log.info("recovered snapshot lsn=%d + %d WAL records (lsn=%d)", base, replayed, last)
+    return last
+
+
+def open_data_dir(data_dir: str):
+    """Recovers state from `data_dir` and starts logging new commits to it."""
+    global _wal, _snapshot_lsn, _last_snapshot_at, _snapshot_thread
+    os.makedirs(data_dir, exist_ok=True)
+    last = recover(data_dir)
+    snaps = sorted(glob.glob(os.path.join(data_dir, "snapshot-*.pkl")))
+    _snapshot_lsn = int(os.path.basename(snaps[-1])[9:-4]) if snaps else 0
+    _last_snapshot_at = time.time()
+    _wal = WriteAheadLog(data_dir, last + 1)
+    _snapshot_thread = threading.Thread(target=_snapshot_loop, name="snapshotter", daemon=True)
+    _snapshot_thread.start()
+
+
+def close():
+    global _wal
+    if _wal is not None:
+        wal, _wal = _wal, None
+        wal.close()
@@ -0,0 +1,288 @@
+# pricing.py
+"""
+Fair-price engine.
+
+A fair price depends only on (faceValue, side, size bucket, micro flag), so
+single quotes come from a small LRU cache keyed on exactly that. Re-pricing
+many RFQs reduces their NumPy columns to the few distinct keys (row_keys),
+reads each key once from the same cache (cached_quotes) and spreads the
+quotes back over the rows (row_quotes), so a reprice serves model prices
+exactly like order entry does.
+
+Quotes are keyed on faceValue, so a changed faceValue never hits a stale
+entry; invalidate() drops the old ones early (or everything, e.g. after a
+model change).
+
+Model prices come from a pluggable async PriceProvider (LocalModel is the
+in-process stand-in). Order entry never waits for it: lookup() answers from
+the cache, or the local formula on a miss, and hands back the key when the
+entry is not a fresh model price. The caller queues a refresh on `service`,
+which runs on its own event loop thread, coalesces requests for the same key
+(including ones already in flight) and sends everything queued within
+BONDMATCH_PRICE_BATCH_MS to the provider as one batch. Results are written to
+the cache and passed to the registered sink, grouped per auction.
+"""
+import abc
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+import numpy as np
+
+from order_book import SIDES
+
+BAND = 0.50            # 50p band for demo
+MICRO_BIAS = -0.05     # illiquidity tiny discount
+SIZE_BIAS = -0.02      # larger clip slightly tighter/worse
+LARGE_FRACTION = 0.1   # "large" = qty above this fraction of faceValue
+
+EXPLANATIONS = {
+    side: f"Near face value with small illiquidity/size adjustments ({side})."
+    for side in ("BUY", "SELL")
+}
+
+CACHE_SIZE = int(os.environ.get("BONDMATCH_PRICE_CACHE", "4096"))
+MODEL_TTL_S = float(os.environ.get("BONDMATCH_PRICE_TTL_S", "30"))
+BATCH_WINDOW_S = float(os.environ.get("BONDMATCH_PRICE_BATCH_MS", "5")) / 1000
+MODEL_DELAY_S = float(os.environ.get("BONDMATCH_PRICE_MODEL_DELAY_MS", "0")) / 1000
+
+Key = Tuple[float, str, bool, bool]
+Waiter = Tuple[str, str]   # (auction_id, rfq_id) to update when the key is priced
+
+log = logging.getLogger("pricing")
+
+
+def is_large(face_value: float, qty: float) -> bool:
+    return bool(qty) and qty > face_value * LARGE_FRACTION
+
+
+class _LRU:
+    def __init__(self, size: int):
+        self.size = size
+        self._data: "OrderedDict[Key, Tuple[Dict[str, Any], float]]" = OrderedDict()   # (quote, fresh until)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Key) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            v = self._data.get(key)
+            if v is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return v
+
+    def put(self, key: Key, value: Dict[str, Any], fresh_until: float = 0.0):
+        with self._lock:
+            self._data[key] = (value, fresh_until)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, face_value: Optional[float] = None):
+        with self._lock:
+            if face_value is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[0] == face_value]:
+                    del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_cache = _LRU(CACHE_SIZE)
+
+
+def _compute(face_value: float, side: str, large: bool, micro: bool) -> Dict[str, Any]:
+    base = face_value + (MICRO_BIAS if micro else 0.0) + (SIZE_BIAS if large else 0)
+    return {
+        "fairPrice": round(base, 2),
+        "bandLow": round(base - BAND, 2),
+        "bandHigh": round(base + BAND, 2),
+        "explanation": EXPLANATIONS[side],
+    }
+
+
+def key_for(parent_bond: dict, side: str, qty: float, micro: bool) -> Key:
+    fv = float(parent_bond.get("faceValue", 100.0))
+    return (fv, side.upper(), is_large(fv, float(qty or 0)), bool(micro))
+
+
+def lookup(parent_bond: dict, side: str, qty: float, micro: bool) -> Tuple[Dict[str, Any], Optional[Key]]:
+    """
+    Cached quote, never waiting on the model. Returns (fresh dict, key) where
+    key is None when the cached entry is a model price still within its TTL,
+    else the key to pass to service.request().
+    """
+    key = key_for(parent_bond, side, qty, micro)
+    hit = _cache.get(key)
+    if hit is None:
+        value = _compute(*key)
+        _cache.put(key, value)
+        return dict(value), key
+    value, fresh_until = hit
+    return dict(value), (None if fresh_until > time.monotonic() else key)
+
+
+def quote(parent_bond: dict, side: str, qty: float, micro: bool) -> Dict[str, Any]:
+    """Fair price + band for one RFQ (cached). Returns a fresh dict."""
+    return lookup(parent_bond, side, qty, micro)[0]
+
+
+def row_keys(face_value: np.ndarray, side: np.ndarray, qty: np.ndarray, micro: np.ndarray) -> Tuple[List[Key], np.ndarray]:
+    """Distinct keys of equal-length row arrays (side as codes) and each row's index into them."""
+    large = (qty != 0) & (qty > face_value * LARGE_FRACTION)
+    cols = np.stack([face_value, side, large, micro]).astype(np.float64).T
+    uniq, inv = np.unique(cols.reshape(-1, 4), axis=0, return_inverse=True)
+    keys = [(fv, SIDES[int(s)], bool(lg), bool(mc)) for fv, s, lg, mc in uniq.tolist()]
+    return keys, inv.reshape(-1)
+
+
+def cached_quotes(keys: List[Key]) -> Tuple[Dict[Key, Dict[str, Any]], List[Key]]:
+    """lookup() per key: the quote (model price if cached, else the local formula) and the keys to refresh."""
+    now = time.monotonic()
+    quotes: Dict[Key, Dict[str, Any]] = {}
+    stale: List[Key] = []
+    for key in keys:
+        hit = _cache.get(key)
+        if hit is None:
+            value, fresh_until = _compute(*key), 0.0
+            _cache.put(key, value)
+        else:
+            value, fresh_until = hit
+        quotes[key] = value
+        if fresh_until <= now:
+            stale.append(key)
+    return quotes, stale
+
+
+def row_quotes(keys: List[Key], inv: np.ndarray, quotes: Dict[Key, Dict[str, Any]]):
+    """Spreads per-key quotes over rows: (fairPrice, bandLow, bandHigh) arrays and explanations.
+    Keys missing from `quotes` get the local formula."""
+    values = [quotes.get(k) or _compute(*k) for k in keys]
+    cols = [np.array([np.nan if v.get(f) is None else v[f] for v in values], dtype=np.float64)[inv]
+            for f in ("fairPrice", "bandLow", "bandHigh")]
+    explanations = [values[i].get("explanation") for i in inv.tolist()]
+    return cols[0], cols[1], cols[2], explanations
+
+
+def invalidate(face_value: Optional[float] = None):
+    _cache.invalidate(face_value)
+
+
+def cache_stats() -> Dict[str, int]:
+    return {"size": len(_cache), "hits": _cache.hits, "misses": _cache.misses}
+
+
+# -----------------------------
+# Async model backend
+# -----------------------------
+class PriceProvider(abc.ABC):
+    """Model interface: one awaitable call prices a batch of keys (same order)."""
+
+    @abc.abstractmethod
+    async def price(self, keys: List[Key]) -> List[Dict[str, Any]]:
+        ...
+
+
+class LocalModel(PriceProvider):
+    """In-process stand-in: the stub formula, plus BONDMATCH_PRICE_MODEL_DELAY_MS of simulated latency."""
+
+    def __init__(self, delay_s: float = MODEL_DELAY_S):
+        self.delay_s = delay_s
+
+    async def price(self, keys: List[Key]) -> List[Dict[str, Any]]:
+        if self.delay_s:
+            await asyncio.sleep(self.delay_s)
+        return [_compute(*key) for key in keys]
+
+
+class PricingService:
+    def __init__(self, provider: PriceProvider, window_s: float = BATCH_WINDOW_S):
+        self.provider = provider
+        self.window_s = window_s
+        self.sink: Optional[Callable[[str, List[Tuple[str, Dict[str, Any]]]], None]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Loop-thread only
+        self._pending: Dict[Key, List[Waiter]] = {}
+        self._inflight: Dict[Key, List[Waiter]] = {}
+        self._flush_at: Optional[asyncio.TimerHandle] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name="pricing", daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def request(self, wanted: List[Tuple[Key, Waiter]]):
+        """Queues model refreshes from any thread; returns immediately."""
+        if wanted:
+            self._ensure_loop().call_soon_threadsafe(self._enqueue, wanted)
+
+    def _enqueue(self, wanted: List[Tuple[Key, Waiter]]):
+        for key, waiter in wanted:
+            metrics.pricing_requests.inc()
+            waiters = self._inflight.get(key)
+            if waiters is None:
+                waiters = self._pending.setdefault(key, [])
+            waiters.append(waiter)
+        if self._pending and self._flush_at is None:
+            self._flush_at = self._loop.call_later(self.window_s, self._flush)
+
+    def _flush(self):
+        self._flush_at = None
+        batch, self._pending = self._pending, {}
+        self._inflight.update(batch)
+        self._loop.create_task(self._run(list(batch)))
+
+    async def _run(self, keys: List[Key]):
+        t0 = time.perf_counter()
+        try:
+            results = await self.provider.price(keys)
+        except Exception:
+            log.exception("price provider failed for %d keys", len(keys))
+            results = [None] * len(keys)
+        metrics.pricing_model_seconds.observe(time.perf_counter() - t0)
+        fresh_until = time.monotonic() + MODEL_TTL_S
+        by_auction: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for key, value in zip(keys, results):
+            waiters = self._inflight.pop(key, [])
+            if value is None:
+                continue    # left stale: the next lookup asks again
+            _cache.put(key, value, fresh_until)
+            for auction_id, rfq_id in waiters:
+                by_auction.setdefault(auction_id, []).append((rfq_id, value))
+        if self.sink is not None:
+            for auction_id, updates in by_auction.items():
+                # Applying takes auction locks; keep that off the pricing loop
+                self._loop.run_in_executor(None, self.sink, auction_id, updates)
+
+    def shutdown(self):
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+
+
+service = PricingService(LocalModel())
+
+
+def set_provider(provider: PriceProvider):
+    service.provider = provider
+    invalidate()
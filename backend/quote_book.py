@@ -0,0 +1,121 @@
+# quote_book.py
+"""
+Dealer quote books.
+
+Each RFQ with quotes keeps a QuoteBook: the latest quote per dealer (a re-quote
+replaces the dealer's previous one in place) plus a heap ordered by what is
+best for the client, lowest price for a BUY RFQ (dealers offer) and highest
+for a SELL RFQ (dealers bid). Superseded and expired heap entries are skipped
+lazily, so best() is O(1) amortized and a quote is O(log q).
+
+InstrumentQuotes aggregates the same quotes across every RFQ of an instrument
+into one offer heap and one bid heap, so the instrument's best quote is read
+without touching its RFQs. An entry is live while it is the dealer's current
+quote on that RFQ, it has not expired and the RFQ is still OPEN.
+
+Quotes carry an absolute expiresAt; a timer wheel evicts them when it passes.
+"""
+import heapq
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Quote = Dict[str, Any]   # {"dealer", "price", "timestamp", "expiresAt"}
+
+
+class QuoteBook:
+    __slots__ = ("sign", "dealers", "heap", "seq")
+
+    COMPACT_MIN = 16
+
+    def __init__(self, side: str):
+        self.sign = 1 if side == "BUY" else -1
+        self.dealers: Dict[str, Tuple[int, Quote]] = {}   # dealer -> (seq, latest quote)
+        self.heap: List[Tuple[float, int, str]] = []      # (sign * price, seq, dealer)
+        self.seq = 0
+
+    def __len__(self) -> int:
+        return len(self.dealers)
+
+    def put(self, quote: Quote):
+        self.seq += 1
+        self.dealers[quote["dealer"]] = (self.seq, quote)
+        heapq.heappush(self.heap, (self.sign * quote["price"], self.seq, quote["dealer"]))
+        if len(self.heap) > max(self.COMPACT_MIN, 2 * len(self.dealers)):
+            dealers = self.dealers
+            self.heap = [e for e in self.heap if dealers.get(e[2], (None,))[0] == e[1]]
+            heapq.heapify(self.heap)
+
+    def get(self, dealer: str, now_ms: Optional[int] = None) -> Optional[Quote]:
+        """The dealer's current quote (None if absent, or expired at `now_ms`)."""
+        entry = self.dealers.get(dealer)
+        if entry is None or (now_ms is not None and entry[1]["expiresAt"] <= now_ms):
+            return None
+        return entry[1]
+
+    def evict(self, dealer: str, now_ms: int) -> bool:
+        """Drops the dealer's quote if it has expired by `now_ms` (a fresher re-quote stays)."""
+        entry = self.dealers.get(dealer)
+        if entry is None or entry[1]["expiresAt"] > now_ms:
+            return False
+        del self.dealers[dealer]
+        return True
+
+    def best(self, now_ms: int) -> Optional[Quote]:
+        heap = self.heap
+        while heap:
+            _, seq, dealer = heap[0]
+            entry = self.dealers.get(dealer)
+            if entry is not None and entry[0] == seq and entry[1]["expiresAt"] > now_ms:
+                return entry[1]
+            heapq.heappop(heap)   # superseded, evicted or expired (the wheel drops it from `dealers`)
+        return None
+
+    def to_list(self, now_ms: int) -> List[Quote]:
+        """Live quotes, one per dealer, in order of each dealer's first quote."""
+        return [q for _, q in self.dealers.values() if q["expiresAt"] > now_ms]
+
+
+class InstrumentQuotes:
+    __slots__ = ("offers", "bids", "live", "seq")
+
+    COMPACT_MIN = 64
+
+    def __init__(self):
+        self.offers: List[tuple] = []   # (price, seq, rfq_id, dealer, expiresAt): quotes on BUY RFQs
+        self.bids: List[tuple] = []     # (-price, seq, rfq_id, dealer, expiresAt): quotes on SELL RFQs
+        self.live: Dict[Tuple[str, str], int] = {}   # (rfq_id, dealer) -> seq of its current entry
+        self.seq = 0
+
+    def put(self, rfq_id: str, side: str, quote: Quote):
+        self.seq += 1
+        self.live[(rfq_id, quote["dealer"])] = self.seq
+        if side == "BUY":
+            heapq.heappush(self.offers, (quote["price"], self.seq, rfq_id, quote["dealer"], quote["expiresAt"]))
+        else:
+            heapq.heappush(self.bids, (-quote["price"], self.seq, rfq_id, quote["dealer"], quote["expiresAt"]))
+        if len(self.offers) + len(self.bids) > max(self.COMPACT_MIN, 2 * len(self.live)):
+            self._compact()
+
+    def drop(self, rfq_id: str, dealer: str):
+        self.live.pop((rfq_id, dealer), None)
+
+    def _compact(self):
+        live = self.live
+        for heap in (self.offers, self.bids):
+            heap[:] = [e for e in heap if live.get((e[2], e[3])) == e[1]]
+            heapq.heapify(heap)
+
+    def _best(self, heap: List[tuple], sign: int, now_ms: int, is_open: Callable[[str], bool]) -> Optional[Dict[str, Any]]:
+        live = self.live
+        while heap:
+            key, seq, rfq_id, dealer, expires_at = heap[0]
+            if live.get((rfq_id, dealer)) == seq and expires_at > now_ms and is_open(rfq_id):
+                return {"rfqId": rfq_id, "dealer": dealer, "price": sign * key, "expiresAt": expires_at}
+            heapq.heappop(heap)
+        return None
+
+    def best(self, now_ms: int, is_open: Callable[[str], bool]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Best dealer offer (across BUY RFQs) and best dealer bid (across SELL RFQs)."""
+        return {
+            "bestOffer": self._best(self.offers, 1, now_ms, is_open),
+            "bestBid": self._best(self.bids, -1, now_ms, is_open),
+        }
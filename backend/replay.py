@@ -0,0 +1,437 @@
+# replay.py
+"""
+Deterministic audit replay + clearing backtester.
+
+Rebuilds call-auction books from a recorded audit stream (AUCTION_START*,
+RFQ_CREATED / RFQ_MODIFIED / RFQ_CANCELLED, AUCTION_CLEARED) and re-runs
+uniform-price clearing over every auction for a grid of band half-widths x
+allocation rules, reporting clearing prices and fill statistics per run.
+
+Replay is split in two:
+  parse   one pass over the events into a columnar Tape (NumPy arrays of
+          orders, modifies and cancels, each tagged with its position in the
+          stream); save it with --save-tape and later runs skip JSON entirely
+  replay  vectorized over the tape: the last modify of each order wins,
+          cancelled orders drop out, the live orders are grouped by auction
+          with one stable sort. Time priority is the position of an order's
+          last create/modify event, so the same stream always gives the
+          same books whatever the worker count.
+Clearing then runs in a process pool over chunks of auctions.
+
+Continuous auctions (already matched on arrival) are skipped, as are events
+for auctions whose AUCTION_START is not in the stream or predates the full
+payloads. Sources: JSON arrays (e.g. GET /auction/{id}/audit) or NDJSON
+files, a retention archive directory, or a synthetic stream.
+
+    cd backend
+    python replay.py --events audit.json --bands recorded,0.25,1.0 --allocations pro_rata,price_time
+    python replay.py --archive /data/archive --workers 8 --save-tape /tmp/tape.npz
+    python replay.py --tape /tmp/tape.npz --bands 0.1,0.5 --per-auction --out /tmp/backtest.json
+    python replay.py --synthetic 2000000
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from clearing import ALLOCATIONS, auction_band, uniform_price
+from order_book import BUY, SIDE_CODE
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:   # optional: stdlib fallback
+    _loads = json.loads
+
+START_EVENTS = ("AUCTION_START", "AUCTION_START_INLINE")
+RECORDED = "recorded"   # --bands value: each auction's own recorded band
+
+
+# -----------------------------
+# Sources
+# -----------------------------
+def read_events(path: str) -> List[dict]:
+    """A JSON array of audit events, or one event per line (NDJSON)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.lstrip()[:1] == b"[":
+        return _loads(data)
+    return [_loads(line) for line in data.splitlines() if line.strip()]
+
+
+def read_archive(path: str) -> List[dict]:
+    """Audit events of every auction in a retention archive directory (auctions-*.zip)."""
+    events: List[dict] = []
+    for name in sorted(glob.glob(os.path.join(path, "auctions-*.zip"))):
+        with zipfile.ZipFile(name) as zf:
+            for member in zf.namelist():
+                if member.endswith("/audit.json"):
+                    events.extend(_loads(zf.read(member)))
+    return events
+
+
+def synthetic_events(n: int, orders_per_auction: int = 200, seed: int = 7) -> List[dict]:
+    """About `n` audit events: auctions of creates with some modifies/cancels, each closed (no recorded result)."""
+    rnd = random.Random(seed)
+    events: List[dict] = []
+    a = 0
+    while len(events) < n:
+        aid = f"A{a}"
+        a += 1
+        fv = rnd.choice((99.0, 100.0, 101.5))
+        band = auction_band(fv)
+        events.append({"t": a, "type": "AUCTION_START", "auctionId": aid, "payload": {
+            "auctionId": aid, "instrumentId": "SYN", "faceValue": fv, "band": band, "mode": "CALL"}})
+        ids = []
+        for i in range(orders_per_auction):
+            rid = f"{aid}-{i}"
+            ids.append(rid)
+            side = "BUY" if rnd.random() < 0.5 else "SELL"
+            lp = None if rnd.random() < 0.05 else round(fv + rnd.gauss(0.0, 0.3), 2)
+            events.append({"t": a, "type": "RFQ_CREATED", "auctionId": aid, "payload": {
+                "rfqId": rid, "auctionId": aid, "instrumentId": "SYN", "userId": f"u{i % 50}",
+                "side": side, "qty": float(rnd.randint(1, 50) * 100_000), "limitPrice": lp, "timeInForce": "GTC"}})
+            r = rnd.random()
+            if r < 0.1:
+                events.append({"t": a, "type": "RFQ_MODIFIED", "auctionId": aid, "payload": {
+                    "rfqId": rnd.choice(ids), "auctionId": aid, "qty": float(rnd.randint(1, 50) * 100_000),
+                    "limitPrice": round(fv + rnd.gauss(0.0, 0.3), 2)}})
+            elif r < 0.15:
+                events.append({"t": a, "type": "RFQ_CANCELLED", "auctionId": aid, "payload": {
+                    "rfqId": rnd.choice(ids), "auctionId": aid}})
+        events.append({"t": a, "type": "AUCTION_CLOSED", "auctionId": aid, "payload": {"auctionId": aid}})
+    return events
+
+
+# -----------------------------
+# Tape (parse)
+# -----------------------------
+class Tape:
+    """Columnar form of an audit stream: everything replay needs, nothing else."""
+
+    ARRAYS = ("a_ref", "a_band", "a_continuous", "a_cleared", "a_price", "a_matched",
+              "o_auction", "o_side", "o_qty", "o_limit", "o_seq",
+              "m_order", "m_qty", "m_limit", "m_seq", "c_order")
+
+    def __init__(self, auction_ids: List[str], events: int, skipped: int, **arrays: np.ndarray):
+        self.auction_ids = auction_ids
+        self.events = events       # events read
+        self.skipped = skipped     # events for unknown/legacy auctions or orders
+        for k in self.ARRAYS:
+            setattr(self, k, arrays[k])
+
+    @classmethod
+    def from_events(cls, events: Iterable[dict]) -> "Tape":
+        a_index: Dict[str, int] = {}
+        a_ref: List[float] = []
+        a_band: List[float] = []
+        a_cont: List[bool] = []
+        a_cleared: List[bool] = []
+        a_price: List[float] = []
+        a_matched: List[float] = []
+        o_index: Dict[str, int] = {}
+        o_auction: List[int] = []
+        o_side: List[int] = []
+        o_qty: List[float] = []
+        o_limit: List[float] = []
+        o_seq: List[int] = []
+        m_order: List[int] = []
+        m_qty: List[float] = []
+        m_limit: List[float] = []
+        m_seq: List[int] = []
+        c_order: List[int] = []
+        nan = float("nan")
+        skipped = 0
+        seq = -1
+        for seq, e in enumerate(events):
+            kind = e["type"]
+            p = e["payload"]
+            if kind == "RFQ_CREATED":
+                a = a_index.get(p["auctionId"])
+                if a is None or "side" not in p:
+                    skipped += 1
+                    continue
+                o_index[p["rfqId"]] = len(o_auction)
+                o_auction.append(a)
+                o_side.append(SIDE_CODE[p["side"]])
+                o_qty.append(p["qty"])
+                lp = p["limitPrice"]
+                o_limit.append(nan if lp is None else lp)
+                o_seq.append(seq)
+            elif kind == "RFQ_MODIFIED":
+                o = o_index.get(p["rfqId"])
+                if o is None:
+                    skipped += 1
+                    continue
+                m_order.append(o)
+                m_qty.append(p["qty"])
+                lp = p["limitPrice"]
+                m_limit.append(nan if lp is None else lp)
+                m_seq.append(seq)
+            elif kind == "RFQ_CANCELLED":
+                o = o_index.get(p["rfqId"])
+                if o is None:
+                    skipped += 1
+                    continue
+                c_order.append(o)
+            elif kind in START_EVENTS:
+                if "faceValue" not in p:   # written before the payload carried the book inputs
+                    skipped += 1
+                    continue
+                a_index[p["auctionId"]] = len(a_ref)
+                band = p["band"]
+                a_ref.append(band["ref"])
+                a_band.append(band["high"] - band["ref"])
+                a_cont.append(p["mode"] == "CONTINUOUS")
+                a_cleared.append(False)
+                a_price.append(nan)
+                a_matched.append(nan)
+            elif kind == "AUCTION_CLEARED":
+                a = a_index.get(p["auctionId"])
+                if a is not None and "clearingPrice" in p:
+                    price = p["clearingPrice"]
+                    a_cleared[a] = True
+                    a_price[a] = nan if price is None else price
+                    a_matched[a] = p["matchedQty"]
+        return cls(
+            list(a_index), seq + 1, skipped,
+            a_ref=np.array(a_ref, np.float64), a_band=np.array(a_band, np.float64),
+            a_continuous=np.array(a_cont, bool), a_cleared=np.array(a_cleared, bool), a_price=np.array(a_price, np.float64),
+            a_matched=np.array(a_matched, np.float64),
+            o_auction=np.array(o_auction, np.int64), o_side=np.array(o_side, np.int8),
+            o_qty=np.array(o_qty, np.float64), o_limit=np.array(o_limit, np.float64),
+            o_seq=np.array(o_seq, np.int64),
+            m_order=np.array(m_order, np.int64), m_qty=np.array(m_qty, np.float64),
+            m_limit=np.array(m_limit, np.float64), m_seq=np.array(m_seq, np.int64),
+            c_order=np.array(c_order, np.int64),
+        )
+
+    def save(self, path: str):
+        np.savez(path, auction_ids=np.array(self.auction_ids, dtype=str),
+                 counts=np.array([self.events, self.skipped]), **{k: getattr(self, k) for k in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path: str) -> "Tape":
+        with np.load(path, allow_pickle=False) as z:
+            events, skipped = (int(x) for x in z["counts"])
+            return cls(z["auction_ids"].tolist(), events, skipped, **{k: z[k] for k in cls.ARRAYS})
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+class Books:
+    """Live orders at close, grouped by auction: auction i owns rows offsets[i]:offsets[i + 1]."""
+
+    def __init__(self, offsets: np.ndarray, side: np.ndarray, qty: np.ndarray, limit: np.ndarray, priority: np.ndarray):
+        self.offsets = offsets
+        self.side = side
+        self.qty = qty
+        self.limit = limit
+        self.priority = priority
+
+
+def replay(tape: Tape) -> Books:
+    n = len(tape.o_qty)
+    qty = tape.o_qty.copy()
+    limit = tape.o_limit.copy()
+    priority = tape.o_seq.copy()
+    if len(tape.m_order):
+        # Last modify per order: first occurrence in the reversed stream
+        orders, first = np.unique(tape.m_order[::-1], return_index=True)
+        last = len(tape.m_order) - 1 - first
+        qty[orders] = tape.m_qty[last]
+        limit[orders] = tape.m_limit[last]
+        priority[orders] = tape.m_seq[last]   # a modify re-queues, as in continuous mode
+    live = np.ones(n, bool)
+    live[tape.c_order] = False
+    live &= ~tape.a_continuous[tape.o_auction]
+    rows = np.flatnonzero(live)
+    rows = rows[np.argsort(tape.o_auction[rows], kind="stable")]
+    counts = np.bincount(tape.o_auction[rows], minlength=len(tape.a_ref))
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    return Books(offsets, tape.o_side[rows], qty[rows], limit[rows], priority[rows])
+
+
+# -----------------------------
+# Clearing runs (worker side)
+# -----------------------------
+Run = Tuple[Optional[float], str]   # (band half-width or None for the recorded band, allocation)
+
+
+def clear_chunk(runs: List[Run], ref: np.ndarray, band: np.ndarray, offsets: np.ndarray,
+                side: np.ndarray, qty: np.ndarray, limit: np.ndarray, priority: np.ndarray) -> np.ndarray:
+    """Clears each auction of a chunk under every run: (runs, auctions, 4) of price, matchedQty, fills, qty."""
+    out = np.full((len(runs), len(ref), 4), np.nan)
+    for i in range(len(ref)):
+        s = slice(offsets[i], offsets[i + 1])
+        buy = side[s] == BUY
+        sell = ~buy
+        q, px, pr = qty[s], limit[s], priority[s]
+        # NaN limit = market order
+        buy_px = np.nan_to_num(px[buy], nan=np.inf)
+        sell_px = np.nan_to_num(px[sell], nan=-np.inf)
+        total = float(q.sum())
+        for r, (half, allocation) in enumerate(runs):
+            b = auction_band(ref[i], band[i] if half is None else half)
+            price, volume, buy_fill, sell_fill = uniform_price(
+                buy_px, q[buy], sell_px, q[sell], b["low"], b["high"], b["ref"],
+                allocation, pr[buy], pr[sell])
+            fills = np.count_nonzero(buy_fill > 0) + np.count_nonzero(sell_fill > 0)
+            out[r, i] = (np.nan if price is None else price, volume, fills, total)
+    return out
+
+
+def _chunks(books: Books, auctions: np.ndarray, parts: int):
+    for part in np.array_split(auctions, parts):
+        if not len(part):
+            continue
+        lo, hi = books.offsets[part[0]], books.offsets[part[-1] + 1]
+        yield part, books.offsets[part[0]: part[-1] + 2] - lo, slice(lo, hi)
+
+
+def backtest(tape: Tape, books: Books, runs: List[Run], workers: int) -> np.ndarray:
+    """(runs, auctions, 4) results for every CALL auction of the tape (NaN rows for continuous ones)."""
+    out = np.full((len(runs), len(tape.a_ref), 4), np.nan)
+    call = np.flatnonzero(~tape.a_continuous)
+    jobs = []
+    for part, offsets, s in _chunks(books, call, max(1, workers) * 4):
+        args = (runs, tape.a_ref[part], tape.a_band[part], offsets,
+                books.side[s], books.qty[s], books.limit[s], books.priority[s])
+        jobs.append((part, args))
+    if workers <= 1:
+        for part, args in jobs:
+            out[:, part] = clear_chunk(*args)
+        return out
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [(part, pool.submit(clear_chunk, *args)) for part, args in jobs]
+        for part, fut in futures:
+            out[:, part] = fut.result()
+    return out
+
+
+def summarize(tape: Tape, runs: List[Run], results: np.ndarray, per_auction: bool) -> List[Dict[str, Any]]:
+    call = ~tape.a_continuous
+    recorded = call & tape.a_cleared
+    report = []
+    for (half, allocation), res in zip(runs, results):
+        price, volume, fills, total = res[call].T
+        crossed = ~np.isnan(price)
+        notional = float(np.sum(volume[crossed] * price[crossed]))
+        got, want = res[recorded, 0], tape.a_price[recorded]
+        same = np.isclose(got, want, rtol=0, atol=1e-6) | (np.isnan(got) & np.isnan(want))   # neither crossed
+        run = {
+            "band": RECORDED if half is None else half,
+            "allocation": allocation,
+            "auctions": int(call.sum()),
+            "crossed": int(crossed.sum()),
+            "matchedQty": float(volume.sum()),
+            "matchedNotional": notional,
+            "fillCount": int(fills.sum()),
+            # Both sides of each match count as filled
+            "fillRatio": float(2 * volume.sum() / total.sum()) if total.sum() > 0 else None,
+            "meanAbsDevFromRef": float(np.mean(np.abs(price[crossed] - tape.a_ref[call][crossed]))) if crossed.any() else None,
+            "recordedAuctions": int(recorded.sum()),
+            "priceMatchesRecorded": int(same.sum()),
+        }
+        if per_auction:
+            run["perAuction"] = [
+                {"auctionId": tape.auction_ids[i], "clearingPrice": None if np.isnan(res[i, 0]) else float(res[i, 0]),
+                 "matchedQty": float(res[i, 1]), "fillCount": int(res[i, 2]),
+                 "recordedPrice": None if np.isnan(tape.a_price[i]) else float(tape.a_price[i]),
+                 "recorded": bool(tape.a_cleared[i])}
+                for i in np.flatnonzero(call).tolist()
+            ]
+        report.append(run)
+    return report
+
+
+def _rate(n: int, seconds: float) -> Optional[int]:
+    return int(n / seconds) if seconds > 0 else None
+
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--events", nargs="+", help="audit event files (JSON array or NDJSON)")
+    src.add_argument("--archive", help="retention archive directory (auctions-*.zip)")
+    src.add_argument("--tape", help="tape saved by --save-tape")
+    src.add_argument("--synthetic", type=int, help="generate about this many events")
+    p.add_argument("--save-tape", help="write the parsed tape (.npz) for later runs")
+    p.add_argument("--bands", default=RECORDED, help=f"comma-separated band half-widths, or '{RECORDED}'")
+    p.add_argument("--allocations", default="pro_rata", help=f"comma-separated, from {', '.join(ALLOCATIONS)}")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--per-auction", action="store_true", help="include each auction's clearing price per run")
+    p.add_argument("--out", help="JSON output path (default: stdout)")
+    args = p.parse_args(argv)
+
+    try:
+        bands = [None if b == RECORDED else float(b) for b in args.bands.split(",") if b]
+    except ValueError:
+        p.error(f"--bands: numbers or '{RECORDED}'")
+    allocations = [a for a in args.allocations.split(",") if a]
+    unknown = [a for a in allocations if a not in ALLOCATIONS]
+    if unknown:
+        p.error(f"unknown allocations: {', '.join(unknown)}")
+    runs: List[Run] = [(b, a) for b in bands for a in allocations]
+
+    t0 = time.perf_counter()
+    if args.tape:
+        tape = Tape.load(args.tape)
+    else:
+        if args.events:
+            events = [e for path in args.events for e in read_events(path)]
+        elif args.archive:
+            events = read_archive(args.archive)
+        else:
+            events = synthetic_events(args.synthetic)
+        t0 = time.perf_counter()   # JSON decoding / generation is not part of the parse rate
+        tape = Tape.from_events(events)
+        del events
+    parse_s = time.perf_counter() - t0
+    if args.save_tape:
+        tape.save(args.save_tape)
+
+    t0 = time.perf_counter()
+    books = replay(tape)
+    replay_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = backtest(tape, books, runs, args.workers)
+    clear_s = time.perf_counter() - t0
+
+    report = {
+        "events": tape.events,
+        "skippedEvents": tape.skipped,
+        "auctions": len(tape.a_ref),
+        "continuousSkipped": int(tape.a_continuous.sum()),
+        "orders": len(tape.o_qty),
+        "liveOrders": len(books.qty),
+        "parseSeconds": round(parse_s, 6),
+        "parseEventsPerSec": None if args.tape else _rate(tape.events, parse_s),
+        "replaySeconds": round(replay_s, 6),
+        "replayEventsPerSec": _rate(tape.events, replay_s),
+        "clearingSeconds": round(clear_s, 6),
+        "auctionRunsPerSec": _rate(len(runs) * int((~tape.a_continuous).sum()), clear_s),
+        "workers": args.workers,
+        "runs": summarize(tape, runs, results, args.per_auction),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+        print(f"wrote {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
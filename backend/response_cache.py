@@ -0,0 +1,103 @@
+# response_cache.py
+"""
+Pre-serialized JSON for hot polled reads (auction state, single RFQs, order lists).
+
+Every auction's OrderBook carries a version that each mutation bumps
+(OrderBook.touch) and each RFQ row keeps the book version of its last change,
+so a read is identified by (key, version). The body is serialized once per
+version, with orjson when it is installed (else the stdlib encoder), kept in
+a small LRU and served as raw bytes with a strong ETag; a client sending a
+matching If-None-Match gets 304 with no body. A hot auction polled by many
+clients thus costs one serialization per change instead of one per request.
+
+Callers hold the auction lock, so the version and the body they serialize
+agree and concurrent pollers of a just-changed object wait for one encode.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+from uuid import uuid4
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:   # optional: stdlib fallback
+    orjson = None
+
+CACHE_SIZE = int(os.environ.get("BONDMATCH_RESPONSE_CACHE", "2048"))
+
+# ETags are only meaningful within one process lifetime (versions restart with an in-memory book)
+BOOT = uuid4().hex[:8]
+
+
+def _default(o: Any):
+    if hasattr(o, "tolist"):   # NumPy scalars/arrays
+        return o.tolist()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+class _Cache:
+    def __init__(self, size: int):
+        self.size = size
+        self._data: "OrderedDict[Hashable, Tuple[int, bytes]]" = OrderedDict()   # key -> (version, body)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[bytes]:
+        with self._lock:
+            v = self._data.get(key)
+            if v is None or v[0] != version:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return v[1]
+
+    def put(self, key: Hashable, version: int, body: bytes):
+        with self._lock:
+            self._data[key] = (version, body)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_cache = _Cache(CACHE_SIZE)
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def respond(request: Request, key: Hashable, version: int, build: Callable[[], Any]) -> Response:
+    """JSON response for build() at `version` of `key`: 304 if the client has it, cached bytes if unchanged."""
+    etag = f'"{BOOT}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    body = _cache.get(key, version)
+    if body is None:
+        body = dumps(build())
+        _cache.put(key, version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cache_stats() -> dict:
+    return {"size": len(_cache), "hits": _cache.hits, "misses": _cache.misses, "encoder": "orjson" if orjson else "json"}
@@ -0,0 +1,309 @@
+# retention.py
+"""
+Tiered retention: closed auctions move from RAM to compressed columnar archives.
+
+Once an auction has been CLOSED for BONDMATCH_ARCHIVE_AFTER_S seconds (and its
+merkleRoot is set) a background pass writes it to the archive of its close
+day, `auctions-YYYY-MM-DD.zip` under BONDMATCH_ARCHIVE_DIR (default
+`$BONDMATCH_DATA_DIR/archive`, else a temp dir). Inside, each auction is a
+folder of deflated members: one `.npy` per OrderBook column, `meta.json`
+(the auction dict, ids, userIds, sparse side tables, continuous-mode trades)
+and `audit.json` (its audit events). The auction, its book, RFQs, summary,
+indexes and audit index are then dropped from memory by a WAL-logged
+"retention.archive" record, leaving only `archived_auctions`
+(auction_id -> archive file) and `archived_rfqs` (rfq_id -> auction_id).
+
+A pass works in batches of BONDMATCH_ARCHIVE_BATCH auctions: each day file
+of a batch is opened (and its central directory rewritten) once, and the
+batch is dropped from the indexes by one record.
+
+get_auction_result, get_rfq and get_auction_audit fall back to load(), which
+reads an archived auction back (an OrderBook rebuilt from its columns) through
+a small LRU cache. Each day file keeps one open reader, so a miss reads only
+that auction's members; an append swaps in a fresh reader for later misses. Archived auctions no longer appear in listings, summaries
+or /rfq/list, and serve no Merkle proofs.
+"""
+import datetime
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from contextlib import ExitStack
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import metrics
+import summaries
+from locking import auction_lock
+from order_book import OrderBook, COLUMNS, ROW_BYTES
+from persistence import applier, commit
+from rfq_index import rfq_index
+from state import (auctions, order_books, lobs, merkle_trees, auction_summaries, rfqs, audit_events,
+                   archived_auctions, archived_rfqs)
+from stream import feed
+
+ARCHIVE_AFTER_S = os.environ.get("BONDMATCH_ARCHIVE_AFTER_S")   # unset: retention off
+ARCHIVE_INTERVAL_S = float(os.environ.get("BONDMATCH_ARCHIVE_INTERVAL_S", "60"))
+ARCHIVE_BATCH = int(os.environ.get("BONDMATCH_ARCHIVE_BATCH", "500"))
+CACHE_SIZE = int(os.environ.get("BONDMATCH_ARCHIVE_CACHE", "32"))
+OPEN_READERS = 8
+
+log = logging.getLogger("retention")
+
+_dir: Optional[str] = None
+# Per day file: appends rewrite its central directory, so opening a reader waits (other days don't)
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_lock = threading.Lock()
+# Open readers per day file (central directory parsed once); dropped, not closed, when
+# stale: a reader mid-read keeps its ZipFile alive and the old members never move
+_readers: "OrderedDict[str, zipfile.ZipFile]" = OrderedDict()
+_readers_lock = threading.Lock()
+
+
+def archive_dir() -> str:
+    global _dir
+    if _dir is None:
+        path = os.environ.get("BONDMATCH_ARCHIVE_DIR")
+        if not path:
+            data_dir = os.environ.get("BONDMATCH_DATA_DIR")
+            path = os.path.join(data_dir, "archive") if data_dir else tempfile.mkdtemp(prefix="bondmatch-archive-")
+        os.makedirs(path, exist_ok=True)
+        _dir = path
+    return _dir
+
+
+def _json_default(o: Any):
+    if hasattr(o, "tolist"):   # NumPy scalars
+        return o.tolist()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=_json_default, separators=(",", ":")).encode()
+
+
+def _file_lock(name: str) -> threading.Lock:
+    with _file_locks_lock:
+        lock = _file_locks.get(name)
+        if lock is None:
+            lock = _file_locks[name] = threading.Lock()
+        return lock
+
+
+def closed_at(auction: dict) -> int:
+    return auction.get("closedAtMs") or auction["tCloseMs"]
+
+
+def day_file(t_ms: int) -> str:
+    day = datetime.datetime.fromtimestamp(t_ms / 1000, datetime.timezone.utc).date()
+    return f"auctions-{day.isoformat()}.zip"
+
+
+# -----------------------------
+# Write path
+# -----------------------------
+def _write(name: str, auction_ids: List[str]):
+    """Appends auctions to one day archive in a single open (idempotent: a crash before the WAL record just re-runs)."""
+    with _file_lock(name):
+        with zipfile.ZipFile(os.path.join(archive_dir(), name), "a", zipfile.ZIP_DEFLATED) as zf:
+            for auction_id in auction_ids:
+                if f"{auction_id}/meta.json" in zf.NameToInfo:
+                    continue
+                meta, cols = order_books[auction_id].to_archive()
+                lob = lobs.get(auction_id)
+                meta["auction"] = auctions[auction_id]
+                meta["trades"] = lob.trades if lob is not None else None
+                for col, arr in cols.items():
+                    with zf.open(f"{auction_id}/{col}.npy", "w", force_zip64=True) as f:
+                        np.lib.format.write_array(f, arr, allow_pickle=False)
+                zf.writestr(f"{auction_id}/audit.json", _dumps(audit_events.query(auction_id)))
+                # Last: its presence marks the auction as completely written
+                zf.writestr(f"{auction_id}/meta.json", _dumps(meta))
+        with _readers_lock:
+            _readers.pop(name, None)
+
+
+@applier("retention.archive")
+def apply_archive(rec: dict):
+    # {"auctionIds", "files"} per batch; older records hold one {"auctionId", "file"}
+    ids = rec.get("auctionIds") or [rec["auctionId"]]
+    files = rec.get("files") or [rec["file"]]
+    done = []
+    batch = []
+    for auction_id, name in zip(ids, files):
+        if auction_id not in auctions:
+            continue
+        # Auction first, so a reader that sees the auction always finds its book
+        del auctions[auction_id]
+        book = order_books.pop(auction_id)
+        lobs.pop(auction_id, None)
+        merkle_trees.pop(auction_id, None)
+        auction_summaries.pop(auction_id, None)
+        batch.extend(rfqs.pop(rfq_id) for rfq_id in book.ids)
+        audit_events.drop_auction(auction_id)
+        archived_rfqs.update(dict.fromkeys(book.ids, auction_id))
+        archived_auctions[auction_id] = name
+        metrics.book_bytes.dec(book.capacity * ROW_BYTES)
+        feed.discard(auction_id)
+        done.append(auction_id)
+    rfq_index.remove_many(batch)
+    summaries.discard(done)
+
+
+def _archive_batch(auction_ids: List[str]) -> int:
+    # Sorted, like multi-auction reprices, so concurrent lockers can't deadlock
+    with ExitStack() as stack:
+        for auction_id in sorted(auction_ids):
+            stack.enter_context(auction_lock(auction_id))
+        by_day: Dict[str, List[str]] = {}
+        for auction_id in auction_ids:
+            auction = auctions.get(auction_id)
+            if auction is not None:
+                by_day.setdefault(day_file(closed_at(auction)), []).append(auction_id)
+        ids: List[str] = []
+        files: List[str] = []
+        for name, day_ids in by_day.items():
+            _write(name, day_ids)
+            ids.extend(day_ids)
+            files.extend([name] * len(day_ids))
+        if ids:
+            commit("retention.archive", {"auctionIds": ids, "files": files})
+    for auction_id in ids:
+        auction_lock.discard(auction_id)
+    metrics.auctions_archived.inc(len(ids))
+    return len(ids)
+
+
+def archive_due(now: Optional[int] = None, older_than_s: Optional[float] = None) -> int:
+    """Archives every CLOSED auction (with its merkleRoot) closed more than `older_than_s` ago."""
+    now = int(time.time() * 1000) if now is None else now
+    cutoff = now - int(1000 * (float(ARCHIVE_AFTER_S) if older_than_s is None else older_than_s))
+    due = [aid for aid, a in list(auctions.items())
+           if a["status"] == "CLOSED" and a["merkleRoot"] is not None and closed_at(a) <= cutoff]
+    return sum(_archive_batch(due[i:i + ARCHIVE_BATCH]) for i in range(0, len(due), ARCHIVE_BATCH))
+
+
+def _loop():
+    while True:
+        time.sleep(ARCHIVE_INTERVAL_S)
+        try:
+            n = archive_due()
+            if n:
+                log.info("archived %d auctions", n)
+        except Exception:
+            log.exception("archive pass failed")
+
+
+def start():
+    """Starts the background archive pass when BONDMATCH_ARCHIVE_AFTER_S is set."""
+    if ARCHIVE_AFTER_S:
+        threading.Thread(target=_loop, name="retention", daemon=True).start()
+
+
+# -----------------------------
+# Read path
+# -----------------------------
+class Archived:
+    """An archived auction read back: auction dict, rebuilt OrderBook, trades; audit events on demand."""
+    __slots__ = ("auction", "book", "trades", "file", "_events")
+
+    def __init__(self, meta: Dict[str, Any], cols: Dict[str, np.ndarray], file: str):
+        self.auction = meta["auction"]
+        self.book = OrderBook.from_archive(meta, cols)
+        self.trades = meta["trades"]
+        self.file = file
+        self._events: Optional[List[dict]] = None
+
+    def events(self) -> List[dict]:
+        if self._events is None:
+            self._events = json.loads(_read(self.file, [f"{self.auction['id']}/audit.json"])[0])
+        return self._events
+
+
+def _reader(name: str) -> zipfile.ZipFile:
+    with _readers_lock:
+        zf = _readers.get(name)
+        if zf is not None:
+            _readers.move_to_end(name)
+            return zf
+    with _file_lock(name):
+        zf = zipfile.ZipFile(os.path.join(archive_dir(), name))
+        with _readers_lock:
+            _readers[name] = zf
+            while len(_readers) > OPEN_READERS:
+                _readers.popitem(last=False)
+        return zf
+
+
+def _read(name: str, members: List[str]) -> List[bytes]:
+    """Members of one day file; appends only write past existing members, so no lock is held."""
+    zf = _reader(name)
+    return [zf.read(m) for m in members]
+
+
+class _Cache:
+    def __init__(self, size: int):
+        self.size = size
+        self._data: "OrderedDict[str, Archived]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, auction_id: str) -> Optional[Archived]:
+        with self._lock:
+            v = self._data.get(auction_id)
+            if v is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(auction_id)
+            self.hits += 1
+            return v
+
+    def put(self, auction_id: str, value: Archived):
+        with self._lock:
+            self._data[auction_id] = value
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_cache = _Cache(CACHE_SIZE)
+
+
+def load(auction_id: str) -> Optional[Archived]:
+    """The archived auction, or None if it was never archived."""
+    name = archived_auctions.get(auction_id)
+    if name is None:
+        return None
+    hit = _cache.get(auction_id)
+    if hit is not None:
+        return hit
+    blobs = _read(name, [f"{auction_id}/meta.json"] + [f"{auction_id}/{c}.npy" for c in COLUMNS])
+    cols = {c: np.lib.format.read_array(io.BytesIO(b), allow_pickle=False) for c, b in zip(COLUMNS, blobs[1:])}
+    value = Archived(json.loads(blobs[0]), cols, name)
+    _cache.put(auction_id, value)
+    return value
+
+
+def load_rfq(rfq_id: str) -> Optional[Archived]:
+    """The archived auction holding `rfq_id` (its row is `.book.index[rfq_id]`), or None."""
+    auction_id = archived_rfqs.get(rfq_id)
+    return load(auction_id) if auction_id is not None else None
+
+
+def stats() -> Dict[str, int]:
+    return {
+        "auctions": len(archived_auctions),
+        "rfqs": len(archived_rfqs),
+        "cached": len(_cache),
+        "cacheHits": _cache.hits,
+        "cacheMisses": _cache.misses,
+    }
@@ -1,21 +1,34 @@
 # rfq.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response, Request
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List, Dict, Any
-from uuid import uuid4
+from contextlib import ExitStack
+import json
+import os
 import time
+import numpy as np
+
+from bonds import lookup_instrument
 
 # Shared state
-from state import rfqs, audit_events, auctions, bonds
+from state import rfqs, auctions, bonds, open_auctions, order_books, lobs, auction_summaries, instrument_quotes
 
 # Reuse audit + timer from auctions module for consistency
-try:
-    from auctions import add_audit, run_auction_timer
-except Exception:
-    # Fallbacks (shouldn't be hit if auctions.py is present)
-    def add_audit(event_type: str, payload: dict, auction_id: str = None):
-        audit_events.append({"t": int(time.time() * 1000), "type": event_type, "auctionId": auction_id, "payload": payload})
-    def run_auction_timer(auction_id: str):
-        pass
+from auctions import add_audit, add_audit_many, run_auction_timer, new_auction
+from clearing import MAX_BAND
+from order_book import OrderBook, SIDES, TIFS, OPEN
+from quote_book import QuoteBook, InstrumentQuotes
+from timer_wheel import TimerWheel
+from rfq_store import Rfq, next_seq
+from rfq_index import rfq_index
+from sharding import new_id
+from locking import auction_lock, instrument_lock
+from persistence import applier, commit
+from stream import feed
+import metrics
+import pricing
+import response_cache
+import retention
 
 router = APIRouter()
 
@@ -30,126 +43,162 @@ def resolve_instrument(instrument_id: str) -> Dict[str, Any]:
     Returns: {"parent": dict, "micro": Optional[dict]}
     Raises HTTPException if not found
     """
-    parent = None
-    micro = None
-    for b in bonds.values():
-        if b["id"] == instrument_id:
-            parent = b
-            break
-        for mb in b.get("microBonds", []):
-            if mb["id"] == instrument_id:
-                parent = b
-                micro = mb
-                break
-        if parent:
-            break
-    if not parent:
+    found = lookup_instrument(instrument_id)
+    if not found:
         raise HTTPException(status_code=404, detail="Bond/microBond not found")
+    parent, micro = found
     return {"parent": parent, "micro": micro}
 
 def find_open_auction_for_instrument(instrument_id: str) -> Optional[str]:
-    for aid, a in auctions.items():
-        if a.get("instrumentId") == instrument_id and a.get("status") == "OPEN":
-            return aid
-    return None
+    """The instrument's oldest OPEN auction (callers hold the instrument lock)"""
+    queue = open_auctions.get(instrument_id)
+    return next(iter(queue)) if queue else None
 
-def create_auction_inline(instrument_id: str, *, isin: str, lpStub: str, windowSeconds: int, bandOverride: Optional[float] = None) -> str:
+def create_auction_inline(instrument_id: str, *, isin: str, lpStub: str, windowSeconds: int, bandOverride: Optional[float] = None, mode: str = "CALL") -> str:
     """
     Creates an auction object consistent with auctions.start_auction.
     Returns auction_id and starts the timer.
     """
     ids = resolve_instrument(instrument_id)
     parent = ids["parent"]
-    auction_id = str(uuid4())
-    t_open = now_ms()
-    t_close = t_open + windowSeconds * 1000
-    auctions[auction_id] = {
-        "id": auction_id,
-        "instrumentId": instrument_id,
-        "meta": {
-            "parentId": parent["id"],
-            "faceValue": parent["faceValue"],
-            "isin": isin,
-            "lpStub": lpStub,
-        },
-        "orders": [],
-        "status": "OPEN",
-        "tOpenMs": t_open,
-        "tCloseMs": t_close,
-        "bandOverride": bandOverride,
-        "band": None,
-        "fills": [],
-        "clearingPrice": None,
-        "matchedNotional": None,
-        "merkleRoot": None,
-    }
-    add_audit("AUCTION_START_INLINE", {"auctionId": auction_id, "instrumentId": instrument_id}, auction_id)
+    auction_id = new_auction(
+        instrument_id,
+        parent,
+        isin=isin,
+        lpStub=lpStub,
+        windowSeconds=windowSeconds,
+        bandOverride=bandOverride,
+        mode=mode,
+        event="AUCTION_START_INLINE",
+    )["id"]
     run_auction_timer(auction_id)
     return auction_id
 
-def fair_price_stub(parent_bond: dict, context: dict) -> Dict[str, Any]:
+def ensure_open_auction(instrument_id: str, parent: dict, payload: dict) -> str:
     """
-    Very small deterministic stub to keep demos stable.
-    Uses faceValue +/- small band; can be replaced with ML later.
+    Returns the instrument's OPEN auction, starting one inline when the payload
+    asks for it (autoStartWindow). Raises HTTPException otherwise.
     """
-    fv = float(parent_bond.get("faceValue", 100.0))
-    # Simple knobs from context
-    side = context.get("side", "BUY")
-    qty = float(context.get("qty", 0))
-    micro_bias = -0.05 if context.get("micro") else 0.0   # illiquidity tiny discount
-    size_bias = -0.02 if qty and qty > (fv * 0.1) else 0  # larger clip slightly tighter/worse
-    base = fv + micro_bias + size_bias
-    band = 0.50  # 50p band for demo
-    if side == "BUY":
-        explanation = f"Near face value with small illiquidity/size adjustments (BUY)."
-    else:
-        explanation = f"Near face value with small illiquidity/size adjustments (SELL)."
-    return {
-        "fairPrice": round(base, 2),
-        "bandLow": round(base - band, 2),
-        "bandHigh": round(base + band, 2),
-        "explanation": explanation
-    }
+    with instrument_lock(instrument_id):
+        auction_id = find_open_auction_for_instrument(instrument_id)
+        if auction_id:
+            return auction_id
+        auto = bool(payload.get("autoStartWindow"))
+        if not auto:
+            raise HTTPException(
+                status_code=400,
+                detail="No open auction for instrument. Pass autoStartWindow=true with isin/lpStub/windowSeconds to start one."
+            )
+        isin = payload.get("isin") or f"{parent['name'][:4].upper()}-DEMO"
+        lpStub = payload.get("lpStub") or "LP-DEMO"
+        windowSeconds = int(payload.get("windowSeconds") or 180)
+        bandOverride = payload.get("bandOverride", None)
+        if bandOverride is not None and not (
+            isinstance(bandOverride, (int, float)) and not isinstance(bandOverride, bool) and 0 < bandOverride <= MAX_BAND
+        ):
+            raise HTTPException(status_code=400, detail=f"bandOverride must be a number in (0, {MAX_BAND}]")
+        mode = payload.get("mode") or "CALL"
+        if mode not in ("CALL", "CONTINUOUS"):
+            raise HTTPException(status_code=400, detail="mode must be CALL or CONTINUOUS")
+        return create_auction_inline(
+            instrument_id,
+            isin=isin,
+            lpStub=lpStub,
+            windowSeconds=windowSeconds,
+            bandOverride=bandOverride,
+            mode=mode
+        )
 
-def build_rfq_dict(
+def match_continuous(book: OrderBook, rows, ts: int):
+    """
+    CONTINUOUS auctions: runs each row (in order) through the auction's limit
+    order book and folds the executions into summaries, the status index, the
+    audit log and the stream. Rows must already be counted in the summary.
+    """
+    lob = lobs.get(book.auctionId)
+    if lob is None:
+        return
+    auction_id = book.auctionId
+    band = auctions[auction_id]["band"]
+    summary = auction_summaries[auction_id]
+    for row in rows:
+        trades = lob.submit(book, row, band, ts)
+        taker = rfqs[book.ids[row]]
+        touched = [row]
+        for maker_row, qty, px in trades:
+            maker = rfqs[book.ids[maker_row]]
+            summary.reduce(maker.side, qty, maker.limitPrice)
+            summary.reduce(taker.side, qty, taker.limitPrice)
+            if maker.status != "OPEN":
+                summary.remove(maker.side, 0.0, maker.limitPrice)
+                rfq_index.set_status(maker, "OPEN")
+            touched.append(maker_row)
+        if taker.status != "OPEN":
+            summary.remove(taker.side, taker.qty - taker.filledQty, taker.limitPrice)
+            rfq_index.set_status(taker, "OPEN")
+        elif not trades:
+            continue    # rested untouched: order_added already says it all
+        book.touch(touched)
+        fills = [{"makerRfqId": book.ids[m], "qty": q, "price": p} for m, q, p in trades]
+        add_audit("RFQ_MATCHED", {"rfqId": taker.id, "auctionId": auction_id, "status": taker.status, "trades": fills}, auction_id, ts)
+        feed.publish(auction_id, "trades", lambda: {"rfqId": taker.id, "trades": fills, "orders": book.to_dicts(touched)})
+
+@applier("rfq.create")
+def apply_create_rfq(rec: dict) -> Rfq:
+    book = order_books[rec["auctionId"]]
+    row = book.append(
+        rec["id"],
+        userId=rec["userId"],
+        side=rec["side"],
+        qty=rec["qty"],
+        limitPrice=rec["limitPrice"],
+        timeInForce=rec["timeInForce"],
+        ts=rec["ts"],
+        seq=rec["seq"],
+        fairPrice=rec["fairPrice"],
+        bandLow=rec["bandLow"],
+        bandHigh=rec["bandHigh"],
+        explanation=rec["explanation"],
+    )
+    obj = Rfq(book, row)
+    rfqs[obj.id] = obj
+    rfq_index.add(obj)
+    auction_summaries[book.auctionId].add(obj.side, obj.qty, obj.limitPrice)
+    add_audit("RFQ_CREATED", {
+        "rfqId": obj.id, "auctionId": book.auctionId, "instrumentId": book.instrumentId,
+        # Enough to rebuild the book from the audit stream alone (replay.py)
+        "userId": obj.userId, "side": obj.side, "qty": obj.qty, "limitPrice": obj.limitPrice, "timeInForce": obj.timeInForce,
+    }, book.auctionId, rec["ts"])
+    feed.publish(book.auctionId, "order_added", obj.to_dict)
+    match_continuous(book, (row,), rec["ts"])
+    return obj
+
+def build_rfq(
+    auction_id: str,
     *,
-    auctionId: str,
-    instrumentId: str,
     userId: str,
     side: str,
     qty: float,
     limitPrice: Optional[float],
     timeInForce: str,
-    parentId: str,
-    microId: Optional[str],
     fair_stub: Dict[str, Any],
-) -> Dict[str, Any]:
-    rfq_id = str(uuid4())
-    return {
-        "id": rfq_id,
-        "auctionId": auctionId,
-        "instrumentId": instrumentId,   # could be parent bond id OR micro-bond id
-        "parentId": parentId,           # always populated
-        "microId": microId,             # None if instrumentId is parent
+) -> Rfq:
+    """Commits an OPEN RFQ into the auction's book and returns its handle."""
+    return commit("rfq.create", {
+        "id": new_id(),
+        "seq": next_seq(),
+        "auctionId": auction_id,
         "userId": userId,
-        "side": side.upper(),           # BUY / SELL
-        "qty": qty,
-        "limitPrice": limitPrice,       # None = Market
-        "timeInForce": timeInForce,     # GTC / AON / IOC (treated as GTC in auction window)
-        "status": "OPEN",
+        "side": side.upper(),
+        "qty": float(qty),
+        "limitPrice": limitPrice,
+        "timeInForce": timeInForce,
         "ts": now_ms(),
-        # Fill tracking
-        "filledQty": 0.0,
-        "avgFillPrice": None,
-        # Fair price guidance (for per-RFQ audit/explainability)
         "fairPrice": fair_stub.get("fairPrice"),
         "bandLow": fair_stub.get("bandLow"),
         "bandHigh": fair_stub.get("bandHigh"),
         "explanation": fair_stub.get("explanation"),
-        # Dealer quotes (optional; for bulletin-board style RFQ demonstration)
-        "quotes": [],
-        "acceptedQuote": None
-    }
+    })
 
 # -----------------------------
 # 1) Create RFQ (supports bondId OR micro-bond-id)
@@ -169,7 +218,8 @@ def create_rfq(payload: dict):
       "windowSeconds": 180,                           # optional if autoStartWindow
       "isin": "IN123...",                             # optional if autoStartWindow
       "lpStub": "LP1",                                # optional if autoStartWindow
-      "bandOverride": null                            # optional
+      "bandOverride": null,                           # optional
+      "mode": "CALL"|"CONTINUOUS"                     # optional if autoStartWindow (default CALL)
     }
     """
     instrument_id = payload.get("instrumentId")
@@ -184,105 +234,319 @@ def create_rfq(payload: dict):
 
     if not user_id or side not in ("BUY", "SELL") or not qty or qty <= 0:
         raise HTTPException(status_code=400, detail="Invalid RFQ: userId, side (BUY/SELL), qty>0 required")
+    # Same rules as /rfq/batch: unknown TIFs and non-positive prices never reach the book
+    error = validate_batch([payload])[0]
+    if error:
+        raise HTTPException(status_code=400, detail=error)
 
     # Resolve instrument (parent/micro)
     ids = resolve_instrument(instrument_id)
     parent = ids["parent"]
     micro = ids["micro"]
 
-    # Ensure an OPEN auction exists OR create one if asked
-    auction_id = find_open_auction_for_instrument(instrument_id)
-    if not auction_id:
-        auto = bool(payload.get("autoStartWindow"))
-        if not auto:
-            raise HTTPException(
-                status_code=400,
-                detail="No open auction for instrument. Pass autoStartWindow=true with isin/lpStub/windowSeconds to start one."
-            )
-        isin = payload.get("isin") or f"{parent['name'][:4].upper()}-DEMO"
-        lpStub = payload.get("lpStub") or "LP-DEMO"
-        windowSeconds = int(payload.get("windowSeconds") or 180)
-        bandOverride = payload.get("bandOverride", None)
-        auction_id = create_auction_inline(
-            instrument_id,
-            isin=isin,
-            lpStub=lpStub,
-            windowSeconds=windowSeconds,
-            bandOverride=bandOverride
+    # Ensure an OPEN auction exists OR create one if asked (once per instrument)
+    auction_id = ensure_open_auction(instrument_id, parent, payload)
+
+    # Cached fair price + band now; the model refreshes it asynchronously
+    fair_stub, stale = pricing.lookup(parent, side, qty, bool(micro))
+
+    with auction_lock(auction_id):
+        a = auctions.get(auction_id)
+        if not a or a.get("status") != "OPEN":
+            raise HTTPException(status_code=400, detail="Auction not open (race condition)")
+
+        # Append to the auction's order book + register the handle globally
+        rfq_obj = build_rfq(
+            auction_id,
+            userId=user_id,
+            side=side,
+            qty=qty,
+            limitPrice=limit_price,
+            timeInForce=tif,
+            fair_stub=fair_stub
         )
+        metrics.rfq_events.inc(action="create")
+        if stale:
+            pricing.service.request([(stale, (auction_id, rfq_obj.id))])
+        return rfq_obj.to_dict()
 
-    # Build fair-price stub (can be replaced by ML)
-    fair_stub = fair_price_stub(parent, {"side": side, "qty": qty, "micro": bool(micro)})
-
-    # Build RFQ dict + store globally and attach to auction orders
-    rfq_obj = build_rfq_dict(
-        auctionId=auction_id,
-        instrumentId=instrument_id,
-        userId=user_id,
-        side=side,
-        qty=qty,
-        limitPrice=limit_price,
-        timeInForce=tif,
-        parentId=parent["id"],
-        microId=micro["id"] if micro else None,
-        fair_stub=fair_stub
+# -----------------------------
+# 1b) Batch create (JSON list or NDJSON)
+# -----------------------------
+BATCH_MAX = 50000
+
+@applier("rfq.batch")
+def apply_create_rfq_batch(rec: dict) -> List[Rfq]:
+    auction_id = rec["auctionId"]
+    book = order_books[auction_id]
+    rows = book.append_many(
+        rec["ids"],
+        userIds=rec["userIds"],
+        side=rec["side"],
+        qty=rec["qty"],
+        limitPrice=rec["limitPrice"],
+        timeInForce=rec["timeInForce"],
+        ts=rec["ts"],
+        seq=rec["seqs"],
+        fairPrice=rec["fairPrice"],
+        bandLow=rec["bandLow"],
+        bandHigh=rec["bandHigh"],
+        explanation=rec["explanation"],
     )
+    objs = [Rfq(book, row) for row in rows]
+    rfqs.update(zip(rec["ids"], objs))
+    rfq_index.add_many(objs)
+    summary = auction_summaries[auction_id]
+    for side, qty, lp in zip(rec["side"], rec["qty"], rec["limitPrice"]):
+        summary.add(side, qty, lp)
+    tifs = [TIFS[t] for t in book.col("tif")[rows.start:rows.stop].tolist()]
+    add_audit_many(
+        "RFQ_CREATED",
+        [
+            {"rfqId": rfq_id, "auctionId": auction_id, "instrumentId": book.instrumentId,
+             "userId": user, "side": side, "qty": qty, "limitPrice": lp, "timeInForce": tif}
+            for rfq_id, user, side, qty, lp, tif in zip(rec["ids"], rec["userIds"], rec["side"], rec["qty"], rec["limitPrice"], tifs)
+        ],
+        auction_id,
+        rec["ts"],
+    )
+    feed.publish(auction_id, "orders_added", lambda: book.to_dicts(rows))
+    match_continuous(book, rows, rec["ts"])
+    return objs
+
+def parse_batch(body: bytes, content_type: str) -> List[Any]:
+    """JSON array, or NDJSON (one object per line) when sent as such or not starting with '['"""
+    text = body.decode("utf-8")
+    if "ndjson" not in content_type and text.lstrip().startswith("["):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError("expected a JSON array")
+        return items
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def _num(x) -> float:
+    return float(x) if isinstance(x, (int, float)) and not isinstance(x, bool) else np.nan
+
+def _positive(x) -> bool:
+    v = _num(x)
+    return bool(np.isfinite(v) and v > 0)
+
+def validate_batch(items: List[Any]) -> List[Optional[str]]:
+    """One vectorized pass over the batch; returns an error message (or None) per item."""
+    dicts = [it if isinstance(it, dict) else {} for it in items]
+    qty = np.array([_num(d.get("qty")) for d in dicts])
+    raw_lp = [d.get("limitPrice") for d in dicts]
+    lp = np.array([_num(x) for x in raw_lp])
+    side = np.array([(d.get("side") or "").upper() if isinstance(d.get("side"), str) else "" for d in dicts])
+    tif = np.array([d.get("timeInForce", "GTC") if isinstance(d.get("timeInForce", "GTC"), str) else "" for d in dicts])
+    user_ok = np.array([isinstance(d.get("userId"), str) and bool(d.get("userId")) for d in dicts])
+    inst_ok = np.array([isinstance(d.get("instrumentId"), str) and bool(d.get("instrumentId")) for d in dicts])
+    lp_none = np.array([x is None for x in raw_lp])
+
+    checks = (
+        (np.array([isinstance(it, dict) for it in items]), "item must be an object"),
+        (inst_ok, "instrumentId is required"),
+        (user_ok, "userId is required"),
+        (np.isin(side, SIDES), "side must be BUY or SELL"),
+        (np.isfinite(qty) & (qty > 0), "qty>0 required"),
+        (lp_none | (np.isfinite(lp) & (lp > 0)), "limitPrice must be a positive number or null"),
+        (np.isin(tif, TIFS), "timeInForce must be one of GTC, AON, IOC"),
+    )
+    errors: List[Optional[str]] = [None] * len(items)
+    # Report the first failing check per item (later checks only fill remaining gaps)
+    for ok, message in reversed(checks):
+        for i in np.flatnonzero(~ok).tolist():
+            errors[i] = message
+    return errors
+
+def submit_batch(items: List[Any]) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = [None] * len(items)
+    errors = validate_batch(items)
+    for i, err in enumerate(errors):
+        if err:
+            results[i] = {"index": i, "ok": False, "error": err}
+
+    # Group valid items by instrument: resolution and auction lookup happen once per group
+    groups: Dict[str, List[int]] = {}
+    for i, err in enumerate(errors):
+        if err is None:
+            groups.setdefault(items[i]["instrumentId"], []).append(i)
+
+    accepted = 0
+    for instrument_id, idxs in groups.items():
+        try:
+            ids = resolve_instrument(instrument_id)
+            parent, micro = ids["parent"], ids["micro"]
+            starter = next((items[i] for i in idxs if items[i].get("autoStartWindow")), items[idxs[0]])
+            auction_id = ensure_open_auction(instrument_id, parent, starter)
+        except HTTPException as e:
+            for i in idxs:
+                results[i] = {"index": i, "ok": False, "error": e.detail}
+            continue
+
+        sides, qtys, lps, tifs, users, fair, stale = [], [], [], [], [], [], []
+        for i in idxs:
+            it = items[i]
+            side = it["side"].upper()
+            qty = float(it["qty"])
+            sides.append(side)
+            qtys.append(qty)
+            lps.append(None if it.get("limitPrice") is None else float(it["limitPrice"]))
+            tifs.append(it.get("timeInForce", "GTC"))
+            users.append(it["userId"])
+            stub, key = pricing.lookup(parent, side, qty, bool(micro))
+            fair.append(stub)
+            stale.append(key)
+
+        with auction_lock(auction_id):
+            a = auctions.get(auction_id)
+            if not a or a.get("status") != "OPEN":
+                for i in idxs:
+                    results[i] = {"index": i, "ok": False, "error": "Auction not open (race condition)"}
+                continue
+            rfq_ids = [new_id() for _ in idxs]
+            commit("rfq.batch", {
+                "auctionId": auction_id,
+                "ts": now_ms(),
+                "ids": rfq_ids,
+                "seqs": [next_seq() for _ in idxs],
+                "userIds": users,
+                "side": sides,
+                "qty": qtys,
+                "limitPrice": lps,
+                "timeInForce": tifs,
+                "fairPrice": [f.get("fairPrice") for f in fair],
+                "bandLow": [f.get("bandLow") for f in fair],
+                "bandHigh": [f.get("bandHigh") for f in fair],
+                "explanation": [f.get("explanation") for f in fair],
+            })
+        pricing.service.request([(key, (auction_id, rfq_id)) for key, rfq_id in zip(stale, rfq_ids) if key])
+        for i, rfq_id in zip(idxs, rfq_ids):
+            results[i] = {"index": i, "ok": True, "id": rfq_id, "auctionId": auction_id, "instrumentId": instrument_id, "status": rfqs[rfq_id].status}
+        accepted += len(idxs)
+
+    metrics.rfq_events.inc(accepted, action="create")
+    return {"accepted": accepted, "rejected": len(items) - accepted, "results": results}
+
+@router.post("/batch")
+async def create_rfq_batch(request: Request):
+    """
+    Body: JSON array of create payloads (same fields as /create), or NDJSON
+    (Content-Type: application/x-ndjson). Returns per-item results in input order.
+    """
+    try:
+        items = parse_batch(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+    if len(items) > BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {BATCH_MAX})")
+    return await run_in_threadpool(submit_batch, items)
 
-    rfqs[rfq_obj["id"]] = rfq_obj
-
-    # Attach to auction orders list
-    a = auctions.get(auction_id)
-    if not a or a.get("status") != "OPEN":
-        raise HTTPException(status_code=400, detail="Auction not open (race condition)")
-    a["orders"].append(rfq_obj)
-
-    add_audit("RFQ_CREATED", {"rfqId": rfq_obj["id"], "auctionId": auction_id, "instrumentId": instrument_id}, auction_id)
-    return rfq_obj
+# -----------------------------
+# 5) List RFQs (filters)
+# -----------------------------
+# Registered before /{rfq_id} so "/list" is not captured as an id
+@router.get("/list")
+def list_rfqs(
+    response: Response,
+    userId: Optional[str] = None,
+    status: Optional[str] = None,
+    instrumentId: Optional[str] = None,
+    auctionId: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+):
+    """Newest first. Pass the X-Next-Cursor response header back as `cursor` for the next page."""
+    before = None
+    if cursor is not None:
+        if not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        before = int(cursor)
+    page, next_cursor = rfq_index.query(
+        {"userId": userId, "status": status, "instrumentId": instrumentId, "auctionId": auctionId},
+        limit,
+        before,
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return [r.to_dict() for r in page]
 
 # -----------------------------
 # 2) Get RFQ by ID
 # -----------------------------
 @router.get("/{rfq_id}")
-def get_rfq(rfq_id: str):
+def get_rfq(rfq_id: str, request: Request):
+    """Serialized once per RFQ version; ETag / If-None-Match -> 304 when unchanged."""
     obj = rfqs.get(rfq_id)
     if not obj:
-        raise HTTPException(status_code=404, detail="RFQ not found")
-    return obj
+        archived = retention.load_rfq(rfq_id)
+        if archived is None:
+            raise HTTPException(status_code=404, detail="RFQ not found")
+        book, row = archived.book, archived.book.index[rfq_id]
+        return response_cache.respond(request, ("rfq", rfq_id), int(book.cols["version"][row]), lambda: book.to_dicts((row,))[0])
+    with auction_lock(obj.auctionId):
+        version = int(obj.book.cols["version"][obj.row])
+        return response_cache.respond(request, ("rfq", rfq_id), version, obj.to_dict)
 
 # -----------------------------
 # 3) Cancel RFQ (only while auction OPEN & RFQ OPEN)
 # -----------------------------
+@applier("rfq.cancel")
+def apply_cancel_rfq(rec: dict):
+    obj = rfqs[rec["id"]]
+    lob = lobs.get(obj.auctionId)
+    if lob is not None:
+        lob.cancel(obj.book, obj.row)
+    old = obj.status
+    obj.status = "CANCELLED"
+    rfq_index.set_status(obj, old)
+    auction_summaries[obj.auctionId].remove(obj.side, obj.qty - obj.filledQty, obj.limitPrice)
+    obj.tsCancelled = rec["ts"]
+    obj.book.touch(obj.row)
+    add_audit("RFQ_CANCELLED", {"rfqId": obj.id, "auctionId": obj.auctionId}, obj.auctionId, rec["ts"])
+    feed.publish(obj.auctionId, "order_cancelled", lambda: {"id": obj.id, "status": obj.status, "ts_cancelled": obj.tsCancelled})
+
 @router.post("/{rfq_id}/cancel")
 def cancel_rfq(rfq_id: str):
     obj = rfqs.get(rfq_id)
     if not obj:
         raise HTTPException(status_code=404, detail="RFQ not found")
 
-    auction_id = obj["auctionId"]
+    auction_id = obj.auctionId
     a = auctions.get(auction_id)
     if not a:
         raise HTTPException(status_code=404, detail="Auction not found")
-    if a["status"] != "OPEN":
-        raise HTTPException(status_code=400, detail="Auction already closed")
-
-    if obj["status"] not in ("OPEN",):
-        raise HTTPException(status_code=400, detail=f"RFQ not cancellable in status {obj['status']}")
+    with auction_lock(auction_id):
+        if a["status"] != "OPEN":
+            raise HTTPException(status_code=400, detail="Auction already closed")
 
-    obj["status"] = "CANCELLED"
-    obj["ts_cancelled"] = now_ms()
+        if obj.status not in ("OPEN",):
+            raise HTTPException(status_code=400, detail=f"RFQ not cancellable in status {obj.status}")
 
-    # Also mark in auction orders array
-    for o in a["orders"]:
-        if o["id"] == rfq_id:
-            o["status"] = "CANCELLED"
-            break
-
-    add_audit("RFQ_CANCELLED", {"rfqId": rfq_id, "auctionId": auction_id}, auction_id)
-    return {"success": True, "rfq": obj}
+        commit("rfq.cancel", {"id": rfq_id, "ts": now_ms()})
+        metrics.rfq_events.inc(action="cancel")
+        return {"success": True, "rfq": obj.to_dict()}
 
 # -----------------------------
 # 4) Modify RFQ (qty/limitPrice) before close
 # -----------------------------
+@applier("rfq.modify")
+def apply_modify_rfq(rec: dict):
+    obj = rfqs[rec["id"]]
+    lob = lobs.get(obj.auctionId)
+    if lob is not None:
+        lob.cancel(obj.book, obj.row)   # re-queued (losing time priority) by match_continuous below
+    summary = auction_summaries[obj.auctionId]
+    summary.remove(obj.side, obj.qty - obj.filledQty, obj.limitPrice)
+    obj.qty = rec["qty"]
+    obj.limitPrice = rec["limitPrice"]
+    obj.tsModified = rec["ts"]
+    obj.book.touch(obj.row)
+    summary.add(obj.side, obj.qty - obj.filledQty, obj.limitPrice)
+    add_audit("RFQ_MODIFIED", {"rfqId": obj.id, "auctionId": obj.auctionId, "qty": obj.qty, "limitPrice": obj.limitPrice}, obj.auctionId, rec["ts"])
+    feed.publish(obj.auctionId, "order_modified", lambda: {"id": obj.id, "qty": obj.qty, "limitPrice": obj.limitPrice, "ts_modified": obj.tsModified})
+    match_continuous(obj.book, (obj.row,), rec["ts"])
+
 @router.post("/{rfq_id}/modify")
 def modify_rfq(rfq_id: str, payload: dict):
     """
@@ -292,76 +556,63 @@ def modify_rfq(rfq_id: str, payload: dict):
     if not obj:
         raise HTTPException(status_code=404, detail="RFQ not found")
 
-    auction_id = obj["auctionId"]
+    auction_id = obj.auctionId
     a = auctions.get(auction_id)
     if not a:
         raise HTTPException(status_code=404, detail="Auction not found")
-    if a["status"] != "OPEN":
-        raise HTTPException(status_code=400, detail="Auction already closed")
+    with auction_lock(auction_id):
+        if a["status"] != "OPEN":
+            raise HTTPException(status_code=400, detail="Auction already closed")
 
-    if obj["status"] != "OPEN":
-        raise HTTPException(status_code=400, detail=f"RFQ not modifiable in status {obj['status']}")
+        if obj.status != "OPEN":
+            raise HTTPException(status_code=400, detail=f"RFQ not modifiable in status {obj.status}")
 
-    new_qty = payload.get("qty", obj["qty"])
-    new_lp = payload.get("limitPrice", obj["limitPrice"])
+        new_qty = payload.get("qty", obj.qty)
+        new_lp = payload.get("limitPrice", obj.limitPrice)
 
-    if new_qty <= 0:
-        raise HTTPException(status_code=400, detail="qty must be > 0")
+        if not _positive(new_qty):
+            raise HTTPException(status_code=400, detail="qty must be > 0")
+        if new_lp is not None and not _positive(new_lp):
+            raise HTTPException(status_code=400, detail="limitPrice must be a positive number or null")
+        if new_qty <= obj.filledQty:
+            raise HTTPException(status_code=400, detail="qty must exceed filledQty")
 
-    obj["qty"] = float(new_qty)
-    obj["limitPrice"] = new_lp
-    obj["ts_modified"] = now_ms()
-
-    # Also patch in auction orders array
-    for o in a["orders"]:
-        if o["id"] == rfq_id:
-            o["qty"] = obj["qty"]
-            o["limitPrice"] = obj["limitPrice"]
-            o["ts_modified"] = obj["ts_modified"]
-            break
-
-    add_audit("RFQ_MODIFIED", {"rfqId": rfq_id, "auctionId": auction_id, "qty": obj["qty"], "limitPrice": obj["limitPrice"]}, auction_id)
-    return {"success": True, "rfq": obj}
-
-# -----------------------------
-# 5) List RFQs (filters)
-# -----------------------------
-@router.get("/list")
-def list_rfqs(
-    userId: Optional[str] = None,
-    status: Optional[str] = None,
-    instrumentId: Optional[str] = None,
-    auctionId: Optional[str] = None,
-    limit: int = Query(200, ge=1, le=1000)
-):
-    res: List[Dict[str, Any]] = list(rfqs.values())
-    if userId:
-        res = [r for r in res if r.get("userId") == userId]
-    if status:
-        res = [r for r in res if r.get("status") == status]
-    if instrumentId:
-        res = [r for r in res if r.get("instrumentId") == instrumentId]
-    if auctionId:
-        res = [r for r in res if r.get("auctionId") == auctionId]
-    res.sort(key=lambda x: x.get("ts", 0), reverse=True)
-    return res[:limit]
+        commit("rfq.modify", {"id": rfq_id, "qty": float(new_qty), "limitPrice": new_lp, "ts": now_ms()})
+        metrics.rfq_events.inc(action="modify")
+        return {"success": True, "rfq": obj.to_dict()}
 
 # -----------------------------
 # 6) List Orders in an Auction
 # -----------------------------
 @router.get("/auction/{auction_id}/orders")
-def list_orders_in_auction(auction_id: str, userId: Optional[str] = None):
-    a = auctions.get(auction_id)
-    if not a:
+def list_orders_in_auction(auction_id: str, request: Request, userId: Optional[str] = None):
+    """Serialized once per auction version (and userId filter); supports ETag / If-None-Match."""
+    if auction_id not in auctions:
         raise HTTPException(status_code=404, detail="Auction not found")
-    orders = a.get("orders", [])
-    if userId:
-        orders = [o for o in orders if o.get("userId") == userId]
-    return orders
+    book = order_books[auction_id]
+    with auction_lock(auction_id):
+        if userId:
+            build = lambda: book.to_dicts(book.rows_for_user(userId))
+        else:
+            build = book.to_dicts
+        return response_cache.respond(request, ("orders", auction_id, userId), book.version, build)
 
 # -----------------------------
 # 7) Attach/Update Fair Price to an RFQ (from ML or stub)
 # -----------------------------
+@applier("rfq.fairprice")
+def apply_fair_price(rec: dict):
+    obj = rfqs[rec["id"]]
+    for k, v in rec["fields"].items():
+        setattr(obj, k, v)
+    obj.book.touch(obj.row)
+    if rec["event"] == "RFQ_FAIRPRICE_STUB":
+        payload = {"rfqId": obj.id, **rec["fields"]}
+    else:
+        payload = {"rfqId": obj.id, **{k: getattr(obj, k) for k in ("fairPrice", "bandLow", "bandHigh")}}
+    add_audit(rec["event"], payload, obj.auctionId, rec["ts"])
+    feed.publish(obj.auctionId, "order_modified", lambda: {"id": obj.id, **{k: getattr(obj, k) for k in rec["fields"]}})
+
 @router.patch("/{rfq_id}/fairprice")
 def patch_fair_price(rfq_id: str, payload: dict):
     """
@@ -372,22 +623,10 @@ def patch_fair_price(rfq_id: str, payload: dict):
     if not obj:
         raise HTTPException(status_code=404, detail="RFQ not found")
 
-    for k in ("fairPrice", "bandLow", "bandHigh", "explanation"):
-        if k in payload:
-            obj[k] = payload[k]
-
-    # Mirror to auction orders
-    a = auctions.get(obj["auctionId"])
-    if a:
-        for o in a.get("orders", []):
-            if o["id"] == rfq_id:
-                for k in ("fairPrice", "bandLow", "bandHigh", "explanation"):
-                    if k in payload:
-                        o[k] = payload[k]
-                break
-
-    add_audit("RFQ_FAIRPRICE_UPDATE", {"rfqId": rfq_id, **{k: obj.get(k) for k in ("fairPrice","bandLow","bandHigh")}}, obj["auctionId"])
-    return {"success": True, "rfq": obj}
+    fields = {k: payload[k] for k in ("fairPrice", "bandLow", "bandHigh", "explanation") if k in payload}
+    with auction_lock(obj.auctionId):
+        commit("rfq.fairprice", {"id": rfq_id, "fields": fields, "event": "RFQ_FAIRPRICE_UPDATE", "ts": now_ms()})
+        return {"success": True, "rfq": obj.to_dict()}
 
 # -----------------------------
 # 8) Generate/Refresh Fair Price via Stub (helper)
@@ -398,53 +637,231 @@ def refresh_fair_price_stub(rfq_id: str):
     if not obj:
         raise HTTPException(status_code=404, detail="RFQ not found")
 
-    ids = resolve_instrument(obj["instrumentId"])
+    ids = resolve_instrument(obj.instrumentId)
     parent = ids["parent"]
     micro = ids["micro"]
-    stub = fair_price_stub(parent, {"side": obj["side"], "qty": obj["qty"], "micro": bool(micro)})
-
-    obj["fairPrice"] = stub["fairPrice"]
-    obj["bandLow"] = stub["bandLow"]
-    obj["bandHigh"] = stub["bandHigh"]
-    obj["explanation"] = stub["explanation"]
-
-    # Mirror to auction orders
-    a = auctions.get(obj["auctionId"])
-    if a:
-        for o in a.get("orders", []):
-            if o["id"] == rfq_id:
-                o["fairPrice"] = obj["fairPrice"]
-                o["bandLow"] = obj["bandLow"]
-                o["bandHigh"] = obj["bandHigh"]
-                o["explanation"] = obj["explanation"]
-                break
-
-    add_audit("RFQ_FAIRPRICE_STUB", {"rfqId": rfq_id, **stub}, obj["auctionId"])
-    return {"success": True, "rfq": obj}
+    stub = pricing.quote(parent, obj.side, obj.qty, bool(micro))
+
+    with auction_lock(obj.auctionId):
+        commit("rfq.fairprice", {"id": rfq_id, "fields": stub, "event": "RFQ_FAIRPRICE_STUB", "ts": now_ms()})
+        return {"success": True, "rfq": obj.to_dict()}
+
+# -----------------------------
+# 8b) Batch re-pricing of OPEN RFQs (one vector pass, one audit event per auction)
+# -----------------------------
+def _reprice_rows(auction_ids: List[str]):
+    """OPEN rows of each auction and their distinct pricing keys (inv maps the concatenated rows to keys)."""
+    books = [order_books[aid] for aid in auction_ids]
+    rows = [np.flatnonzero(book.col("status") == OPEN) for book in books]
+    fv = np.concatenate([np.full(len(r), float(bonds[b.parentId].get("faceValue", 100.0))) for b, r in zip(books, rows)] or [np.empty(0)])
+    side = np.concatenate([b.col("side")[r] for b, r in zip(books, rows)] or [np.empty(0)])
+    qty = np.concatenate([b.col("qty")[r] for b, r in zip(books, rows)] or [np.empty(0)])
+    micro = np.concatenate([np.full(len(r), b.microId is not None) for b, r in zip(books, rows)] or [np.empty(0, bool)])
+    keys, inv = pricing.row_keys(fv, side, qty, micro)
+    return books, rows, keys, inv
+
+@applier("rfq.reprice")
+def apply_reprice(rec: dict) -> int:
+    books, rows, keys, inv = _reprice_rows(rec["auctionIds"])
+    # The quotes travel in the record (model prices may be gone from the cache on replay);
+    # older records without them re-run the local formula
+    quotes = {tuple(k): v for k, v in rec.get("quotes", ())}
+    fair, low, high, explanations = pricing.row_quotes(keys, inv, quotes)
+
+    start = 0
+    for book, r in zip(books, rows):
+        if not len(r):
+            continue
+        part = slice(start, start + len(r))
+        start += len(r)
+        book.cols["fairPrice"][r] = fair[part]
+        book.cols["bandLow"][r] = low[part]
+        book.cols["bandHigh"][r] = high[part]
+        ex = book.extra["explanation"]
+        for row, text in zip(r.tolist(), explanations[part]):
+            ex[row] = text
+        book.touch(r)
+        add_audit("RFQ_FAIRPRICE_BATCH", {"auctionId": book.auctionId, "repriced": len(r)}, book.auctionId, rec["ts"])
+        feed.publish(book.auctionId, "orders_repriced", lambda book=book, r=r: [
+            {"id": book.ids[row], "fairPrice": f, "bandLow": lo, "bandHigh": hi}
+            for row, f, lo, hi in zip(r.tolist(), book.col("fairPrice")[r].tolist(), book.col("bandLow")[r].tolist(), book.col("bandHigh")[r].tolist())
+        ])
+    return start
+
+def reprice(auction_ids: List[str]) -> Dict[str, Any]:
+    """
+    Re-prices OPEN RFQs from the pricing cache, as order entry does: model
+    prices while cached, the local formula otherwise. Keys without a fresh
+    model price are queued on the pricing service, whose results arrive as
+    rfq.modelprice commits.
+    """
+    # Lock in sorted order so concurrent multi-auction reprices can't deadlock
+    with ExitStack() as stack:
+        for aid in sorted(auction_ids):
+            stack.enter_context(auction_lock(aid))
+        live = [aid for aid in auction_ids if auctions.get(aid, {}).get("status") == "OPEN"]
+        if not live:
+            return {"success": True, "auctions": 0, "repriced": 0}
+        books, rows, keys, inv = _reprice_rows(live)
+        quotes, stale = pricing.cached_quotes(keys)
+        n = commit("rfq.reprice", {"auctionIds": live, "quotes": [(k, quotes[k]) for k in keys], "ts": now_ms()})
+        stale_idx = {keys.index(k) for k in stale}
+        wanted = []
+        start = 0
+        for book, r in zip(books, rows):
+            for row, k in zip(r.tolist(), inv[start:start + len(r)].tolist()):
+                if k in stale_idx:
+                    wanted.append((keys[k], (book.auctionId, book.ids[row])))
+            start += len(r)
+    pricing.service.request(wanted)
+    return {"success": True, "auctions": len(live), "repriced": n}
+
+@router.post("/auction/{auction_id}/reprice")
+def reprice_auction(auction_id: str):
+    """Re-prices every OPEN RFQ of the auction from the current engine inputs."""
+    a = auctions.get(auction_id)
+    if not a:
+        raise HTTPException(status_code=404, detail="Auction not found")
+    if a["status"] != "OPEN":
+        raise HTTPException(status_code=400, detail="Auction not open")
+    return reprice([auction_id])
+
+@router.post("/reprice")
+def reprice_open_auctions(instrumentId: Optional[str] = None):
+    """Re-prices OPEN RFQs across all OPEN auctions (or one instrument's)."""
+    if instrumentId is not None:
+        return reprice(list(open_auctions.get(instrumentId, ())))
+    return reprice([aid for iid in list(open_auctions) for aid in list(open_auctions.get(iid, ()))])
+
+# -----------------------------
+# 8c) Model prices pushed back by the async pricing service
+# -----------------------------
+PRICE_FIELDS = ("fairPrice", "bandLow", "bandHigh", "explanation")
+
+@applier("rfq.modelprice")
+def apply_model_prices(rec: dict):
+    auction_id = rec["auctionId"]
+    for rfq_id, fair, low, high, explanation in rec["prices"]:
+        obj = rfqs[rfq_id]
+        obj.fairPrice, obj.bandLow, obj.bandHigh, obj.explanation = fair, low, high, explanation
+    order_books[auction_id].touch([rfqs[p[0]].row for p in rec["prices"]])
+    add_audit("RFQ_FAIRPRICE_MODEL", {"auctionId": auction_id, "repriced": len(rec["prices"])}, auction_id, rec["ts"])
+    feed.publish(auction_id, "orders_repriced", lambda: [
+        {"id": rfq_id, "fairPrice": fair, "bandLow": low, "bandHigh": high}
+        for rfq_id, fair, low, high, _ in rec["prices"]
+    ])
+
+def push_model_prices(auction_id: str, updates: List[tuple]):
+    """Pricing-service sink: one commit per auction, only for OPEN RFQs whose price changed."""
+    with auction_lock(auction_id):
+        if auctions.get(auction_id, {}).get("status") != "OPEN":
+            return
+        prices = []
+        for rfq_id, q in updates:
+            obj = rfqs.get(rfq_id)
+            if obj is None or obj.status != "OPEN":
+                continue
+            if all(getattr(obj, k) == q.get(k) for k in PRICE_FIELDS):
+                continue
+            prices.append([rfq_id, *(q.get(k) for k in PRICE_FIELDS)])
+        if prices:
+            commit("rfq.modelprice", {"auctionId": auction_id, "ts": now_ms(), "prices": prices})
+
+pricing.service.sink = push_model_prices
 
 # -----------------------------
 # 9) Dealer Quote endpoints (optional bulletin-board RFQ)
 # -----------------------------
+QUOTE_TTL_S = float(os.environ.get("BONDMATCH_QUOTE_TTL_S", "30"))
+QUOTE_TTL_MAX_S = 3600
+
+def _quotes_delta(obj: Rfq, now: int) -> Dict[str, Any]:
+    qb = obj.quotes
+    return {"id": obj.id, "quotes": qb.to_list(now), "bestQuote": qb.best(now)}
+
+@applier("rfq.quote")
+def apply_add_quote(rec: dict):
+    obj = rfqs[rec["id"]]
+    q = rec["quote"]
+    add_audit("RFQ_QUOTE_ADDED", {"rfqId": obj.id, "dealer": q["dealer"], "price": q["price"]}, obj.auctionId, rec["ts"])
+    if q["expiresAt"] <= now_ms():
+        return      # replaying a quote that has since expired: the wheel would already have evicted it
+    if obj.quotes is None:
+        obj.quotes = QuoteBook(obj.side)
+    obj.quotes.put(q)
+    obj.book.touch(obj.row)
+    iq = instrument_quotes.get(obj.instrumentId)
+    if iq is None:
+        iq = instrument_quotes[obj.instrumentId] = InstrumentQuotes()
+    iq.put(obj.id, obj.side, q)
+    quote_expiry.schedule((obj.id, q["dealer"]), q["expiresAt"])
+    feed.publish(obj.auctionId, "order_modified", lambda: _quotes_delta(obj, now_ms()))
+
 @router.post("/{rfq_id}/quote")
 def add_quote(rfq_id: str, quote: dict):
     """
-    Body: { "dealer": "LP1", "price": 100.1 }
+    Body: { "dealer": "LP1", "price": 100.1, "ttlSeconds": 30 }   # ttlSeconds optional
+    A dealer's new quote replaces its previous one on this RFQ.
     """
     obj = rfqs.get(rfq_id)
     if not obj:
         raise HTTPException(status_code=404, detail="RFQ not found")
-    if obj["status"] != "OPEN":
-        raise HTTPException(status_code=400, detail=f"RFQ not open (status={obj['status']})")
 
     dealer = quote.get("dealer")
     price = quote.get("price")
     if not dealer or price is None:
         raise HTTPException(status_code=400, detail="dealer and price required")
-
-    q = {"dealer": dealer, "price": float(price), "timestamp": time.time()}
-    obj["quotes"].append(q)
-    add_audit("RFQ_QUOTE_ADDED", {"rfqId": rfq_id, "dealer": dealer, "price": price}, obj["auctionId"])
-    return obj
+    ttl = quote.get("ttlSeconds", QUOTE_TTL_S)
+    if not isinstance(ttl, (int, float)) or not 0 < ttl <= QUOTE_TTL_MAX_S:
+        raise HTTPException(status_code=400, detail=f"ttlSeconds must be in (0, {QUOTE_TTL_MAX_S}]")
+
+    with auction_lock(obj.auctionId):
+        if obj.status != "OPEN":
+            raise HTTPException(status_code=400, detail=f"RFQ not open (status={obj.status})")
+
+        now = time.time()
+        q = {"dealer": dealer, "price": float(price), "timestamp": now, "expiresAt": int((now + ttl) * 1000)}
+        commit("rfq.quote", {"id": rfq_id, "quote": q, "ts": now_ms()})
+        return obj.to_dict()
+
+def expire_quotes(keys):
+    """Timer wheel callback: drops expired (rfq_id, dealer) quotes. Not logged: replay skips expired quotes."""
+    by_rfq: Dict[str, List[str]] = {}
+    for rfq_id, dealer in keys:
+        by_rfq.setdefault(rfq_id, []).append(dealer)
+    for rfq_id, dealers in by_rfq.items():
+        obj = rfqs.get(rfq_id)
+        if obj is None or obj.quotes is None:
+            continue
+        with auction_lock(obj.auctionId):
+            now = now_ms()
+            evicted = [d for d in dealers if obj.quotes.evict(d, now)]
+            if not evicted:
+                continue
+            obj.book.touch(obj.row)
+            iq = instrument_quotes.get(obj.instrumentId)
+            if iq is not None:
+                for d in evicted:
+                    iq.drop(rfq_id, d)
+            feed.publish(obj.auctionId, "order_modified", lambda: _quotes_delta(obj, now))
+
+quote_expiry = TimerWheel(expire_quotes)
+
+def rearm_quote_expiry():
+    """After recovery: re-arm expiry timers for quotes restored from the snapshot"""
+    for book in order_books.values():
+        for row, qb in list(book.extra["quotes"].items()):
+            for dealer, (_, q) in list(qb.dealers.items()):
+                quote_expiry.schedule((book.ids[row], dealer), q["expiresAt"])
+
+@applier("rfq.accept")
+def apply_accept_quote(rec: dict):
+    obj = rfqs[rec["id"]]
+    # The accepted quote travels in the record: on replay it may have expired since
+    obj.acceptedQuote = rec.get("quote") or obj.quotes.get(rec["dealer"])
+    obj.book.touch(obj.row)
+    add_audit("RFQ_QUOTE_ACCEPTED", {"rfqId": obj.id, "dealer": rec["dealer"]}, obj.auctionId, rec["ts"])
+    feed.publish(obj.auctionId, "order_modified", lambda: {"id": obj.id, "acceptedQuote": obj.acceptedQuote})
 
 @router.post("/{rfq_id}/accept")
 def accept_quote(rfq_id: str, body: dict):
@@ -458,9 +875,21 @@ def accept_quote(rfq_id: str, body: dict):
     dealer = body.get("dealer")
     if not dealer:
         raise HTTPException(status_code=400, detail="dealer required")
-    found = next((q for q in obj.get("quotes", []) if q["dealer"] == dealer), None)
-    if not found:
-        raise HTTPException(status_code=404, detail="quote from dealer not found")
-    obj["acceptedQuote"] = found
-    add_audit("RFQ_QUOTE_ACCEPTED", {"rfqId": rfq_id, "dealer": dealer}, obj["auctionId"])
-    return obj
+    with auction_lock(obj.auctionId):
+        found = obj.quotes.get(dealer, now_ms()) if obj.quotes is not None else None
+        if not found:
+            raise HTTPException(status_code=404, detail="live quote from dealer not found")
+        commit("rfq.accept", {"id": rfq_id, "dealer": dealer, "quote": found, "ts": now_ms()})
+        return obj.to_dict()
+
+@router.get("/instrument/{instrument_id}/quotes")
+def best_instrument_quotes(instrument_id: str):
+    """
+    Best live dealer quotes across all OPEN RFQs of an instrument:
+    bestOffer (lowest, quoted to buyers) and bestBid (highest, quoted to sellers).
+    """
+    resolve_instrument(instrument_id)
+    now = now_ms()
+    iq = instrument_quotes.get(instrument_id)
+    best = iq.best(now, lambda rfq_id: rfq_id in rfqs and rfqs[rfq_id].status == "OPEN") if iq else {"bestOffer": None, "bestBid": None}
+    return {"instrumentId": instrument_id, "asOfMs": now, **best}
@@ -0,0 +1,173 @@
+# rfq_index.py
+"""
+Secondary indexes over RFQs for list queries.
+
+Each index maps a key (userId, status, instrumentId, auctionId) to an
+ascending array of RFQ sequence numbers. Seqs are assigned together with ts
+at creation, so seq order is creation (ts) order and doubles as a stable,
+unique keyset cursor. A query walks the smallest matching index from the
+newest end and probes the remaining filters per candidate, so a page costs
+O(limit) for selective filters instead of a scan + sort of every RFQ.
+
+userId/instrumentId/auctionId never change; the status index is moved on
+cancel and, in one batch per auction, at clearing.
+"""
+import threading
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from order_book import STATUSES, OrderBook
+from rfq_store import Rfq
+
+FIELDS = ("userId", "status", "instrumentId", "auctionId")
+
+
+def _splice(arr: array, seqs: np.ndarray, op) -> None:
+    """
+    Rewrites only the part of `arr` spanned by `seqs` (sorted): one auction's
+    RFQs sit in a short run of the global order, so this costs the run plus a
+    tail memmove instead of a pass over every seq ever indexed.
+    """
+    a = np.frombuffer(arr, dtype=np.int64)
+    lo = int(np.searchsorted(a, seqs[0]))
+    hi = int(np.searchsorted(a, seqs[-1], side="right"))
+    part = op(a[lo:hi], seqs).astype(np.int64).tobytes()
+    del a   # the array cannot be resized while a view is exported
+    arr[lo:hi] = array("q", part)
+
+
+def _without(arr: array, seqs: np.ndarray) -> None:
+    _splice(arr, seqs, lambda run, s: run[~np.isin(run, s)])
+
+
+def _with(arr: array, seqs: np.ndarray) -> None:
+    _splice(arr, seqs, np.union1d)
+
+
+class RfqIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_seq: Dict[int, Rfq] = {}
+        self.all = array("q")
+        self.idx: Dict[str, Dict[str, array]] = {f: {} for f in FIELDS}
+
+    def _insert(self, field: str, key: str, seq: int):
+        arr = self.idx[field].get(key)
+        if arr is None:
+            arr = self.idx[field][key] = array("q")
+        if not arr or arr[-1] < seq:
+            arr.append(seq)
+        else:
+            # commits on different auctions can land slightly out of seq order
+            insort(arr, seq)
+
+    def _remove(self, field: str, key: str, seq: int):
+        arr = self.idx[field].get(key)
+        if arr is not None:
+            i = bisect_left(arr, seq)
+            if i < len(arr) and arr[i] == seq:
+                del arr[i]
+
+    def add(self, rfq: Rfq):
+        self.add_many((rfq,))
+
+    def add_many(self, batch):
+        with self._lock:
+            for rfq in batch:
+                seq = rfq.seq
+                self.by_seq[seq] = rfq
+                if not self.all or self.all[-1] < seq:
+                    self.all.append(seq)
+                else:
+                    insort(self.all, seq)
+                for f in FIELDS:
+                    self._insert(f, getattr(rfq, f), seq)
+
+    def remove_many(self, batch):
+        """Drops RFQs (an archived auction's) from every index."""
+        with self._lock:
+            seqs = np.array(sorted(rfq.seq for rfq in batch), dtype=np.int64)
+            keys = {f: set() for f in FIELDS}
+            for rfq in batch:
+                self.by_seq.pop(rfq.seq, None)
+                for f in FIELDS:
+                    keys[f].add(getattr(rfq, f))
+            if not len(seqs):
+                return
+            _without(self.all, seqs)
+            for f, ks in keys.items():
+                idx = self.idx[f]
+                for k in ks:
+                    arr = idx.get(k)
+                    if arr is None:
+                        continue
+                    _without(arr, seqs)
+                    if not arr:
+                        del idx[k]
+
+    def set_status(self, rfq: Rfq, old: str):
+        with self._lock:
+            self._remove("status", old, rfq.seq)
+            self._insert("status", rfq.status, rfq.seq)
+
+    def restatus_book(self, book: OrderBook, before: np.ndarray):
+        """Batch status move after clearing: `before` is the status column prior to it."""
+        after = book.col("status")
+        changed = np.flatnonzero(before != after)
+        if not len(changed):
+            return
+        seqs = book.col("seq")[changed]
+        order = np.argsort(seqs)
+        seqs, olds, news = seqs[order], before[changed][order], after[changed][order]
+        with self._lock:
+            status_idx = self.idx["status"]
+            for code in np.unique(olds).tolist():
+                arr = status_idx.get(STATUSES[code])
+                if arr is not None:
+                    _without(arr, seqs[olds == code])
+            for code in np.unique(news).tolist():
+                _with(status_idx.setdefault(STATUSES[code], array("q")), seqs[news == code])
+
+    def rebuild(self, rfqs):
+        with self._lock:
+            self.by_seq = {}
+            self.all = array("q")
+            self.idx = {f: {} for f in FIELDS}
+        self.add_many(sorted(rfqs, key=lambda r: r.seq))
+
+    def query(self, filters: Dict[str, str], limit: int, before: Optional[int] = None) -> Tuple[List[Rfq], Optional[int]]:
+        """
+        Newest-first page of RFQs matching all `filters` with seq < `before`.
+        Returns (rfqs, next cursor or None).
+        """
+        filters = {f: v for f, v in filters.items() if v is not None}
+        with self._lock:
+            lists = []
+            for f, v in filters.items():
+                arr = self.idx[f].get(v)
+                if arr is None:
+                    return [], None
+                lists.append((len(arr), f, arr))
+            if lists:
+                _, drive, arr = min(lists)
+            else:
+                drive, arr = None, self.all
+            probes = [(f, v) for f, v in filters.items() if f != drive]
+            i = len(arr) if before is None else bisect_left(arr, before)
+            out: List[Rfq] = []
+            while i > 0 and len(out) < limit:
+                i -= 1
+                rfq = self.by_seq[arr[i]]
+                if all(getattr(rfq, f) == v for f, v in probes):
+                    out.append(rfq)
+            more = i > 0 and len(out) == limit
+        return out, (out[-1].seq if more else None)
+
+    def __len__(self) -> int:
+        return len(self.all)
+
+
+rfq_index = RfqIndex()
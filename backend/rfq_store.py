@@ -0,0 +1,95 @@
+# rfq_store.py
+"""
+RFQ handles. The auction's columnar OrderBook is the single source of truth;
+an Rfq is just (book, row) and its attributes read/write the book's
+columns and side tables. Dicts are only built at API serialization (to_dict).
+"""
+from itertools import count
+from typing import Optional, Dict, Any
+
+from order_book import OrderBook, SIDES, STATUSES, STATUS_CODE, TIFS
+
+# Dense, monotonically increasing RFQ sequence numbers
+_seq = count()
+
+
+def next_seq() -> int:
+    return next(_seq)
+
+
+def reset_seq(start: int):
+    """Continues numbering at `start` (after recovery)."""
+    global _seq
+    _seq = count(start)
+
+
+def _float_col(name: str, nullable: bool = True):
+    def get(self):
+        x = float(self.book.cols[name][self.row])
+        return None if nullable and x != x else x
+
+    def set(self, value):
+        self.book.cols[name][self.row] = float("nan") if value is None else value
+
+    return property(get, set)
+
+
+def _code_col(name: str, names: tuple, codes: Optional[dict] = None):
+    def get(self):
+        return names[self.book.cols[name][self.row]]
+
+    def set(self, value):
+        self.book.cols[name][self.row] = codes[value]
+
+    return property(get, set if codes else None)
+
+
+def _side_table(name: str):
+    def get(self):
+        return self.book.extra[name].get(self.row)
+
+    def set(self, value):
+        if value is None:
+            self.book.extra[name].pop(self.row, None)
+        else:
+            self.book.extra[name][self.row] = value
+
+    return property(get, set)
+
+
+class Rfq:
+    __slots__ = ("book", "row")
+
+    def __init__(self, book: OrderBook, row: int):
+        self.book = book
+        self.row = row
+
+    id = property(lambda self: self.book.ids[self.row])
+    auctionId = property(lambda self: self.book.auctionId)
+    instrumentId = property(lambda self: self.book.instrumentId)
+    parentId = property(lambda self: self.book.parentId)
+    microId = property(lambda self: self.book.microId)
+    userId = property(lambda self: self.book.userIds[self.row])
+    ts = property(lambda self: int(self.book.cols["ts"][self.row]))
+    seq = property(lambda self: int(self.book.cols["seq"][self.row]))
+
+    side = _code_col("side", SIDES)
+    timeInForce = _code_col("tif", TIFS)
+    status = _code_col("status", STATUSES, STATUS_CODE)
+
+    qty = _float_col("qty", nullable=False)
+    limitPrice = _float_col("limitPrice")
+    filledQty = _float_col("filledQty", nullable=False)
+    avgFillPrice = _float_col("avgFillPrice")
+    fairPrice = _float_col("fairPrice")
+    bandLow = _float_col("bandLow")
+    bandHigh = _float_col("bandHigh")
+
+    explanation = _side_table("explanation")
+    quotes = _side_table("quotes")
+    acceptedQuote = _side_table("acceptedQuote")
+    tsCancelled = _side_table("tsCancelled")
+    tsModified = _side_table("tsModified")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.book.to_dicts((self.row,))[0]
@@ -0,0 +1,85 @@
+# scheduler.py
+"""
+Single-thread auction close scheduler.
+
+One daemon thread sleeps on a min-heap keyed by close time (ms) instead of
+one sleeping thread per auction. Insert is O(log n); cancel/reschedule mark
+the old heap entry dead (lazy deletion) so they are O(log n) as well.
+Everything due at the same tick is handed to the callback as one batch.
+"""
+import heapq
+import logging
+import threading
+import time
+from itertools import count
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+
+class CloseScheduler:
+    def __init__(self, on_due: Callable[[List[str]], None]):
+        self._on_due = on_due
+        self._heap: List[list] = []            # [t_ms, tiebreak, key, alive]
+        self._entries: Dict[str, list] = {}    # key -> live heap entry
+        self._tiebreak = count()
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def schedule(self, key: str, t_ms: int):
+        """Schedules (or reschedules) `key` to fire at epoch-ms `t_ms`."""
+        with self._cv:
+            old = self._entries.get(key)
+            if old is not None:
+                old[3] = False
+            entry = [t_ms, next(self._tiebreak), key, True]
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="auction-close-scheduler", daemon=True)
+                self._thread.start()
+            # Wake the loop only if the new entry is now the earliest
+            if self._heap[0] is entry:
+                self._cv.notify()
+
+    def cancel(self, key: str) -> bool:
+        with self._cv:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            entry[3] = False
+            return True
+
+    def due_at(self, key: str) -> Optional[int]:
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def _pop_due(self, now: int) -> List[str]:
+        due = []
+        heap = self._heap
+        while heap and (not heap[0][3] or heap[0][0] <= now):
+            entry = heapq.heappop(heap)
+            if entry[3]:
+                entry[3] = False
+                del self._entries[entry[2]]
+                due.append(entry[2])
+                metrics.scheduler_lag.observe((now - entry[0]) / 1000)
+        return due
+
+    def _run(self):
+        while True:
+            with self._cv:
+                now = int(time.time() * 1000)
+                due = self._pop_due(now)
+                if not due:
+                    timeout = (self._heap[0][0] - now) / 1000 if self._heap else None
+                    self._cv.wait(timeout)
+                    continue
+            # Callback runs outside the scheduler lock so it can reschedule
+            try:
+                self._on_due(due)
+            except Exception:
+                logging.exception("auction close batch failed: %s", due)
@@ -0,0 +1,394 @@
+# shard_router.py
+"""
+Sharded deployment: a thin router process in front of N engine workers.
+
+    cd backend
+    python shard_router.py --shards 4 --port 8000
+
+Each worker is `uvicorn main:app` on its own Unix socket with
+BONDMATCH_SHARD=<i>/<N> (and its own BONDMATCH_DATA_DIR subdirectory when
+persistence is on), so instruments are matched on separate cores. Workers mint
+ids that encode their shard (sharding.new_id), so the router forwards any
+request naming a bond, micro-bond, auction or RFQ to its owner from the id
+alone. /rfq/create and /rfq/batch are routed by instrumentId, and new bonds
+are spread round-robin. Cross-shard reads (bond and auction listings,
+/rfq/list, /health/stats, /health/metrics) scatter to every worker and merge.
+Merged pages keep newest-first order and use a composite cursor holding one
+position per shard.
+
+The router only parses what it needs to pick a shard; everything else is
+passed through as bytes (SSE streams included).
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from sharding import shard_of
+
+HOP_HEADERS = {"host", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+class Shards:
+    def __init__(self, count: int, run_dir: str):
+        self.count = count
+        self.paths = [os.path.join(run_dir, f"shard-{i}.sock") for i in range(count)]
+        self.procs: List[subprocess.Popen] = []
+        self.clients = [
+            httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(uds=path), base_url="http://shard", timeout=None)
+            for path in self.paths
+        ]
+        self._rr = itertools.count()
+
+    def spawn(self, data_dir: Optional[str]):
+        here = os.path.dirname(os.path.abspath(__file__))
+        for i, path in enumerate(self.paths):
+            env = dict(os.environ, BONDMATCH_SHARD=f"{i}/{self.count}")
+            if data_dir:
+                env["BONDMATCH_DATA_DIR"] = os.path.join(data_dir, f"shard-{i}")
+            self.procs.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--uds", path, "--log-level", "warning"],
+                cwd=here,
+                env=env,
+            ))
+
+    async def wait_ready(self, timeout_s: float = 30.0):
+        deadline = time.monotonic() + timeout_s
+        for i, client in enumerate(self.clients):
+            while True:
+                try:
+                    if (await client.get("/health/ping")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if self.procs[i].poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"shard {i} did not start")
+                await asyncio.sleep(0.1)
+
+    async def close(self):
+        for client in self.clients:
+            await client.aclose()
+        for proc in self.procs:
+            proc.terminate()
+        for proc in self.procs:
+            proc.wait(timeout=10)
+
+    def owner(self, entity_id: str) -> int:
+        return shard_of(entity_id, self.count)
+
+    def next(self) -> int:
+        return next(self._rr) % self.count
+
+    async def each(self, method: str, path: str, **kw) -> List[httpx.Response]:
+        return await asyncio.gather(*(c.request(method, path, **kw) for c in self.clients))
+
+
+shards: Optional[Shards] = None
+
+
+# -----------------------------
+# Pass-through
+# -----------------------------
+async def forward(shard: int, request: Request, body: bytes) -> Response:
+    client = shards.clients[shard]
+    url = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+    headers = [(k, v) for k, v in request.headers.items() if k not in HOP_HEADERS]
+    r = await client.send(client.build_request(request.method, url, headers=headers, content=body), stream=True)
+    out_headers = {k: v for k, v in r.headers.items() if k.lower() not in HOP_HEADERS}
+    if r.headers.get("content-type", "").startswith("text/event-stream"):
+        return StreamingResponse(r.aiter_raw(), status_code=r.status_code, headers=out_headers, background=BackgroundTask(r.aclose))
+    content = await r.aread()
+    await r.aclose()
+    return Response(content, status_code=r.status_code, headers=out_headers)
+
+
+def first_error(resps: List[httpx.Response]) -> Optional[Response]:
+    for r in resps:
+        if r.status_code >= 400:
+            return Response(r.content, status_code=r.status_code, media_type=r.headers.get("content-type"))
+    return None
+
+
+async def by_id(request: Request, body: bytes, m: re.Match) -> Response:
+    return await forward(shards.owner(m["id"]), request, body)
+
+
+async def round_robin(request: Request, body: bytes, m: re.Match) -> Response:
+    return await forward(shards.next(), request, body)
+
+
+async def by_instrument(request: Request, body: bytes, m: re.Match) -> Response:
+    try:
+        instrument_id = json.loads(body).get("instrumentId")
+    except (ValueError, AttributeError):
+        instrument_id = None
+    # Malformed bodies still go to a shard, which produces the usual 4xx
+    shard = shards.owner(instrument_id) if isinstance(instrument_id, str) and instrument_id else 0
+    return await forward(shard, request, body)
+
+
+# -----------------------------
+# Scatter-gather
+# -----------------------------
+async def gather_bonds(request: Request, body: bytes, m: re.Match) -> Response:
+    resps = await shards.each("GET", "/bond/", params=request.query_params)
+    if first_error(resps):
+        return first_error(resps)
+    merged: Dict[str, Any] = {}
+    for r in resps:
+        merged.update(r.json())
+    return JSONResponse(merged)
+
+
+async def gather_auctions(request: Request, body: bytes, m: re.Match) -> Response:
+    resps = await shards.each("GET", "/auction/allAuctions")
+    return first_error(resps) or JSONResponse([a for r in resps for a in r.json()])
+
+
+async def gather_stats(request: Request, body: bytes, m: re.Match) -> Response:
+    resps = await shards.each("GET", "/health/stats")
+    if first_error(resps):
+        return first_error(resps)
+    per_shard = [r.json() for r in resps]
+    totals = {k: sum(s[k] for s in per_shard) for k, v in per_shard[0].items() if isinstance(v, (int, float))}
+    return JSONResponse({**totals, "shards": per_shard})
+
+
+_SAMPLE = re.compile(r"^([A-Za-z_:][\w:]*)(?:\{(.*)\})? (.*)$")
+
+
+async def gather_metrics(request: Request, body: bytes, m: re.Match) -> Response:
+    """Every shard's samples under one HELP/TYPE header per family, labelled shard="<i>"."""
+    resps = await shards.each("GET", "/health/metrics")
+    families: Dict[str, Tuple[List[str], List[str]]] = {}
+    for i, r in enumerate(resps):
+        family = None
+        for line in r.text.splitlines():
+            if line.startswith("# "):
+                family = line.split()[2]
+                head, _ = families.setdefault(family, ([], []))
+                if line not in head:
+                    head.append(line)
+                continue
+            sm = _SAMPLE.match(line)
+            if sm is None or family is None:
+                continue
+            labels = f'shard="{i}"' + (f",{sm[2]}" if sm[2] else "")
+            families[family][1].append(f"{sm[1]}{{{labels}}} {sm[3]}")
+    text = "".join("\n".join(head + samples) + "\n" for head, samples in families.values())
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+
+async def reprice_all(request: Request, body: bytes, m: re.Match) -> Response:
+    instrument_id = request.query_params.get("instrumentId")
+    if instrument_id:
+        return await forward(shards.owner(instrument_id), request, body)
+    resps = await shards.each("POST", "/rfq/reprice")
+    if first_error(resps):
+        return first_error(resps)
+    per_shard = [r.json() for r in resps]
+    return JSONResponse({
+        "success": True,
+        "auctions": sum(s["auctions"] for s in per_shard),
+        "repriced": sum(s["repriced"] for s in per_shard),
+    })
+
+
+async def scatter_batch(request: Request, body: bytes, m: re.Match) -> Response:
+    """Splits the batch by owning shard and stitches per-item results back into input order."""
+    try:
+        text = body.decode("utf-8")
+        if "ndjson" not in request.headers.get("content-type", "") and text.lstrip().startswith("["):
+            items = json.loads(text)
+            if not isinstance(items, list):
+                raise ValueError("expected a JSON array")
+        else:
+            items = [json.loads(line) for line in text.splitlines() if line.strip()]
+    except ValueError as e:
+        return JSONResponse({"detail": f"Invalid batch body: {e}"}, status_code=400)
+
+    groups: Dict[int, List[int]] = {}
+    for i, item in enumerate(items):
+        instrument_id = item.get("instrumentId") if isinstance(item, dict) else None
+        shard = shards.owner(instrument_id) if isinstance(instrument_id, str) and instrument_id else 0
+        groups.setdefault(shard, []).append(i)
+
+    order = list(groups.items())
+    resps = await asyncio.gather(*(
+        shards.clients[shard].post("/rfq/batch", json=[items[i] for i in idxs]) for shard, idxs in order
+    ))
+    if first_error(resps):
+        return first_error(resps)
+    results: List[Any] = [None] * len(items)
+    accepted = 0
+    for (shard, idxs), r in zip(order, resps):
+        part = r.json()
+        accepted += part["accepted"]
+        for res in part["results"]:
+            res["index"] = idxs[res["index"]]
+            results[res["index"]] = res
+    return JSONResponse({"accepted": accepted, "rejected": len(items) - accepted, "results": results})
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[List[str]]:
+    """Composite cursor: one shard cursor per shard; "" = from the newest, "-" = exhausted."""
+    if cursor is None:
+        return [""] * shards.count
+    parts = cursor.split(";")
+    if len(parts) != shards.count:
+        return None
+    if not all(part in ("", "-") or part.isdigit() for part in parts):
+        return None
+    return parts
+
+
+async def merged_page(request: Request, path: str, sort_key: Callable[[dict], Any], position: Callable[[dict], int],
+                      default_limit: int, max_limit: int) -> Response:
+    """
+    Newest-first page across shards. Each shard is asked for its next `limit`
+    items, the pages are merged by `sort_key`, and the cursor records where each
+    shard stopped: the keyset `position` of the last item used from it (its own
+    cursor, exclusive), so every shard fetch is exactly `limit` items.
+    """
+    params = dict(request.query_params)
+    raw_limit = params.pop("limit", str(default_limit))
+    if not raw_limit.isdigit() or not 1 <= int(raw_limit) <= max_limit:
+        return JSONResponse({"detail": f"limit must be between 1 and {max_limit}"}, status_code=400)
+    limit = int(raw_limit)
+    states = _decode_cursor(params.pop("cursor", None))
+    if states is None:
+        return JSONResponse({"detail": "Invalid cursor"}, status_code=400)
+
+    async def fetch(shard: int, before: str):
+        if before == "-":
+            return [], None, None
+        p = dict(params, limit=limit)
+        if before:
+            p["cursor"] = before
+        r = await shards.clients[shard].get(path, params=p)
+        if r.status_code >= 400:
+            return [], None, r
+        return r.json(), r.headers.get("x-next-cursor"), None
+
+    pages = await asyncio.gather(*(fetch(i, b) for i, b in enumerate(states)))
+    errors = [err for _, _, err in pages if err is not None]
+    if errors:
+        return first_error(errors)
+
+    tagged = [[(i, item) for item in items] for i, (items, _, _) in enumerate(pages)]
+    out, used = [], [0] * shards.count
+    for i, item in itertools.islice(heapq.merge(*tagged, key=lambda t: sort_key(t[1]), reverse=True), limit):
+        out.append(item)
+        used[i] += 1
+
+    new_states = []
+    for before, (items, next_cursor, _), n in zip(states, pages, used):
+        if before == "-" or (n == len(items) and next_cursor is None):
+            new_states.append("-")
+        elif n == 0:
+            new_states.append(before)
+        else:
+            new_states.append(str(position(items[n - 1])))
+    headers = {}
+    if any(s != "-" for s in new_states):
+        headers["X-Next-Cursor"] = ";".join(new_states)
+    return JSONResponse(out, headers=headers)
+
+
+async def rfq_page(request: Request, body: bytes, m: re.Match) -> Response:
+    # Filters that pin a single owner skip the scatter (and keep plain cursors)
+    for key in ("auctionId", "instrumentId"):
+        if request.query_params.get(key):
+            return await forward(shards.owner(request.query_params[key]), request, body)
+    return await merged_page(request, "/rfq/list", lambda r: r["ts"], lambda r: r["seq"], 200, 1000)
+
+
+async def summaries_page(request: Request, body: bytes, m: re.Match) -> Response:
+    return await merged_page(request, "/auction/summaries", lambda s: s["tOpenMs"], lambda s: s["ordinal"], 50, 500)
+
+
+async def ping(request: Request, body: bytes, m: re.Match) -> Response:
+    return JSONResponse({"status": "ok", "shards": shards.count})
+
+
+# First match wins; anything unmatched (docs, unknown paths) goes to shard 0
+ROUTES: List[Tuple[Optional[str], "re.Pattern", Callable]] = [(method, re.compile(pattern), fn) for method, pattern, fn in [
+    ("POST", r"/bond/create", round_robin),
+    ("GET", r"/bond/?", gather_bonds),
+    (None, r"/bond/split/(?P<id>[^/]+)", by_id),
+    (None, r"/bond/micro/(?P<id>[^/]+)(/.*)?", by_id),
+    (None, r"/bond/(?P<id>[^/]+)/micro", by_id),
+    ("GET", r"/auction/summaries", summaries_page),
+    ("GET", r"/auction/allAuctions", gather_auctions),
+    ("POST", r"/auction/start/(?P<id>[^/]+)", by_id),
+    (None, r"/auction/(?P<id>[^/]+)(/.*)?", by_id),
+    ("POST", r"/rfq/create", by_instrument),
+    ("POST", r"/rfq/batch", scatter_batch),
+    ("GET", r"/rfq/list", rfq_page),
+    ("POST", r"/rfq/reprice", reprice_all),
+    (None, r"/rfq/auction/(?P<id>[^/]+)(/.*)?", by_id),
+    ("GET", r"/rfq/instrument/(?P<id>[^/]+)/quotes", by_id),
+    (None, r"/rfq/(?P<id>[^/]+)(/.*)?", by_id),
+    ("GET", r"/health/ping", ping),
+    ("GET", r"/health/stats", gather_stats),
+    ("GET", r"/health/metrics", gather_metrics),
+]]
+
+
+def create_app(count: int, data_dir: Optional[str] = None) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        global shards
+        with tempfile.TemporaryDirectory(prefix="bondmatch-shards-") as run_dir:
+            shards = Shards(count, run_dir)
+            shards.spawn(data_dir)
+            try:
+                await shards.wait_ready()
+                yield
+            finally:
+                await shards.close()
+
+    app = FastAPI(title="BondMatch++ Shard Router", lifespan=lifespan)
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    async def dispatch(request: Request, path: str):
+        body = await request.body()
+        for method, pattern, fn in ROUTES:
+            if method is not None and method != request.method:
+                continue
+            m = pattern.fullmatch(request.url.path)
+            if m is not None:
+                return await fn(request, body, m)
+        return await forward(0, request, body)
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    import uvicorn
+
+    p = argparse.ArgumentParser(description="Run the engine as N shard workers behind a router.")
+    p.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    args = p.parse_args(argv)
+    app = create_app(args.shards, os.environ.get("BONDMATCH_DATA_DIR"))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
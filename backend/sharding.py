@@ -0,0 +1,49 @@
+# sharding.py
+"""
+Shard ownership of entity ids.
+
+In sharded mode (see shard_router.py) each worker process runs the full engine
+with BONDMATCH_SHARD="<index>/<count>" and owns the bonds it created plus
+everything hanging off them (micro-bonds, auctions, RFQs). Ownership is
+encoded in the ids themselves: new_id() draws a uuid4 and sets its last byte
+so that shard_of(id) is this worker, which lets the router send any request
+carrying an id to its owner without a lookup table. Micro-bond ids belong to
+their parent's shard.
+
+Unsharded (the default, "0/1") new_id() is a plain uuid4.
+"""
+import os
+import random
+import zlib
+from uuid import uuid4
+
+from micro_range import parse_micro_id
+
+
+def _parse(spec: str):
+    index, _, count = spec.partition("/")
+    index, count = int(index), int(count or 1)
+    if not 0 <= index < count <= 256:
+        raise ValueError(f"BONDMATCH_SHARD must be <index>/<count> with count <= 256, got {spec!r}")
+    return index, count
+
+
+SHARD_INDEX, SHARD_COUNT = _parse(os.environ.get("BONDMATCH_SHARD", "0/1"))
+
+
+def shard_of(entity_id: str, count: int) -> int:
+    parsed = parse_micro_id(entity_id)
+    if parsed is not None:
+        entity_id = parsed[0]
+    try:
+        return int(entity_id[-2:], 16) % count
+    except ValueError:
+        return zlib.crc32(entity_id.encode()) % count   # not one of ours: any stable choice
+
+
+def new_id() -> str:
+    u = str(uuid4())
+    if SHARD_COUNT == 1:
+        return u
+    last = SHARD_INDEX + SHARD_COUNT * random.randrange(256 // SHARD_COUNT)
+    return f"{u[:-2]}{last:02x}"
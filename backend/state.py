@@ -1,20 +1,47 @@
 # Shared in-memory state
+from audit import AuditLog
 
 # Bonds listed in the system
 bonds = {}
-micro_bonds = {} 
+micro_ranges = {}  # bond_id -> micro_range.MicroRange (lazy micro-bonds of a split bond)
+
+# Instrument index (bond_id -> (parent bond, None)); micro-bond ids resolve via micro_ranges
+instruments = {}
 
 # Auctions (auction_id -> auction details)
 auctions = {}
 
+# Secondary auction indexes
+open_auctions = {}    # instrument_id -> {auction_id: None} of its OPEN auctions, in start order
+auction_summaries = {}  # auction_id -> summaries.AuctionSummary (counts, notionals, best bid/offer)
+
+# Columnar order books (auction_id -> OrderBook; book.index maps rfq_id -> row)
+order_books = {}
+
+# Continuous-matching limit order books (auction_id -> lob.LimitOrderBook; CONTINUOUS auctions only)
+lobs = {}
+
+# Best dealer quotes across an instrument's RFQs (instrument_id -> quote_book.InstrumentQuotes)
+instrument_quotes = {}
+
+# Retention (retention.py): what was moved to the on-disk archive
+archived_auctions = {}  # auction_id -> archive file name
+archived_rfqs = {}      # rfq_id -> auction_id
+
+# Running totals derived from applied commits (so they survive snapshot + WAL recovery)
+totals = {"fills": 0}   # fills produced by clearing
+
+# Merkle accumulators (auction_id -> merkle.AuctionMerkle)
+merkle_trees = {}
+
 # Orders (order_id -> order details)
 orders = {}
 
 # Fills (execution details)
 fills = {}
 
-# Audit log for compliance
-audit_events = []
+# Audit log for compliance (segmented; indexed by auction, type and time)
+audit_events = AuditLog()
 
 # RFQs (rfq_id -> rfq details)
 rfqs = {}
@@ -0,0 +1,138 @@
+# stream.py
+"""
+Push channel for auction state (Server-Sent Events).
+
+Mutations publish small deltas (order added/cancelled/modified, status change,
+clearing result) instead of clients re-fetching the whole auction. Every
+auction has its own sequence counter; a subscriber gets a snapshot tagged
+with the current sequence, then every delta with a higher one, so a gap in
+the sequence means a missed event. Reconnecting with Last-Event-ID replays
+from a short per-auction ring buffer, or falls back to a fresh snapshot.
+
+publish() is called from whatever thread holds the auction lock; deltas are
+handed to each subscriber's event loop with call_soon_threadsafe.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+REPLAY_EVENTS = 1024
+QUEUE_EVENTS = 4096
+HEARTBEAT_S = 15.0
+RESUME_GRACE_S = 30.0   # keep buffering this long after the last subscriber leaves
+
+RESYNC = object()   # queued when a subscriber fell behind; it gets a new snapshot
+
+
+def sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    __slots__ = ("loop", "queue")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_EVENTS)
+
+    def deliver(self, item):
+        # Runs on the subscriber's loop
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class _Channel:
+    __slots__ = ("seq", "subscribers", "recent", "idleSince")
+
+    def __init__(self):
+        self.seq = 0
+        self.subscribers: List[Subscriber] = []   # replaced, never mutated (publish iterates lock-free)
+        self.idleSince = 0.0
+        # (seq, kind, data); only contiguous while someone is subscribed
+        self.recent: Deque[Tuple[int, str, Any]] = deque(maxlen=REPLAY_EVENTS)
+
+
+class AuctionFeed:
+    def __init__(self):
+        self._channels: Dict[str, _Channel] = {}
+        self._guard = threading.Lock()
+
+    def _channel(self, auction_id: str) -> _Channel:
+        ch = self._channels.get(auction_id)
+        if ch is None:
+            with self._guard:
+                ch = self._channels.setdefault(auction_id, _Channel())
+        return ch
+
+    def publish(self, auction_id: str, kind: str, data: Callable[[], Any]):
+        """
+        Emits one delta. `data` is only called when someone is subscribed, so
+        unwatched auctions pay for a counter increment. Caller holds the auction lock.
+        """
+        ch = self._channels.get(auction_id)
+        if ch is None:
+            return      # never watched: nothing to count or replay
+        ch.seq += 1
+        if not ch.subscribers and time.monotonic() - ch.idleSince > RESUME_GRACE_S:
+            ch.recent.clear()   # history now has a hole; resumes must re-snapshot
+            return
+        payload = data()
+        ch.recent.append((ch.seq, kind, payload))
+        item = (ch.seq, kind, payload)
+        for sub in ch.subscribers:
+            sub.loop.call_soon_threadsafe(sub.deliver, item)
+
+    def subscribe(self, auction_id: str, sub: Subscriber, last_seq: Optional[int]) -> Tuple[int, Optional[List[tuple]]]:
+        """
+        Registers `sub`; caller holds the auction lock so no delta is lost between
+        this and its snapshot. Returns (current seq, missed deltas) when resuming from
+        `last_seq` is possible, else (current seq, None) and the caller sends a snapshot.
+        """
+        ch = self._channel(auction_id)
+        with self._guard:
+            ch.subscribers = ch.subscribers + [sub]
+        if last_seq is not None and last_seq <= ch.seq:
+            missed = [e for e in ch.recent if e[0] > last_seq]
+            first = missed[0][0] if missed else ch.seq + 1
+            if first == last_seq + 1:
+                return ch.seq, missed
+        return ch.seq, None
+
+    def unsubscribe(self, auction_id: str, sub: Subscriber):
+        ch = self._channels.get(auction_id)
+        if ch is None:
+            return
+        with self._guard:
+            ch.subscribers = [s for s in ch.subscribers if s is not sub]
+            if not ch.subscribers:
+                ch.idleSince = time.monotonic()
+
+    def discard(self, auction_id: str):
+        """
+        Drops an auction's channel unless someone is still subscribed. Called once an
+        auction has published its last delta (merkle root after close) and again when
+        the last watcher of a finished auction leaves; a later subscribe starts a
+        fresh channel and gets a snapshot.
+        """
+        with self._guard:
+            ch = self._channels.get(auction_id)
+            if ch is not None and not ch.subscribers:
+                del self._channels[auction_id]
+
+    def seq(self, auction_id: str) -> int:
+        ch = self._channels.get(auction_id)
+        return ch.seq if ch else 0
+
+    def __len__(self) -> int:
+        return sum(len(ch.subscribers) for ch in self._channels.values())
+
+
+feed = AuctionFeed()
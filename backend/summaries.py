@@ -0,0 +1,190 @@
+# summaries.py
+"""
+Incremental per-auction summaries for list/dashboard endpoints.
+
+Each auction keeps running counts, quantities and notionals per side plus the
+best bid/offer, updated by the RFQ appliers in O(log n) per event (price
+levels are heaps with lazy deletion). Listing auctions then costs O(page)
+instead of serializing every order.
+
+The counts, quantities, notionals and best bid/offer describe the working
+book: OPEN orders by remaining quantity, in both modes (a continuous fill
+reduces it, a completed order leaves it). At close nothing is working any
+more, so the summary is emptied whatever the mode; the outcome is in
+clearingPrice/matchedNotional.
+
+Notional: limit orders count at their limit price, market orders at the
+auction's reference price.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional
+
+import state
+
+
+class _Levels:
+    """Multiset of prices with O(log n) best; `sign` = -1 for max (bids)."""
+    __slots__ = ("sign", "heap", "count")
+
+    def __init__(self, sign: int):
+        self.sign = sign
+        self.heap: List[float] = []
+        self.count: Dict[float, int] = {}
+
+    def add(self, px: float):
+        n = self.count.get(px, 0)
+        self.count[px] = n + 1
+        if n == 0:
+            heapq.heappush(self.heap, self.sign * px)
+
+    def remove(self, px: float):
+        n = self.count.get(px, 0) - 1
+        if n > 0:
+            self.count[px] = n
+        else:
+            self.count.pop(px, None)
+
+    def best(self) -> Optional[float]:
+        heap = self.heap
+        while heap and self.sign * heap[0] not in self.count:
+            heapq.heappop(heap)
+        return self.sign * heap[0] if heap else None
+
+
+class AuctionSummary:
+    __slots__ = ("ordinal", "ref", "counts", "qty", "notional", "bids", "offers")
+
+    def __init__(self, ordinal: int, ref: float):
+        self.ordinal = ordinal
+        self.ref = ref
+        self.counts = {"BUY": 0, "SELL": 0}
+        self.qty = {"BUY": 0.0, "SELL": 0.0}
+        self.notional = {"BUY": 0.0, "SELL": 0.0}
+        self.bids = _Levels(-1)
+        self.offers = _Levels(1)
+
+    def add(self, side: str, qty: float, limit_price: Optional[float]):
+        self.counts[side] += 1
+        self.qty[side] += qty
+        self.notional[side] += qty * (self.ref if limit_price is None else limit_price)
+        if limit_price is not None:
+            (self.bids if side == "BUY" else self.offers).add(limit_price)
+
+    def remove(self, side: str, qty: float, limit_price: Optional[float]):
+        self.counts[side] -= 1
+        self.qty[side] -= qty
+        self.notional[side] -= qty * (self.ref if limit_price is None else limit_price)
+        if limit_price is not None:
+            (self.bids if side == "BUY" else self.offers).remove(limit_price)
+
+    def reduce(self, side: str, qty: float, limit_price: Optional[float]):
+        """Partial execution of a live order (continuous mode): its count and level stay."""
+        self.qty[side] -= qty
+        self.notional[side] -= qty * (self.ref if limit_price is None else limit_price)
+
+    def close(self):
+        self.counts = {"BUY": 0, "SELL": 0}
+        self.qty = {"BUY": 0.0, "SELL": 0.0}
+        self.notional = {"BUY": 0.0, "SELL": 0.0}
+        self.bids = _Levels(-1)
+        self.offers = _Levels(1)
+
+    def to_dict(self, auction: dict, now_ms: int) -> dict:
+        return {
+            "auctionId": auction["id"],
+            "ordinal": self.ordinal,
+            "instrumentId": auction["instrumentId"],
+            "status": auction["status"],
+            "tOpenMs": auction["tOpenMs"],
+            "tCloseMs": auction["tCloseMs"],
+            "timeRemainingMs": max(0, auction["tCloseMs"] - now_ms) if auction["status"] == "OPEN" else 0,
+            "orderCount": self.counts["BUY"] + self.counts["SELL"],
+            "buyCount": self.counts["BUY"],
+            "sellCount": self.counts["SELL"],
+            "buyQty": self.qty["BUY"],
+            "sellQty": self.qty["SELL"],
+            "buyNotional": self.notional["BUY"],
+            "sellNotional": self.notional["SELL"],
+            "bestBid": self.bids.best(),
+            "bestOffer": self.offers.best(),
+            "clearingPrice": auction["clearingPrice"],
+            "matchedNotional": auction["matchedNotional"],
+        }
+
+
+# Creation order, newest last, with each auction's ordinal (archived auctions leave gaps)
+_order: List[str] = []
+_ordinals: List[int] = []
+# Per auction status: ascending ordinals, so a filtered page is a slice, not a walk
+_by_status: Dict[str, List[int]] = {}
+_ids: Dict[int, str] = {}
+_order_lock = threading.Lock()
+_next_ordinal = 0
+
+
+def create(auction: dict) -> AuctionSummary:
+    global _next_ordinal
+    with _order_lock:
+        summary = AuctionSummary(_next_ordinal, auction["band"]["ref"])
+        _next_ordinal += 1
+        state.auction_summaries[auction["id"]] = summary
+        _order.append(auction["id"])
+        _ordinals.append(summary.ordinal)
+        _by_status.setdefault(auction["status"], []).append(summary.ordinal)
+        _ids[summary.ordinal] = auction["id"]
+    return summary
+
+
+def set_status(auction_id: str, old: str, new: str):
+    """Moves an auction between status lists (at close)."""
+    ordinal = state.auction_summaries[auction_id].ordinal
+    with _order_lock:
+        ords = _by_status.get(old, [])
+        i = bisect_left(ords, ordinal)
+        if i < len(ords) and ords[i] == ordinal:
+            del ords[i]
+        insort(_by_status.setdefault(new, []), ordinal)
+
+
+def discard(auction_ids: Iterable[str]):
+    """Drops archived auctions from the listing order (one pass for a whole batch)."""
+    gone = set(auction_ids)
+    with _order_lock:
+        keep = [i for i, aid in enumerate(_order) if aid not in gone]
+        dropped = {o for o, aid in zip(_ordinals, _order) if aid in gone}
+        _order[:] = [_order[i] for i in keep]
+        _ordinals[:] = [_ordinals[i] for i in keep]
+        for ords in _by_status.values():
+            ords[:] = [o for o in ords if o not in dropped]
+        for o in dropped:
+            del _ids[o]
+
+
+def rebuild():
+    """After snapshot restore: re-derive creation order from the restored summaries."""
+    global _next_ordinal
+    with _order_lock:
+        _order[:] = sorted(state.auction_summaries, key=lambda aid: state.auction_summaries[aid].ordinal)
+        _ordinals[:] = [state.auction_summaries[aid].ordinal for aid in _order]
+        _next_ordinal = _ordinals[-1] + 1 if _ordinals else 0
+        _ids.clear()
+        _ids.update(zip(_ordinals, _order))
+        _by_status.clear()
+        for ordinal, aid in zip(_ordinals, _order):
+            _by_status.setdefault(state.auctions[aid]["status"], []).append(ordinal)
+
+
+def page(limit: int, before: Optional[int] = None, status: Optional[str] = None):
+    """
+    Newest-first auction ids with ordinal < `before` (and matching `status`).
+    Returns (ids, next cursor or None).
+    """
+    with _order_lock:
+        ords = _ordinals if status is None else _by_status.get(status, [])
+        i = len(ords) if before is None else bisect_left(ords, before)
+        start = max(0, i - limit)
+        # Auctions being archived (retention.py) are skipped, so a page can come up short
+        out = [_ids[o] for o in reversed(ords[start:i]) if _ids[o] in state.auctions]
+        return out, (ords[start] if start > 0 else None)
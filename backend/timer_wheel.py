@@ -0,0 +1,93 @@
+# timer_wheel.py
+"""
+Hashed timer wheel for many short-lived deadlines (dealer quote TTLs).
+
+Deadlines are bucketed by tick into a fixed ring of slots, so schedule,
+reschedule and cancel are O(1) dict operations regardless of how many timers
+are armed (the close scheduler's heap is O(log n), fine for a few thousand
+auctions but not for every LP re-quote). A deadline further out than one
+revolution just stays in its slot until a later pass finds it due. One daemon
+thread advances the wheel every tick and hands everything that expired to the
+callback as one batch.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+
+class TimerWheel:
+    def __init__(self, on_expire: Callable[[List[Hashable]], None], tick_ms: int = 100, slots: int = 1024):
+        self._on_expire = on_expire
+        self.tick_ms = tick_ms
+        self._slots: List[Dict[Hashable, int]] = [{} for _ in range(slots)]   # key -> due ms
+        self._where: Dict[Hashable, int] = {}                                  # key -> slot
+        self._cursor = int(time.time() * 1000) // tick_ms                      # last tick processed
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def schedule(self, key: Hashable, due_ms: int):
+        """Arms (or re-arms) `key` to expire at epoch-ms `due_ms`; past deadlines fire on the next tick."""
+        with self._cv:
+            old = self._where.get(key)
+            if old is not None:
+                del self._slots[old][key]
+            elif not self._where:
+                # Idle wheel: nothing armed in the slots it skipped, catch the cursor up
+                self._cursor = int(time.time() * 1000) // self.tick_ms - 1
+            # Rounded up: by the time tick T is processed, now >= T * tick_ms >= due_ms
+            tick = max(-(-due_ms // self.tick_ms), self._cursor + 1)
+            slot = tick % len(self._slots)
+            self._slots[slot][key] = due_ms
+            self._where[key] = slot
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+                self._thread.start()
+            elif len(self._where) == 1:
+                self._cv.notify()
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._cv:
+            slot = self._where.pop(key, None)
+            if slot is None:
+                return False
+            del self._slots[slot][key]
+            return True
+
+    def _advance(self, now: int) -> List[Hashable]:
+        target = now // self.tick_ms
+        n = len(self._slots)
+        # After a stall longer than a revolution every slot is visited once
+        first = max(self._cursor + 1, target - n + 1)
+        due = []
+        for tick in range(first, target + 1):
+            bucket = self._slots[tick % n]
+            if not bucket:
+                continue
+            fired = [k for k, t in bucket.items() if t <= now]
+            for k in fired:
+                del bucket[k]
+                del self._where[k]
+            due.extend(fired)
+        self._cursor = target
+        return due
+
+    def _run(self):
+        while True:
+            with self._cv:
+                if not self._where:
+                    self._cv.wait()
+                    continue
+                now = int(time.time() * 1000)
+                due = self._advance(now)
+                if not due:
+                    self._cv.wait((self.tick_ms - now % self.tick_ms) / 1000)
+                    continue
+            # Callback runs outside the wheel lock so it can re-arm keys
+            try:
+                self._on_expire(due)
+            except Exception:
+                logging.exception("timer wheel callback failed for %d keys", len(due))